@@ -1587,6 +1587,9 @@ class Global(APIBase):
     def getAllTasks(self):
         return self._irs.getAllTasks()
 
+    def getResourceStats(self):
+        return self._irs.getResourceStats()
+
     def setMOMPolicy(self, policy):
         try:
             self._cif.mom.setPolicy(policy)
@@ -728,7 +728,10 @@ class clientIF(object):
     def _preparePathsForRecoveredVMs(self):
         vm_objects = list(self.getVMs().values())
         num_vm_objects = len(vm_objects)
-        for idx, vm_obj in enumerate(vm_objects):
+        start = vdsm.common.time.monotonic_time()
+
+        def prepare(item):
+            idx, vm_obj = item
             # Let's recover as much VMs as possible
             try:
                 # Do not prepare volumes when system goes down
@@ -742,6 +745,19 @@ class clientIF(object):
                     "recovery [%d/%d]: failed for vm %s",
                     idx + 1, num_vm_objects, vm_obj.id)
 
+        # Preparing paths of different VMs is independent; use multiple
+        # threads to avoid waiting for storage serially.
+        workers = config.getint('vars', 'recovery_workers')
+        for done, _ in enumerate(concurrent.tmap(
+                prepare, enumerate(vm_objects), max_workers=workers,
+                name="recovery"), 1):
+            self.log.debug('recovery: prepared paths for %d/%d domains',
+                           done, num_vm_objects)
+
+        self.log.info('recovery: prepared paths for %d domains in %.2f '
+                      'seconds', num_vm_objects,
+                      vdsm.common.time.monotonic_time() - start)
+
     def _prepare_network_drive(self, drive, res):
         """
         Fills drive object for network drives with network-specific data.
@@ -33,6 +33,8 @@ import pkgutil
 import subprocess
 import sys
 import tempfile
+import threading
+import time
 
 import six
 
@@ -48,6 +50,57 @@ _LAUNCH_FLAGS_PATH = os.path.join(
 )
 
 
+# A directory modified less than this number of seconds before it was
+# scanned is not cached, since another change in the same timestamp
+# granularity would not modify the directory mtime.
+_RACY_INTERVAL = 1.0
+
+
+class _HookRegistry(object):
+    """
+    Cache the listing of hook directories.
+
+    The directory listing is cached and the directory is listed again only
+    when its mtime changes, so checking an empty hook point costs a single
+    stat call. Changing the mode of an existing script does not modify the
+    directory mtime, so the scripts of a non-empty hook point are checked
+    on every call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirs = {}
+
+    def scripts(self, path):
+        """
+        Return sorted list of executable scripts in directory path.
+        """
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return []
+
+        with self._lock:
+            cached = self._dirs.get(path)
+        if cached is not None and cached[0] == mtime:
+            entries = cached[1]
+        else:
+            entries = tuple(sorted(glob.glob(os.path.join(path, '*'))))
+            if time.time() - mtime > _RACY_INTERVAL:
+                with self._lock:
+                    self._dirs[path] = (mtime, entries)
+
+        return [s for s in entries
+                if os.path.isfile(s) and os.access(s, os.X_OK)]
+
+    def clear(self):
+        with self._lock:
+            self._dirs.clear()
+
+
+_registry = _HookRegistry()
+
+
 def _scriptsPerDir(dir_name):
     if os.path.isabs(dir_name):
         raise ValueError("Cannot use absolute path as hook directory")
@@ -56,9 +109,17 @@ def _scriptsPerDir(dir_name):
         head, tail = os.path.split(head)
         if tail == "..":
             raise ValueError("Hook directory paths cannot contain '..'")
-    path = os.path.join(P_VDSM_HOOKS, dir_name, '*')
-    return [s for s in glob.glob(path)
-            if os.path.isfile(s) and os.access(s, os.X_OK)]
+    return _registry.scripts(os.path.join(P_VDSM_HOOKS, dir_name))
+
+
+def _dataDir():
+    """
+    Return directory for hook data files. Use the vdsm run directory, on
+    tmpfs, so passing data to hooks does not touch the disk.
+    """
+    if os.path.isdir(P_VDSM_RUN):
+        return P_VDSM_RUN
+    return None
 
 _DOMXML_HOOK = 1
 _JSON_HOOK = 2
@@ -70,12 +131,10 @@ def _runHooksDir(data, dir, vmconf={}, raiseError=True, errors=None, params={},
         errors = []
 
     scripts = _scriptsPerDir(dir)
-    scripts.sort()
-
     if not scripts:
         return data
 
-    data_fd, data_filename = tempfile.mkstemp()
+    data_fd, data_filename = tempfile.mkstemp(prefix='hook-', dir=_dataDir())
     try:
         if hookType == _DOMXML_HOOK:
             os.write(data_fd, data.encode('utf-8') if data else b'')
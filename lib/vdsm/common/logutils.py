@@ -178,9 +178,13 @@ class ThreadedHandler(logging.handlers.MemoryHandler):
     # Interval for reporting handler stats.
     STATS_INTERVAL = 60
 
+    # Number of loggers reported in handler stats.
+    BUSIEST_LOGGERS = 5
+
     _CLOSED = object()
 
-    def __init__(self, capacity=2000, adaptive=True, start=True):
+    def __init__(self, capacity=2000, adaptive=True, start=True,
+                 debug_sample=1):
         """
         Arguments:
             capacity (int): number of records to queue before dropping records.
@@ -192,6 +196,9 @@ class ThreadedHandler(logging.handlers.MemoryHandler):
                 dropping lower priority messages.
             start (bool): start the handler thread automatically. If False, the
                 thread must be started explicitly.
+            debug_sample (int): log one of every debug_sample DEBUG records of
+                each logger. Other DEBUG records are dropped before they are
+                queued or formatted. The default, 1, logs all records.
         """
         logging.handlers.MemoryHandler.__init__(self, 0)
         if adaptive:
@@ -206,6 +213,7 @@ class ThreadedHandler(logging.handlers.MemoryHandler):
             ]
         else:
             self._limits = [(logging.CRITICAL, capacity)]
+        self._debug_sample = debug_sample
         self._target = _DROPPER
         self._queue = collections.deque()
         self._cond = threading.Condition(threading.Lock())
@@ -213,8 +221,19 @@ class ThreadedHandler(logging.handlers.MemoryHandler):
         self._last_report = time.time()
         # Number of dropped records for last interval.
         self._dropped_records = 0
+        # Number of DEBUG records dropped by sampling for last interval.
+        self._sampled_records = 0
         # The maximum number of pending records for the last interval.
         self._max_pending = 0
+        # Number of records per logger for last interval.
+        self._logger_records = collections.Counter()
+        # Number of DEBUG records per logger, used for sampling.
+        self._debug_records = collections.Counter()
+        # Records per second per logger in the last completed interval.
+        self._logger_rates = {}
+        # Formatted records written by the logging thread, reused to avoid
+        # allocating a new list for every batch.
+        self._lines = []
         self._thread = concurrent.thread(self._run, name="logfile")
         if start:
             self.start()
@@ -236,8 +255,12 @@ class ThreadedHandler(logging.handlers.MemoryHandler):
         completed, warn about messages dropped during this interval.
         """
         with self._cond:
+            self._logger_records[record.name] += 1
+
             # First, handle this record.
-            if self._can_handle(record):
+            if self._sampled_out(record):
+                self._sampled_records += 1
+            elif self._can_handle(record):
                 self._queue.append(record)
                 self._cond.notify()
             else:
@@ -250,13 +273,21 @@ class ThreadedHandler(logging.handlers.MemoryHandler):
 
             # Prepare stats and reset counters.
             dropped_records = self._dropped_records
+            sampled_records = self._sampled_records
             max_pending = self._max_pending
+            self._logger_rates = {
+                name: count / interval
+                for name, count in six.iteritems(self._logger_records)}
+            rates = self._logger_rates
             self._last_report = record.created
             self._dropped_records = 0
+            self._sampled_records = 0
             self._max_pending = 0
+            self._logger_records = collections.Counter()
 
         # Report outside of the locked region to avoid deadlock.
-        self._report_stats(interval, dropped_records, max_pending)
+        self._report_stats(
+            interval, dropped_records, max_pending, sampled_records, rates)
 
     def close(self):
         """
@@ -294,8 +325,23 @@ class ThreadedHandler(logging.handlers.MemoryHandler):
         """
         self._thread.start()
 
+    def rates(self):
+        """
+        Return dict mapping logger name to number of records per second
+        logged in the last stats interval, including dropped records.
+        """
+        with self._cond:
+            return dict(self._logger_rates)
+
     # Private
 
+    def _sampled_out(self, record):
+        if self._debug_sample <= 1 or record.levelno > logging.DEBUG:
+            return False
+        count = self._debug_records[record.name]
+        self._debug_records[record.name] = count + 1
+        return count % self._debug_sample != 0
+
     def _can_handle(self, record):
         size = len(self._queue)
         self._max_pending = max(size, self._max_pending)
@@ -304,19 +350,26 @@ class ThreadedHandler(logging.handlers.MemoryHandler):
                 return size < limit
         return True
 
-    def _report_stats(self, interval, dropped_records, max_pending):
+    def _report_stats(self, interval, dropped_records, max_pending,
+                      sampled_records=0, rates=None):
+        busiest = sorted(six.iteritems(rates or {}),
+                         key=lambda item: item[1],
+                         reverse=True)[:self.BUSIEST_LOGGERS]
+        busiest = ", ".join("%s: %.2f/s" % item for item in busiest)
         if dropped_records:
             # Note: use critical level for better visibility and to prevent
             # filtering out of the message.
             logging.critical(
                 "ThreadedHandler is overloaded, dropped %d log messages in "
-                "the last %d seconds (max pending: %d)",
-                dropped_records, interval, max_pending)
+                "the last %d seconds (max pending: %d, sampled out: %d, "
+                "busiest loggers: %s)",
+                dropped_records, interval, max_pending, sampled_records,
+                busiest)
         else:
             logging.debug(
                 "ThreadedHandler is ok in the last %d seconds "
-                "(max pending: %d)",
-                interval, max_pending)
+                "(max pending: %d, sampled out: %d, busiest loggers: %s)",
+                interval, max_pending, sampled_records, busiest)
 
     def _run(self):
         while True:
@@ -325,24 +378,83 @@ class ThreadedHandler(logging.handlers.MemoryHandler):
                 while len(self._queue) == 0:
                     self._cond.wait()
 
-            # Handle all pending messages before taking the lock again. Disable
-            # flushing while handling pending messages so we do one write()
-            # syscall per cycle instead of one write() syscall per record. This
-            # improves throuput significantly.
-            self._target.buffering = True
-            try:
-                while len(self._queue):
-                    record = self._queue.popleft()
-                    if record is self._CLOSED:
-                        return
-                    self._target.handle(record)
-            finally:
-                self._target.buffering = False
-                self._target.flush()
+            # Handle all pending messages before taking the lock again.
+            records = []
+            closed = False
+            while len(self._queue):
+                record = self._queue.popleft()
+                if record is self._CLOSED:
+                    closed = True
+                    break
+                records.append(record)
+
+            if _is_stream_handler(self._target):
+                self._write(self._target, records)
+            else:
+                self._handle(self._target, records)
+
+            if closed:
+                return
 
             # Avoid reference cycles, specially exc_info that may hold a
             # traceback objects.
             record = None
+            records = None
+
+    def _handle(self, target, records):
+        # Disable flushing while handling pending messages so we do one
+        # write() syscall per cycle instead of one write() syscall per record.
+        # This improves throuput significantly.
+        target.buffering = True
+        try:
+            for record in records:
+                target.handle(record)
+        finally:
+            target.buffering = False
+            target.flush()
+
+    def _write(self, target, records):
+        """
+        Format records and write them to a stream handler using a single
+        write() call, checking once per batch if the log file was rotated.
+        """
+        lines = self._lines
+        try:
+            for record in records:
+                if not target.filter(record):
+                    continue
+                try:
+                    lines.append(target.format(record))
+                except Exception:
+                    target.handleError(record)
+            if not lines:
+                return
+
+            lines.append("")
+            data = target.terminator.join(lines)
+
+            target.acquire()
+            try:
+                if isinstance(target, logging.handlers.WatchedFileHandler):
+                    target.reopenIfNeeded()
+                if target.stream is None:
+                    target.stream = target._open()
+                target.stream.write(data)
+                target.stream.flush()
+            except Exception:
+                target.handleError(records[-1])
+            finally:
+                target.release()
+        finally:
+            del lines[:]
+
+
+def _is_stream_handler(handler):
+    # Python 2 stream handlers do not support the terminator attribute, and
+    # WatchedFileHandler.reopenIfNeeded() was added in Python 3.6.
+    return (six.PY3
+            and isinstance(handler, logging.StreamHandler)
+            and hasattr(handler, "terminator"))
 
 
 class _Dropper(object):
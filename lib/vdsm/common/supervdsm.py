@@ -23,13 +23,17 @@ from __future__ import absolute_import
 from __future__ import division
 
 import os
+from multiprocessing import connection
 from multiprocessing.managers import BaseManager, RemoteError
+from multiprocessing.managers import convert_to_error, dispatch
 import logging
 import threading
 
 from vdsm.common import constants
 from vdsm.common import function
+from vdsm.common.config import config
 from vdsm.common.panic import panic
+from vdsm.common.time import monotonic_time
 
 _g_singletonSupervdsmInstance = None
 _g_singletonSupervdsmInstance_lock = threading.Lock()
@@ -38,6 +42,18 @@ _g_singletonSupervdsmInstance_lock = threading.Lock()
 ADDRESS = os.path.join(constants.P_VDSM_RUN, "svdsm.sock")
 
 
+class Timeout(RuntimeError):
+    """
+    Raised when a supervdsm call did not complete in time.
+    """
+
+
+class _BrokenConnection(Exception):
+    """
+    Raised when communication with supervdsm failed.
+    """
+
+
 class _SuperVdsmManager(BaseManager):
     pass
 
@@ -49,16 +65,180 @@ class ProxyCaller(object):
         self._supervdsmProxy = supervdsmProxy
 
     def __call__(self, *args, **kwargs):
-        callMethod = lambda: \
-            getattr(self._supervdsmProxy._svdsm, self._funcName)(*args,
-                                                                 **kwargs)
+        return self._supervdsmProxy.call(self._funcName, args, kwargs)
+
+
+class CallStats(object):
+    """
+    Latency and queue statistics of supervdsm calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.running = 0
+        self.call_time = 0.0
+        self.max_call_time = 0.0
+        self.queue_time = 0.0
+        self.max_queue_time = 0.0
+
+    def queued(self):
+        with self._lock:
+            self.waiting += 1
+
+    def started(self, queue_time):
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+            self.queue_time += queue_time
+            self.max_queue_time = max(self.max_queue_time, queue_time)
+
+    def dequeued(self):
+        with self._lock:
+            self.waiting -= 1
+
+    def finished(self, call_time, error=False, timeout=False):
+        with self._lock:
+            self.running -= 1
+            self.calls += 1
+            self.errors += int(error)
+            self.timeouts += int(timeout)
+            self.call_time += call_time
+            self.max_call_time = max(self.max_call_time, call_time)
+
+    def info(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "waiting": self.waiting,
+                "running": self.running,
+                "call_time": self.call_time,
+                "max_call_time": self.max_call_time,
+                "queue_time": self.queue_time,
+                "max_queue_time": self.max_queue_time,
+            }
+
+
+class _Connection(object):
+    """
+    A connection to the remote supervdsm instance.
+
+    Uses the multiprocessing.managers protocol, so calls are served by a
+    dedicated thread on the supervdsm side, like calls of a manager proxy.
+    """
+
+    def __init__(self, address, authkey, ident, generation):
+        self.generation = generation
+        self._ident = ident
+        self._conn = connection.Client(address, authkey=authkey)
         try:
-            return callMethod()
-        except RemoteError:
-            self._supervdsmProxy._connect()
-            raise RuntimeError(
-                "Broken communication with supervdsm. Failed call to %s"
-                % self._funcName)
+            dispatch(self._conn, None, "accept_connection", (ident,))
+        except:
+            self._conn.close()
+            raise
+
+    def call(self, name, args, kwargs, timeout=None):
+        """
+        Call supervdsm function name, returning the function result.
+
+        Errors raised by the function are raised unchanged. Raises
+        _BrokenConnection if communication with supervdsm failed, or
+        supervdsm failed to serve the call.
+        """
+        try:
+            self._conn.send((self._ident, name, args, kwargs))
+            if timeout is not None and not self._conn.poll(max(timeout, 0)):
+                raise Timeout("Timeout calling supervdsm %s" % name)
+            kind, result = self._conn.recv()
+        except (EOFError, EnvironmentError) as e:
+            raise _BrokenConnection(str(e))
+        if kind == "#RETURN":
+            return result
+        error = convert_to_error(kind, result)
+        del result
+        if isinstance(error, RemoteError):
+            raise _BrokenConnection(str(error))
+        try:
+            raise error
+        finally:
+            # Break the reference cycle between the error and this frame.
+            del error
+
+    def close(self):
+        self._conn.close()
+
+
+class _ConnectionPool(object):
+    """
+    Pool of connections, created on demand. If size is 0 the pool is not
+    bounded, and a new connection is created when no connection is idle.
+    """
+
+    def __init__(self, connect, size):
+        self._connect = connect
+        self._size = size
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []
+        self._count = 0
+
+    def acquire(self, timeout=None):
+        """
+        Return an idle connection, creating a new connection if the pool is
+        not full. Raises Timeout if no connection is available in timeout
+        seconds.
+        """
+        if timeout is not None:
+            deadline = monotonic_time() + timeout
+        with self._cond:
+            while (not self._idle and self._size and
+                   self._count >= self._size):
+                if timeout is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - monotonic_time()
+                    if remaining <= 0:
+                        raise Timeout("Timeout waiting for supervdsm "
+                                      "connection")
+                    self._cond.wait(remaining)
+            if self._idle:
+                return self._idle.pop()
+            self._count += 1
+        try:
+            return self._connect()
+        except:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn, generation):
+        with self._cond:
+            if conn.generation == generation:
+                self._idle.append(conn)
+            else:
+                self._count -= 1
+                conn.close()
+            self._cond.notify()
+
+    def discard(self, conn):
+        with self._cond:
+            self._count -= 1
+            self._cond.notify()
+        conn.close()
+
+    def clear(self):
+        with self._cond:
+            idle = self._idle
+            self._idle = []
+            self._count -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
 
 
 class SuperVdsmProxy(object):
@@ -67,29 +247,126 @@ class SuperVdsmProxy(object):
     """
     _log = logging.getLogger("SuperVdsmProxy")
 
-    def __init__(self):
+    def __init__(self, address=ADDRESS, authkey=b'', connections=None,
+                 timeout=None):
+        if connections is None:
+            connections = config.getint("vars", "supervdsm_connections")
+        if timeout is None:
+            timeout = config.getfloat("vars", "supervdsm_call_timeout")
+        self._address = address
+        self._authkey = authkey
+        self._timeout = timeout or None
+        self._lock = threading.Lock()
+        self._reconnect_lock = threading.Lock()
+        self._generation = 0
         self._manager = None
         self._svdsm = None
+        self._stats = CallStats()
+        self._pool = _ConnectionPool(self._new_connection, connections)
         self._connect()
 
     def open(self, *args, **kwargs):
         # pylint: disable=no-member
         return self._manager.open(*args, **kwargs)
 
+    def call(self, name, args=(), kwargs=None, timeout=None):
+        """
+        Call supervdsm function name with args and kwargs.
+
+        If timeout is set, or supervdsm_call_timeout is configured, raises
+        Timeout if the call did not complete in timeout seconds, including
+        the time waiting for a free connection. The call may still complete
+        on the supervdsm side.
+        """
+        if kwargs is None:
+            kwargs = {}
+        if timeout is None:
+            timeout = self._timeout
+
+        start = monotonic_time()
+        self._stats.queued()
+        try:
+            conn = self._pool.acquire(timeout)
+        except Timeout:
+            self._stats.dequeued()
+            raise
+        except:
+            self._stats.dequeued()
+            self._reconnect(self._generation)
+            raise RuntimeError(
+                "Cannot connect to supervdsm. Failed call to %s" % name)
+
+        started = monotonic_time()
+        self._stats.started(started - start)
+        if timeout is not None:
+            timeout -= started - start
+
+        try:
+            result = conn.call(name, args, kwargs, timeout=timeout)
+        except Timeout:
+            self._pool.discard(conn)
+            self._finished(started, error=True, timeout=True)
+            raise
+        except _BrokenConnection:
+            self._pool.discard(conn)
+            self._finished(started, error=True)
+            self._reconnect(conn.generation)
+            raise RuntimeError(
+                "Broken communication with supervdsm. Failed call to %s"
+                % name)
+        except:
+            # Errors raised by the supervdsm function.
+            self._pool.release(conn, self._generation)
+            self._finished(started, error=True)
+            raise
+
+        self._pool.release(conn, self._generation)
+        self._finished(started)
+        return result
+
+    def stats(self):
+        """
+        Return dict of supervdsm calls statistics.
+        """
+        return self._stats.info()
+
+    def _finished(self, started, error=False, timeout=False):
+        self._stats.finished(
+            monotonic_time() - started, error=error, timeout=timeout)
+
+    def _new_connection(self):
+        with self._lock:
+            ident = self._svdsm._token.id
+            generation = self._generation
+        return _Connection(self._address, self._authkey, ident, generation)
+
+    def _reconnect(self, generation):
+        # Several callers may fail at the same time; reconnect only once.
+        with self._reconnect_lock:
+            if generation != self._generation:
+                return
+            self._pool.clear()
+            self._connect()
+
     def _connect(self):
-        self._manager = _SuperVdsmManager(address=ADDRESS, authkey=b'')
-        self._manager.register('instance')
-        self._manager.register('open')
+        manager = _SuperVdsmManager(address=self._address,
+                                    authkey=self._authkey)
+        manager.register('instance')
+        manager.register('open')
         self._log.debug("Trying to connect to Super Vdsm")
         try:
             function.retry(
-                self._manager.connect, Exception, timeout=60, tries=3)
+                manager.connect, Exception, timeout=60, tries=3)
         except Exception as ex:
             msg = "Connect to supervdsm service failed: %s" % ex
             panic(msg)
 
         # pylint: disable=no-member
-        self._svdsm = self._manager.instance()
+        svdsm = manager.instance()
+        with self._lock:
+            self._manager = manager
+            self._svdsm = svdsm
+            self._generation += 1
 
     def __getattr__(self, name):
         return ProxyCaller(self, name)
@@ -24,6 +24,7 @@ from __future__ import division
 import errno
 import logging
 import time
+from . import procfs
 from . import stats
 from vdsm import utils
 from vdsm import metrics
@@ -61,11 +62,12 @@ def get_stats(cif, sample, multipath=False):
     for var in decStats:
         ret[var] = utils.convertToStr(decStats[var])
 
-    avail, commit = _memUsageInfo(cif)
+    meminfo = _meminfo(last_sample)
+    avail, commit = _memUsageInfo(cif, meminfo)
     ret['memAvailable'] = avail // MiB
     ret['memCommitted'] = commit // MiB
-    ret['memFree'] = _memFree() // MiB
-    ret['swapTotal'], ret['swapFree'] = _readSwapTotalFree()
+    ret['memFree'] = _memFree(meminfo) // MiB
+    ret['swapTotal'], ret['swapFree'] = _readSwapTotalFree(meminfo)
     (ret['vmCount'], ret['vmActive'], ret['vmMigrating'],
      ret['incomingVmMigrations'], ret['outgoingVmMigrations']) = \
         _countVms(cif)
@@ -101,12 +103,21 @@ def send_metrics(hoststats):
         logging.exception('Host metrics collection failed')
 
 
-def _readSwapTotalFree():
-    meminfo = utils.readMemInfo()
+def _meminfo(last_sample):
+    """
+    Return /proc/meminfo fields from the procfs snapshot of the last host
+    sample, or read them if there is no sample yet.
+    """
+    if last_sample is None:
+        return procfs.meminfo()
+    return last_sample.procfs.meminfo
+
+
+def _readSwapTotalFree(meminfo):
     return meminfo['SwapTotal'] // 1024, meminfo['SwapFree'] // 1024
 
 
-def _memUsageInfo(cif):
+def _memUsageInfo(cif, meminfo):
     """
     Return an approximation of available memory for new VMs.
     """
@@ -117,7 +128,6 @@ def _memUsageInfo(cif):
     committed = 0
     for v in cif.getVMs().values():
         committed += v.mem_size_mb() * MiB
-    meminfo = utils.readMemInfo()
     freeOrCached = (meminfo['MemFree'] +
                     meminfo['Cached'] +
                     meminfo['Buffers'] +
@@ -128,11 +138,10 @@ def _memUsageInfo(cif):
     return available, committed
 
 
-def _memFree():
+def _memFree(meminfo):
     """
     Return the actual free mem on host.
     """
-    meminfo = utils.readMemInfo()
     return (meminfo['MemFree'] +
             meminfo['Cached'] +
             meminfo['Buffers'] +
@@ -0,0 +1,273 @@
+#
+# Copyright 2020 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Snapshot of the procfs files used for host statistics.
+
+A Snapshot reads every file once, so all the host statistics of a sampling
+cycle are computed from the same data. Files are read into a buffer reused
+by the next snapshot, and parsed only for the fields we report.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+
+import io
+import logging
+import os
+import threading
+import time
+
+from vdsm.common.time import monotonic_time
+from vdsm.common.units import KiB
+
+PROC_STAT = "/proc/stat"
+PROC_MEMINFO = "/proc/meminfo"
+PROC_LOADAVG = "/proc/loadavg"
+PROC_PID_STAT = "/proc/%d/stat"
+
+THP_STATE = "/sys/kernel/mm/transparent_hugepage/enabled"
+if not os.path.exists(THP_STATE):
+    THP_STATE = "/sys/kernel/mm/redhat_transparent_hugepage/enabled"
+
+# Fields of /proc/meminfo used for host statistics.
+MEMINFO_FIELDS = (
+    "MemTotal",
+    "MemFree",
+    "Buffers",
+    "Cached",
+    "SwapTotal",
+    "SwapFree",
+    "AnonHugePages",
+    "SReclaimable",
+)
+
+# Initial size of the read buffer, large enough for /proc/stat on hosts with
+# hundreds of cores. The buffer grows if needed.
+BUFFER_SIZE = 64 * KiB
+
+log = logging.getLogger("host.procfs")
+
+
+class Reader(object):
+    """
+    Read small procfs files into a reusable buffer.
+    """
+
+    def __init__(self, size=BUFFER_SIZE):
+        self._buf = bytearray(size)
+
+    def read(self, path):
+        """
+        Read the entire file and return its contents as bytes.
+        """
+        with io.open(path, "rb", buffering=0) as f:
+            pos = 0
+            while True:
+                if pos == len(self._buf):
+                    self._buf.extend(bytearray(len(self._buf)))
+                n = f.readinto(memoryview(self._buf)[pos:])
+                if not n:
+                    break
+                pos += n
+        return bytes(self._buf[:pos])
+
+
+class MemInfoParser(object):
+    """
+    Parse /proc/meminfo fields, remembering the line number of each field.
+
+    The layout of /proc/meminfo does not change while the system is running,
+    so after the first parse the fields are found without searching. If the
+    layout changes, the line numbers are computed again.
+    """
+
+    def __init__(self, fields=MEMINFO_FIELDS):
+        self._fields = fields
+        self._offsets = ()
+
+    def parse(self, data):
+        """
+        Return dict of field name to value in KiB. Fields missing in
+        /proc/meminfo are not included.
+        """
+        lines = data.splitlines()
+        if not self._valid(lines):
+            self._offsets = self._find_offsets(lines)
+
+        meminfo = {}
+        for name, prefix, index in self._offsets:
+            meminfo[name] = int(lines[index][len(prefix):].split()[0])
+        return meminfo
+
+    def _valid(self, lines):
+        if not self._offsets:
+            return False
+        for name, prefix, index in self._offsets:
+            if index >= len(lines) or not lines[index].startswith(prefix):
+                return False
+        return True
+
+    def _find_offsets(self, lines):
+        prefixes = {(name + ":").encode("ascii"): name
+                    for name in self._fields}
+        offsets = []
+        for index, line in enumerate(lines):
+            prefix = line[:line.find(b":") + 1]
+            if prefix in prefixes:
+                offsets.append((prefixes[prefix], prefix, index))
+        if not offsets:
+            raise ValueError("Invalid meminfo: %r" % b"\n".join(lines[:3]))
+        return tuple(offsets)
+
+
+def parse_stat(data):
+    """
+    Parse /proc/stat contents.
+
+    Returns tuple (total, cores), where total is tuple (user, nice, sys,
+    idle) in jiffies for all cpus, and cores is a dict mapping core id to
+    (user, nice, sys, idle) tuple.
+    """
+    lines = data.split(b"\n")
+    total = tuple(int(v) for v in lines[0].split(None, 5)[1:5])
+    cores = {}
+    # Per core lines follow the total line.
+    for line in lines[1:]:
+        if not line.startswith(b"cpu"):
+            break
+        fields = line.split(None, 5)
+        cores[fields[0][3:].decode("ascii")] = (
+            int(fields[1]), int(fields[2]), int(fields[3]), int(fields[4]))
+    return total, cores
+
+
+def parse_pid_stat(data):
+    """
+    Parse /proc/pid/stat contents, returning tuple (user, sys) in jiffies.
+    """
+    # The process name may contain spaces; fields start after the name.
+    fields = data[data.rfind(b")") + 2:].split()
+    return int(fields[11]), int(fields[12])
+
+
+def parse_thp_state(data):
+    """
+    Return the selected transparent huge pages mode.
+    """
+    return data[data.index(b"[") + 1:data.index(b"]")].decode("ascii")
+
+
+class Snapshot(object):
+    """
+    Contents of procfs files read once for a host statistics cycle.
+
+    Attributes:
+        timestamp (float): time the snapshot was taken
+        pid_cpu (tuple): (user, sys) jiffies of the process
+        total_cpu (tuple): (user, nice, sys, idle) jiffies of all cpus
+        cpu_cores (dict): core id to (user, nice, sys, idle) jiffies
+        meminfo (dict): /proc/meminfo fields values in KiB
+        cpu_load (str): 5 minutes load average
+        thp_state (str): transparent huge pages mode
+        duration (float): time in seconds it took to take the snapshot
+    """
+
+    def __init__(self, timestamp, pid_cpu, total_cpu, cpu_cores, meminfo,
+                 cpu_load, thp_state, duration):
+        self.timestamp = timestamp
+        self.pid_cpu = pid_cpu
+        self.total_cpu = total_cpu
+        self.cpu_cores = cpu_cores
+        self.meminfo = meminfo
+        self.cpu_load = cpu_load
+        self.thp_state = thp_state
+        self.duration = duration
+
+
+class Collector(object):
+    """
+    Take procfs snapshots, reusing the read buffer and the parsers state.
+    """
+
+    def __init__(self, reader=None):
+        self._lock = threading.Lock()
+        self._reader = reader or Reader()
+        self._meminfo_parser = MemInfoParser()
+
+    def snapshot(self, pid):
+        with self._lock:
+            start = monotonic_time()
+            timestamp = time.time()
+
+            pid_cpu = parse_pid_stat(self._reader.read(PROC_PID_STAT % pid))
+            total_cpu, cpu_cores = parse_stat(self._reader.read(PROC_STAT))
+            meminfo = self._meminfo()
+
+            try:
+                cpu_load = self._reader.read(PROC_LOADAVG).split()[1]
+                cpu_load = cpu_load.decode("ascii")
+            except (EnvironmentError, IndexError):
+                cpu_load = "0.0"
+
+            try:
+                thp_state = parse_thp_state(self._reader.read(THP_STATE))
+            except (EnvironmentError, ValueError):
+                thp_state = "never"
+
+            duration = monotonic_time() - start
+
+        return Snapshot(timestamp, pid_cpu, total_cpu, cpu_cores, meminfo,
+                        cpu_load, thp_state, duration)
+
+    def meminfo(self):
+        with self._lock:
+            return self._meminfo()
+
+    def _meminfo(self):
+        # /proc/meminfo is sometimes empty when opened, see
+        # utils.readMemInfo().
+        tries = 3
+        while True:
+            tries -= 1
+            data = self._reader.read(PROC_MEMINFO)
+            try:
+                return self._meminfo_parser.parse(data)
+            except ValueError:
+                log.warning("Error parsing meminfo", exc_info=True)
+                if tries <= 0:
+                    raise
+                time.sleep(0.1)
+
+
+_collector = Collector()
+
+
+def snapshot(pid):
+    """
+    Take a procfs snapshot for process pid.
+    """
+    return _collector.snapshot(pid)
+
+
+def meminfo():
+    """
+    Read /proc/meminfo fields used for host statistics.
+    """
+    return _collector.meminfo()
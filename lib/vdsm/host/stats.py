@@ -97,6 +97,7 @@ def produce(first_sample, last_sample):
 
     stats['diskStats'] = last_sample.diskStats
     stats['thpState'] = last_sample.thpState
+    stats['procfsCollectionTime'] = last_sample.procfs.duration
 
     if _boot_time():
         stats['bootTime'] = _boot_time()
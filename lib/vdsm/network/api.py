@@ -38,6 +38,7 @@ from vdsm.network.ipwrapper import DUMMY_BRIDGE
 from vdsm.network.link import iface as link_iface
 from vdsm.network.link import sriov
 from vdsm.network.lldp import info as lldp_info
+from vdsm.network.netinfo import cache as netinfo_cache
 
 from . import canonicalize
 from .ip import address as ipaddress
@@ -76,6 +77,7 @@ def change_numvfs(pci_path, numvfs, devname):
     sriov.persist_numvfs(devname, numvfs)
 
     link_iface.iface(devname).up()
+    netinfo_cache.invalidate()
 
 
 def ip_addrs_info(device):
@@ -30,6 +30,7 @@ from vdsm.network import lldp
 from vdsm.network import nmstate
 from vdsm.network.dhclient_monitor import dhclient_monitor_ctx
 from vdsm.network.ipwrapper import getLinks
+from vdsm.network.netinfo import cache as netinfo_cache
 from vdsm.network.nm import networkmanager
 
 Lldp = lldp.driver()
@@ -38,6 +39,7 @@ Lldp = lldp.driver()
 def init_privileged_network_components():
     networkmanager.init()
     _lldp_init()
+    netinfo_cache.start_monitoring()
 
 
 def init_unprivileged_network_components(cif, net_api):
@@ -21,39 +21,132 @@ from __future__ import absolute_import
 from __future__ import division
 
 import errno
+import threading
 
+import six
+
+from vdsm.common.time import monotonic_time
 from vdsm.network.link import bond
 from vdsm.network.link import dpdk
 from vdsm.network.link import iface
 from vdsm.network.link import nic
 from vdsm.network.link import vlan
+from vdsm.network.netlink import link
+
+# Speed and duplex of a link are cached until the link index, flags or
+# operstate change, or until the cached value expires. The timeout limits
+# the time we may report stale speed for links depending on other links,
+# such as bonds.
+SPEED_CACHE_TIMEOUT = 60
 
 
 def report():
     stats = {}
-    for iface_properties in iface.list():
+    for link_info in link.iter_links_stats():
+        try:
+            stats[link_info['name']] = _generate_link_stats(link_info)
+        except IOError as e:
+            if e.errno != errno.ENODEV:
+                raise
+
+    # DPDK devices are not reported by netlink.
+    for dev_name in six.viewkeys(dpdk.get_dpdk_devices()):
         try:
-            interface = iface.iface(iface_properties['name'])
+            interface = iface.iface(dev_name)
             stats[interface.device] = _generate_iface_stats(interface)
         except IOError as e:
             if e.errno != errno.ENODEV:
                 raise
+
+    _speed_cache.prune(stats)
+    return stats
+
+
+def _generate_link_stats(link_info):
+    counters = link_info['stats']
+    up = link.is_link_up(link_info['flags'], check_oper_status=True)
+    stats = {
+        'name': link_info['name'],
+        'rx': counters['rx_bytes'],
+        'tx': counters['tx_bytes'],
+        'state': 'up' if up else 'down',
+        'rxDropped': counters['rx_dropped'],
+        'txDropped': counters['tx_dropped'],
+        'rxErrors': counters['rx_errors'],
+        'txErrors': counters['tx_errors'],
+    }
+    stats['speed'], stats['duplex'] = _speed_cache.get(link_info)
     return stats
 
 
 def _generate_iface_stats(interface):
     stats = interface.statistics()
-    speed = 0
-    if interface.type() == iface.Type.NIC:
-        speed = nic.speed(interface.device)
-    elif interface.type() == iface.Type.BOND:
-        speed = bond.speed(interface.device)
-    elif interface.type() == iface.Type.VLAN:
-        speed = vlan.speed(interface.device)
-    elif interface.type() == iface.Type.DPDK:
-        speed = dpdk.speed(interface.device)
-
-    stats['speed'] = speed
+    stats['speed'] = _speed(interface.device, interface.type())
     stats['duplex'] = nic.duplex(interface.device)
-
     return stats
+
+
+def _speed(dev_name, dev_type):
+    if dev_type == iface.Type.NIC:
+        return nic.speed(dev_name)
+    elif dev_type == iface.Type.BOND:
+        return bond.speed(dev_name)
+    elif dev_type == iface.Type.VLAN:
+        return vlan.speed(dev_name)
+    elif dev_type == iface.Type.DPDK:
+        return dpdk.speed(dev_name)
+    return 0
+
+
+class _SpeedCache(object):
+    """
+    Cache links speed and duplex, read from sysfs.
+    """
+
+    def __init__(self, timeout=SPEED_CACHE_TIMEOUT, clock=monotonic_time):
+        self._timeout = timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._links = {}
+
+    def get(self, link_info):
+        """
+        Return tuple (speed, duplex) of the link described by link_info.
+        """
+        name = link_info['name']
+        key = (link_info['index'], link_info['flags'], link_info['state'])
+        now = self._clock()
+
+        with self._lock:
+            cached = self._links.get(name)
+        if (
+            cached is not None
+            and cached[0] == key
+            and now - cached[1] < self._timeout
+        ):
+            return cached[2]
+
+        dev_type = link_info.get('type')
+        if dev_type is None:
+            dev_type = iface.get_alternative_type(name)
+        value = (_speed(name, dev_type), nic.duplex(name))
+
+        with self._lock:
+            self._links[name] = (key, now, value)
+        return value
+
+    def prune(self, names):
+        """
+        Remove links not in names.
+        """
+        with self._lock:
+            for name in list(self._links):
+                if name not in names:
+                    del self._links[name]
+
+    def clear(self):
+        with self._lock:
+            self._links.clear()
+
+
+_speed_cache = _SpeedCache()
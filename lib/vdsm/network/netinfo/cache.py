@@ -21,11 +21,15 @@
 from __future__ import absolute_import
 from __future__ import division
 
+import copy
 import errno
 import logging
+import threading
 
 import six
 
+from vdsm.common import concurrent
+from vdsm.common.time import monotonic_time
 from vdsm.network import dns
 from vdsm.network import nmstate
 from vdsm.network.ip import dhclient
@@ -34,6 +38,7 @@ from vdsm.network.ipwrapper import getLinks
 from vdsm.network.link import dpdk
 from vdsm.network.link import iface as link_iface
 from vdsm.network.netconfpersistence import RunningConfig
+from vdsm.network.netlink import monitor
 
 from . import bonding
 from . import bridges
@@ -48,6 +53,20 @@ from .routes import get_routes, get_gateway, is_default_route
 # TODO: Get switch type from the system.
 LEGACY_SWITCH = {'switch': 'legacy'}
 
+# Netlink events that may change the networking report.
+MONITOR_GROUPS = (
+    'link',
+    'ipv4-ifaddr',
+    'ipv6-ifaddr',
+    'ipv4-route',
+    'ipv6-route',
+)
+
+# Parts of the networking report have no netlink events (e.g. bonding options,
+# DHCP state and name servers), so a cached report is used only for this
+# number of seconds.
+REPORT_MAX_AGE = 60
+
 
 class NetworkIsMissing(Exception):
     pass
@@ -256,14 +275,146 @@ def _permanent_hwaddr_info(devs_report):
             nicinfo['permhwaddr'] = paddr[nic]
 
 
-def get(vdsmnets=None, compatibility=None):
-    if compatibility is None:
-        return _get(vdsmnets)
-    elif compatibility < 30700:
+class ReportCache(object):
+    """
+    Networking report kept in memory while the netlink monitor is running.
+
+    Every link, address or route event bumps the cache version, and the next
+    get() builds a new report. A report built while an event was received is
+    returned but not kept, since it may not include the change. When the
+    monitor is not running, every get() builds a new report.
+    """
+
+    def __init__(
+        self, build=_get, max_age=REPORT_MAX_AGE, clock=monotonic_time
+    ):
+        self._build = build
+        self._max_age = max_age
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._version = 0
+        self._report = None
+        self._report_version = None
+        self._report_time = None
+        self._monitor = None
+        self._thread = None
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def monitoring(self):
+        return self._monitor is not None
+
+    def get(self, force=False):
+        """
+        Return a copy of the networking report, building it if the cached
+        report is stale. If force is True, always build a new report.
+        """
+        with self._lock:
+            version = self._version
+            report = None if force else self._cached_report()
+
+        if report is None:
+            report = self._build()
+            with self._lock:
+                if self._version == version:
+                    self._report = report
+                    self._report_version = version
+                    self._report_time = self._clock()
+
+        return copy.deepcopy(report)
+
+    def invalidate(self):
+        """
+        Drop the cached report; the next get() builds a new report.
+        """
+        with self._lock:
+            self._version += 1
+
+    def start(self, groups=MONITOR_GROUPS):
+        mon = monitor.Monitor(groups=groups)
+        mon.start()
+        with self._lock:
+            self._monitor = mon
+            self._version += 1
+        self._thread = concurrent.thread(
+            self._run, args=(mon,), name='netinfo/cache'
+        )
+        self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            mon = self._monitor
+            self._monitor = None
+            self._version += 1
+        if mon is not None and not mon.is_stopped():
+            mon.stop()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, mon):
+        try:
+            for event in mon:
+                self.invalidate()
+        except monitor.MonitorError:
+            logging.exception(
+                'Netlink monitor failed, networking report cache disabled'
+            )
+        finally:
+            with self._lock:
+                if self._monitor is mon:
+                    self._monitor = None
+                self._version += 1
+            mon.wait()
+
+    def _cached_report(self):
+        if self._monitor is None or self._report_version != self._version:
+            return None
+        if self._clock() - self._report_time >= self._max_age:
+            return None
+        return self._report
+
+
+_report_cache = ReportCache()
+
+
+def start_monitoring():
+    """
+    Start serving cached networking reports, updated by netlink events.
+    """
+    _report_cache.start()
+
+
+def stop_monitoring():
+    _report_cache.stop()
+
+
+def invalidate():
+    """
+    Force a full resync of the cached networking report. Should be called
+    after changing configuration that is not reported by netlink events.
+    """
+    _report_cache.invalidate()
+
+
+def get(vdsmnets=None, compatibility=None, cached=False):
+    """
+    Return the networking report. If cached is True and vdsmnets is not
+    specified, the report may be served from memory.
+    """
+    if cached and vdsmnets is None:
+        report = _report_cache.get()
+    else:
+        report = _get(vdsmnets)
+
+    if compatibility is not None and compatibility < 30700:
         # REQUIRED_FOR engine < 3.7
-        return _stringify_mtus(_get(vdsmnets))
+        return _stringify_mtus(report)
 
-    return _get(vdsmnets)
+    return report
 
 
 def _stringify_mtus(netinfo_data):
@@ -35,6 +35,7 @@ from __future__ import division
 
 from ctypes import CDLL, CFUNCTYPE, sizeof, get_errno, byref
 from ctypes import c_char, c_char_p, c_int, c_void_p, c_size_t, py_object
+from ctypes import c_uint64
 
 from vdsm.common.cache import memoized
 from vdsm.network import py2to3
@@ -144,6 +145,18 @@ class IfaceStatus(object):
     IFF_ECHO = 1 << 18
 
 
+# include/netlink/route/link.h
+class RtnlLinkStat(object):
+    RX_PACKETS = 0
+    TX_PACKETS = 1
+    RX_BYTES = 2
+    TX_BYTES = 3
+    RX_ERRORS = 4
+    TX_ERRORS = 5
+    RX_DROPPED = 6
+    TX_DROPPED = 7
+
+
 # include/netlink/handlers.h
 class NlCbAction(object):
     NL_OK = 0  # Proceed with whatever would come next
@@ -783,6 +796,23 @@ def rtnl_link_get_operstate(link):
     return _rtnl_link_get_operstate(link)
 
 
+def rtnl_link_get_stat(link, stat_id):
+    """Return statistical counter of link object.
+
+    @arg link            Link object
+    @arg stat_id         Identifier of statistical counter (RtnlLinkStat)
+
+    The counters are taken from the 64 bit statistics (IFLA_STATS64) of the
+    link if the kernel provides them.
+
+    @return Value of counter or 0 if not specified.
+    """
+    _rtnl_link_get_stat = _libnl_route(
+        'rtnl_link_get_stat', c_uint64, c_void_p, c_int
+    )
+    return _rtnl_link_get_stat(link, stat_id)
+
+
 def rtnl_link_get_qdisc(link):
     """Return name of queueing discipline of link object.
 
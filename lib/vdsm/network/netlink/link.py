@@ -52,6 +52,21 @@ def iter_links():
                 link = libnl.nl_cache_get_next(link)
 
 
+def iter_links_stats():
+    """
+    Generator that yields a statistics dictionary for each link of the system,
+    using a single links dump. The dictionary includes the link name, index,
+    type (if known), flags, operstate and a 'stats' dictionary with the link
+    counters.
+    """
+    with _pool.socket() as sock:
+        with _nl_link_cache(sock) as cache:
+            link = libnl.nl_cache_get_first(cache)
+            while link:
+                yield _link_stats(link)
+                link = libnl.nl_cache_get_next(link)
+
+
 def is_link_up(link_flags, check_oper_status):
     """
     Check link status based on device status flags.
@@ -108,6 +123,34 @@ def _link_info(link, cache=None):
     return info
 
 
+_LINK_STATS = (
+    ('rx_bytes', libnl.RtnlLinkStat.RX_BYTES),
+    ('tx_bytes', libnl.RtnlLinkStat.TX_BYTES),
+    ('rx_dropped', libnl.RtnlLinkStat.RX_DROPPED),
+    ('tx_dropped', libnl.RtnlLinkStat.TX_DROPPED),
+    ('rx_errors', libnl.RtnlLinkStat.RX_ERRORS),
+    ('tx_errors', libnl.RtnlLinkStat.TX_ERRORS),
+)
+
+
+def _link_stats(link):
+    """Returns a dictionary with the statistics of the link object."""
+    info = {
+        'name': libnl.rtnl_link_get_name(link),
+        'index': libnl.rtnl_link_get_ifindex(link),
+        'flags': libnl.rtnl_link_get_flags(link),
+        'state': _link_state(link),
+        'stats': {
+            name: libnl.rtnl_link_get_stat(link, stat_id)
+            for name, stat_id in _LINK_STATS
+        },
+    }
+    link_type = libnl.rtnl_link_get_type(link)
+    if link_type is not None:
+        info['type'] = link_type
+    return info
+
+
 def _link_index_to_name(link_index, cache=None):
     """Returns the textual name of the link with index equal to link_index."""
     if cache is None:
@@ -51,6 +51,7 @@ from vdsm.network.link.setup import SetupBonds
 from vdsm.network.netinfo import bridges
 from vdsm.network.netinfo.cache import (
     get as netinfo_get,
+    invalidate as netinfo_invalidate,
     CachingNetInfo,
     NetInfo,
 )
@@ -150,10 +151,14 @@ def validate(networks, bondings, net_info):
 
 
 def setup(networks, bondings, options, net_info, in_rollback):
-    if nmstate.is_nmstate_backend():
-        _setup_nmstate(networks, bondings, options, in_rollback)
-    else:
-        _setup(networks, bondings, options, in_rollback, net_info)
+    try:
+        if nmstate.is_nmstate_backend():
+            _setup_nmstate(networks, bondings, options, in_rollback)
+        else:
+            _setup(networks, bondings, options, in_rollback, net_info)
+    finally:
+        # The running config is not reported by netlink events.
+        netinfo_invalidate()
 
     if options.get('commitOnSuccess'):
         persist()
@@ -486,15 +491,15 @@ def _gather_ovs_ifaces(nets2add, bonds2add, bonds2edit):
 
 
 def netcaps(compatibility):
-    net_caps = netinfo(compatibility=compatibility)
+    net_caps = netinfo(compatibility=compatibility, cached=True)
     _add_speed_device_info(net_caps)
     _add_bridge_opts(net_caps)
     return net_caps
 
 
-def netinfo(vdsmnets=None, compatibility=None):
+def netinfo(vdsmnets=None, compatibility=None, cached=False):
     # TODO: Version requests by engine to ease handling of compatibility.
-    _netinfo = netinfo_get(vdsmnets, compatibility)
+    _netinfo = netinfo_get(vdsmnets, compatibility, cached=cached)
 
     if _is_ovs_service_running():
         try:
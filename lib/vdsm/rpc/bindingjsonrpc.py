@@ -16,14 +16,19 @@
 
 from __future__ import absolute_import
 from __future__ import division
+import collections
 import functools
 import logging
+import threading
 
 from yajsonrpc import JsonRpcServer
 from yajsonrpc.stompserver import StompReactor
 
 from vdsm import executor
+from vdsm import metrics
 from vdsm.common import concurrent
+from vdsm.common import exception
+from vdsm.common.time import monotonic_time
 from vdsm.config import config
 
 
@@ -32,21 +37,254 @@ _TIMEOUT = config.getint('rpc', 'worker_timeout')
 _THREADS = config.getint('rpc', 'worker_threads')
 _TASK_PER_WORKER = config.getint('rpc', 'tasks_per_worker')
 _TASKS = _THREADS * _TASK_PER_WORKER
+_FAST_THREADS = config.getint('rpc', 'fast_worker_threads')
+
+# Interval in seconds for sending per method metrics.
+_METRICS_INTERVAL = 60
+
+
+def parse_methods(value):
+    """
+    Parse comma separated list of method names.
+    """
+    return [m.strip() for m in value.split(",") if m.strip()]
+
+
+def parse_limits(value):
+    """
+    Parse comma separated list of method:limit items, returning a dict
+    mapping method name to limit.
+    """
+    limits = {}
+    for item in parse_methods(value):
+        method, limit = item.rsplit(":", 1)
+        limits[method.strip()] = int(limit)
+    return limits
+
+
+class _MethodStats(object):
+
+    __slots__ = ("calls", "waiting", "pending", "running", "wait_time",
+                 "run_time")
+
+    def __init__(self):
+        # Number of completed requests.
+        self.calls = 0
+        # Requests waiting because the method reached its limit.
+        self.waiting = 0
+        # Requests dispatched to a worker, not started yet.
+        self.pending = 0
+        # Requests running now.
+        self.running = 0
+        # Total time in seconds requests waited before running.
+        self.wait_time = 0.0
+        # Total time in seconds requests were running.
+        self.run_time = 0.0
+
+    def info(self):
+        return {
+            "calls": self.calls,
+            "queued": self.waiting + self.pending,
+            "running": self.running,
+            "wait_time": self.wait_time,
+            "run_time": self.run_time,
+        }
+
+
+class RequestExecutor(object):
+    """
+    Serve JSON-RPC requests in worker threads.
+
+    Requests for fast methods are served by a separate executor, so
+    lightweight monitoring calls are never queued behind slow requests.
+
+    Methods with a limit run at most limit requests at the same time.
+    Requests exceeding the limit wait in a per method queue, and are
+    dispatched when the previous request of the same method completes, so
+    slow methods cannot occupy all the workers.
+    """
+
+    _log = logging.getLogger("jsonrpc.RequestExecutor")
+
+    def __init__(self, scheduler, workers, max_tasks, fast_workers,
+                 fast_methods=(), limits=None, timeout=None,
+                 clock=monotonic_time):
+        self._scheduler = scheduler
+        self._executor = executor.Executor(name="jsonrpc",
+                                           workers_count=workers,
+                                           max_tasks=max_tasks,
+                                           scheduler=scheduler)
+        self._fast_executor = executor.Executor(name="jsonrpc-fast",
+                                                workers_count=fast_workers,
+                                                max_tasks=max_tasks,
+                                                scheduler=scheduler)
+        self._fast_methods = frozenset(fast_methods)
+        self._limits = limits or {}
+        self._max_tasks = max_tasks
+        self._timeout = timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._waiting = {}
+        self._report_call = None
+
+    def start(self):
+        self._executor.start()
+        self._fast_executor.start()
+        with self._lock:
+            self._schedule_report()
+
+    def stop(self):
+        with self._lock:
+            if self._report_call is not None:
+                self._report_call.cancel()
+                self._report_call = None
+            self._waiting.clear()
+        self._fast_executor.stop()
+        self._executor.stop()
+
+    def dispatch(self, task):
+        """
+        Dispatch a task serving a request. The task must have a "method"
+        attribute.
+
+        Raises exception.ResourceExhausted if there are too many requests
+        waiting.
+        """
+        method = task.method
+        queued = self._clock()
+
+        with self._lock:
+            stats = self._stats.get(method)
+            if stats is None:
+                stats = self._stats[method] = _MethodStats()
+
+            limit = self._limits.get(method)
+            if limit is not None and stats.pending + stats.running >= limit:
+                if stats.waiting >= self._max_tasks:
+                    raise exception.ResourceExhausted(
+                        "Too many requests",
+                        resource=method,
+                        current_tasks=stats.waiting)
+                waiting = self._waiting.setdefault(method, collections.deque())
+                waiting.append((task, queued))
+                stats.waiting += 1
+                return
+
+            stats.pending += 1
+
+        try:
+            self._dispatch(task, queued)
+        except Exception:
+            with self._lock:
+                stats.pending -= 1
+            raise
+
+    def stats(self):
+        """
+        Return dict mapping method name to method stats.
+        """
+        with self._lock:
+            return {method: stats.info()
+                    for method, stats in self._stats.items()}
+
+    def _dispatch(self, task, queued):
+        if task.method in self._fast_methods:
+            ex = self._fast_executor
+        else:
+            ex = self._executor
+        ex.dispatch(functools.partial(self._run, task, queued),
+                    timeout=self._timeout, discard=False)
+
+    def _run(self, task, queued):
+        while task is not None:
+            task, queued = self._serve(task, queued)
+            if task is None:
+                break
+            # Serve the next waiting request in its own executor task, so
+            # this worker is available for other requests.
+            try:
+                self._dispatch(task, queued)
+                break
+            except Exception as e:
+                # The waiting request must be served; run it in this
+                # worker.
+                self._log.warning("Cannot dispatch waiting task %s, "
+                                  "running in current worker: %s", task, e)
+
+    def _serve(self, task, queued):
+        """
+        Serve task, returning the next waiting task of the same method and
+        its queued time, or (None, None).
+        """
+        method = task.method
+        start = self._clock()
+        with self._lock:
+            stats = self._stats[method]
+            stats.pending -= 1
+            stats.running += 1
+            stats.wait_time += start - queued
+
+        try:
+            task()
+        except Exception:
+            self._log.exception("Unhandled exception in %s", task)
+        finally:
+            end = self._clock()
+            with self._lock:
+                stats.running -= 1
+                stats.calls += 1
+                stats.run_time += end - start
+                next_task = self._next_waiting(method, stats)
+        return next_task
+
+    def _next_waiting(self, method, stats):
+        """
+        Must be called when holding the lock.
+        """
+        waiting = self._waiting.get(method)
+        if not waiting:
+            return None, None
+        task, queued = waiting.popleft()
+        stats.waiting -= 1
+        stats.pending += 1
+        return task, queued
+
+    def _schedule_report(self):
+        """
+        Must be called when holding the lock.
+        """
+        self._report_call = self._scheduler.schedule(
+            _METRICS_INTERVAL, self._report_stats)
+
+    def _report_stats(self):
+        report = {}
+        for method, info in self.stats().items():
+            prefix = "hosts.vdsm.rpc." + method
+            for key, value in info.items():
+                report[prefix + "." + key] = value
+        metrics.send(report)
+
+        with self._lock:
+            if self._report_call is not None:
+                self._schedule_report()
 
 
 class BindingJsonRpc(object):
     log = logging.getLogger('BindingJsonRpc')
 
     def __init__(self, bridge, subs, timeout, scheduler, cif):
-        self._executor = executor.Executor(name="jsonrpc",
-                                           workers_count=_THREADS,
-                                           max_tasks=_TASKS,
-                                           scheduler=scheduler)
+        self._executor = RequestExecutor(
+            scheduler,
+            workers=_THREADS,
+            max_tasks=_TASKS,
+            fast_workers=_FAST_THREADS,
+            fast_methods=parse_methods(config.get('rpc', 'fast_methods')),
+            limits=parse_limits(config.get('rpc', 'method_limits')),
+            timeout=_TIMEOUT)
         self._bridge = bridge
         self._server = JsonRpcServer(
-            bridge, timeout, cif,
-            functools.partial(self._executor.dispatch,
-                              timeout=_TIMEOUT, discard=False))
+            bridge, timeout, cif, self._executor.dispatch)
         self._reactor = StompReactor(subs)
         self.startReactor()
 
@@ -41,6 +41,7 @@ from vdsm.common import concurrent
 from vdsm.common import exception
 from vdsm.common import proc
 from vdsm.common.threadlocal import vars
+from vdsm.common.time import monotonic_time
 from vdsm.common.units import KiB, MiB
 from vdsm.config import config
 from vdsm import constants
@@ -160,6 +161,9 @@ METADATA_BASE_V5 = MiB
 # Size of metadata slot in v5
 METADATA_SLOT_SIZE_V5 = 8 * KiB
 
+# Maximum size of a single read when reading volumes metadata in bulk.
+METADATA_READ_SIZE = MiB
+
 
 def encodePVInfo(pvInfo):
     return (
@@ -232,7 +236,7 @@ def _getVolsTree(sdUUID):
     return vols
 
 
-def getAllVolumes(sdUUID):
+def getAllVolumes(sdUUID, parents=None):
     """
     Return dict {volUUID: ((imgUUIDs,), parentUUID)} of the domain.
 
@@ -240,8 +244,14 @@ def getAllVolumes(sdUUID):
     For template based volumes, the first image is the template's image.
     For other volumes, there is just a single imageUUID.
     Template self image is the 1st term in template volume entry images.
+
+    parents is an optional dict {volUUID: parentUUID} overriding the
+    volumes parent tags.
     """
     vols = _getVolsTree(sdUUID)
+    if parents:
+        vols = {name: vol._replace(parent=parents.get(name, vol.parent))
+                for name, vol in six.iteritems(vols)}
     res = {}
     for volName in vols:
         res[volName] = {'imgs': [], 'parent': None}
@@ -612,6 +622,39 @@ class BlockStorageDomainManifest(sd.StorageDomainManifest):
         """
         return blockVolume.BlockVolumeManifest
 
+    def image_chain(self, imgUUID):
+        """
+        Return sd.ImageChain of image imgUUID.
+
+        The image volumes are found using the volumes image tags. The parent
+        of every volume is read from the volume metadata, since the parent
+        tag is not updated when syncVolumeChain() modifies the chain on a
+        host which is not the SPM. The parent tag is used only if the volume
+        metadata cannot be read.
+        """
+        vols = _getVolsTree(self.sdUUID)
+        parents = {vol.name: vol.parent for vol in six.itervalues(vols)
+                   if vol.image == imgUUID}
+
+        metadata = self.volumes_metadata(imgUUID, parents)
+        for vol_id, md in six.iteritems(metadata):
+            if md.puuid != parents[vol_id]:
+                self.log.debug("Volume %s parent tag %s does not match "
+                               "metadata parent %s, using metadata",
+                               vol_id, parents[vol_id], md.puuid)
+                parents[vol_id] = md.puuid
+
+        return sd.ImageChain(imgUUID, parents, external=vols)
+
+    def volumes_metadata(self, imgUUID, vol_ids):
+        """
+        Return dict mapping volume id to VolumeMetadata for volumes vol_ids,
+        reading the metadata of all volumes using few large reads.
+        """
+        slots = self._volumes_slots()
+        return self.read_volumes_metadata(
+            {vol_id: slots[vol_id] for vol_id in vol_ids if vol_id in slots})
+
     def _getImgExclusiveVols(self, imgUUID, volsImgs):
         """Filter vols belonging to imgUUID only."""
         exclusives = dict((vName, v) for vName, v in six.iteritems(volsImgs)
@@ -704,7 +747,7 @@ class BlockStorageDomainManifest(sd.StorageDomainManifest):
         """
         vols = {}  # The "legal" volumes: not half deleted/removed volumes.
         remnants = {}  # Volumes which are part of failed image deletes.
-        allVols = getAllVolumes(self.sdUUID)
+        allVols = getAllVolumes(self.sdUUID, parents=self._metadata_parents())
         for volName, ip in six.iteritems(allVols):
             if (volName.startswith(sc.REMOVED_IMAGE_PREFIX) or
                     ip.imgs[0].startswith(sc.REMOVED_IMAGE_PREFIX)):
@@ -720,6 +763,24 @@ class BlockStorageDomainManifest(sd.StorageDomainManifest):
         vols, rems = self.getAllVolumesImages()
         return vols
 
+    def _metadata_parents(self):
+        """
+        Return dict mapping volume id to parent id for all volumes, read from
+        the volumes metadata using few large reads. The parent tag is not
+        updated when syncVolumeChain() modifies the chain on a host which is
+        not the SPM, so the metadata parent is preferred.
+
+        Returns empty dict if the volumes metadata cannot be read, so the
+        parent tags are used.
+        """
+        try:
+            metadata = self.read_volumes_metadata(self._volumes_slots())
+        except Exception:
+            self.log.warning("Cannot read domain %s volumes metadata, using "
+                             "parent tags", self.sdUUID, exc_info=True)
+            return {}
+        return {vol_id: md.puuid for vol_id, md in six.iteritems(metadata)}
+
     def getAllImages(self):
         """
         Get the set of all images uuids in the SD.
@@ -781,8 +842,15 @@ class BlockStorageDomainManifest(sd.StorageDomainManifest):
         return free_slot
 
     def occupied_metadata_slots(self):
+        return sorted(six.itervalues(self._volumes_slots()))
+
+    def _volumes_slots(self):
+        """
+        Return dict mapping volume id to metadata slot for all volumes with
+        metadata mapping.
+        """
         stripPrefix = lambda s, pfx: s[len(pfx):]
-        occupiedSlots = []
+        slots = {}
         special_lvs = self.special_volumes(self.getVersion())
         for lv in lvm.getLV(self.sdUUID):
             if lv.name in special_lvs:
@@ -804,10 +872,9 @@ class BlockStorageDomainManifest(sd.StorageDomainManifest):
                                  self.sdUUID, lv.name)
                 continue
 
-            occupiedSlots.append(offset)
+            slots[lv.name] = offset
 
-        occupiedSlots.sort()
-        return occupiedSlots
+        return slots
 
     def _first_available_slot(self):
         version = self.getVersion()
@@ -902,11 +969,94 @@ class BlockStorageDomainManifest(sd.StorageDomainManifest):
         """
         Reads metadata block from storage.
         """
-        # Function readblock is used here intentionally as it supports
-        # short reads while DirectFile read doesn't.
-        return misc.readblock(self.metadata_volume_path(),
-                              self.metadata_offset(slot),
-                              sc.METADATA_SIZE)
+        with directio.open(self.metadata_volume_path(), "r") as f:
+            return self._read_metadata(
+                f, self.metadata_offset(slot), sc.METADATA_SIZE)
+
+    def read_metadata_blocks(self, slots):
+        """
+        Read metadata blocks of slots from storage, using one read for
+        adjacent slots up to METADATA_READ_SIZE bytes.
+
+        Returns dict mapping slot to metadata block.
+        """
+        blocks = {}
+        slots = sorted(slots)
+        if not slots:
+            return blocks
+
+        version = self.getVersion()
+        offsets = [self.metadata_offset(slot, version=version)
+                   for slot in slots]
+
+        with directio.open(self.metadata_volume_path(), "r") as f:
+            start = 0
+            while start < len(slots):
+                base = offsets[start]
+                end = start + 1
+                while (end < len(slots) and
+                       offsets[end] + sc.METADATA_SIZE - base <=
+                       METADATA_READ_SIZE):
+                    end += 1
+
+                data = self._read_metadata(
+                    f, base, offsets[end - 1] + sc.METADATA_SIZE - base)
+
+                for i in range(start, end):
+                    offset = offsets[i] - base
+                    slot = slots[i]
+                    blocks[slot] = data[offset:offset + sc.METADATA_SIZE]
+
+                start = end
+
+        return blocks
+
+    def _read_metadata(self, f, offset, size):
+        """
+        Read size bytes at offset from metadata volume file f. Returns less
+        data if the volume is too short.
+        """
+        f.seek(offset)
+        data = f.read(size)
+        if len(data) == size:
+            return data
+
+        # Short read, continue reading until end of file.
+        buf = bytearray(data)
+        while len(data) and len(buf) % sc.BLOCK_SIZE_512 == 0:
+            data = f.read(size - len(buf))
+            buf += data
+            if len(buf) == size:
+                break
+        return bytes(buf)
+
+    def read_volumes_metadata(self, slots):
+        """
+        Read the metadata of volumes from storage, using few large reads
+        instead of a read per volume.
+
+        Arguments:
+            slots (dict): mapping of volume id to metadata slot, as returned
+                by _volumes_slots().
+
+        Returns dict mapping volume id to VolumeMetadata for volumes with
+        valid metadata.
+        """
+        start = monotonic_time()
+        blocks = self.read_metadata_blocks(six.itervalues(slots))
+        metadata = {}
+        for vol_id, slot in six.iteritems(slots):
+            lines = blocks[slot].rstrip(b"\0").splitlines()
+            try:
+                metadata[vol_id] = VolumeMetadata.from_lines(lines)
+            except (se.MetaDataKeyNotFoundError, ValueError) as e:
+                self.log.warning(
+                    "Ignoring volume %s invalid metadata in slot %s: %s",
+                    vol_id, slot, e)
+
+        self.log.debug("Read %d volumes metadata in %.3f seconds",
+                       len(metadata), monotonic_time() - start)
+        return metadata
 
     def write_metadata_block(self, slot, data):
         """
@@ -27,25 +27,45 @@ CheckService     entry point for starting and stopping path checkers.
 DirectioChecker  checker using dd process for file or block based
                  volumes.
 
+ReaderChecker    checker reading file or block based volumes in the
+                 current process, using a DirectReader.
+
+DirectReader     pool of threads performing blocking direct I/O reads.
+
 CheckResult      result object provided to user callback on each check.
 """
 
 from __future__ import absolute_import
 
+import collections
+import io
 import logging
+import mmap
+import os
 import re
 import threading
 
+from vdsm import utils
 from vdsm.common import constants
 from vdsm.common import cmdutils
 from vdsm.common import concurrent
+from vdsm.common import time
 from vdsm.common.compat import subprocess
+from vdsm.common.osutils import uninterruptible
+from vdsm.config import config
 from vdsm.storage import asyncevent
 from vdsm.storage import asyncutils
 from vdsm.storage import exception
 
 EXEC_ERROR = 127
 
+# Check methods
+READ = "read"
+DD = "dd"
+
+# Size of the block read by checkers.
+CHECK_BLOCK_SIZE = 4096
+
 _log = logging.getLogger("storage.check")
 
 
@@ -77,18 +97,24 @@ class CheckService(object):
 
     """
 
-    def __init__(self):
+    def __init__(self, method=None):
+        if method is None:
+            method = config.get("irs", "check_method")
+        if method not in (READ, DD):
+            raise ValueError("Unsupported check method: %r" % method)
+        self._method = method
         self._lock = threading.Lock()
         self._loop = asyncevent.EventLoop()
         self._thread = concurrent.thread(self._loop.run_forever,
                                          name="check/loop")
+        self._reader = DirectReader() if method == READ else None
         self._checkers = {}
 
     def start(self):
         """
         Start the service thread.
         """
-        _log.info("Starting check service")
+        _log.info("Starting check service (method=%s)", self._method)
         self._thread.start()
 
     def stop(self):
@@ -109,6 +135,8 @@ class CheckService(object):
             self._loop.call_soon_threadsafe(self._loop.stop)
             self._thread.join()
             self._loop.close()
+            if self._reader:
+                self._reader.stop()
 
     def start_checking(self, path, complete, interval=10.0):
         """
@@ -122,8 +150,12 @@ class CheckService(object):
         with self._lock:
             if path in self._checkers:
                 raise RuntimeError("Already checking path %r" % path)
-            checker = DirectioChecker(self._loop, path, complete,
-                                      interval=interval)
+            if self._method == READ:
+                checker = ReaderChecker(self._loop, path, complete,
+                                        self._reader, interval=interval)
+            else:
+                checker = DirectioChecker(self._loop, path, complete,
+                                          interval=interval)
             self._checkers[path] = checker
         self._loop.call_soon_threadsafe(checker.start)
 
@@ -149,63 +181,14 @@ RUNNING = "running"
 STOPPING = "stopping"
 
 
-class DirectioChecker(object):
+class Checker(object):
     """
-    Check path availability using direct I/O.
-
-    DirectioChecker is created with a complete callback.  Each time a check
-    cycle is completed, the complete callback will be invoked with a
-    CheckResult instance.
-
-    CheckResult provides a delay() method returning the read delay in
-    seconds. If the check failed, the delay() method will raise the
-    appropriate exception that can be reported to engine.
-
-    Note that the complete callback must not block as it will block the entire
-    event loop thread.
-
-    The checker runs exactly every interval seconds. If a check did not
-    complete before the next check is scheduled, the next check will be delayed
-    to the next interval.
-
-    Checker is not thread safe. Use EventLoop.call_soon_threadsafe() to start
-    or stop a checker. The only thread safe method is wait().
-
-    Usage::
-
-        # Start the event loop thread
-
-        loop = asyncevent.EventLoop()
-        concurrent.thread(loop.run_forever).start()
-
-        # The complete callback
-
-        def complete(result):
-            try:
-                check_delay = result.delay()
-            except Exception as e:
-                check_error = e
-            check_time = time.time()
-
-        # Start a checker on the event loop thread
-
-        checker = DirectioChecker(loop, path, complete)
-        loop.call_soon_threadsafe(checker.start)
-
-        ...
-
-        # Stop a checker from another thread
-
-        loop.call_soon_threadsafe(checker.stop)
-
-        # If needed, wait until a checker actually stopped.
-
-        checker.wait(30)
+    Base class for path checkers, running a check every interval seconds.
 
+    Subclasses implement _start_check(), and call _check_completed() when a
+    check has completed.
     """
 
-    log = logging.getLogger("storage.directiochecker")
-
     def __init__(self, loop, path, complete, interval=10.0):
         self._loop = loop
         self._path = path
@@ -213,14 +196,12 @@ class DirectioChecker(object):
         self._interval = interval
         self._looper = asyncutils.LoopingCall(loop, self._check)
         self._check_time = None
-        self._proc = None
-        self._reader = None
-        self._reaper = None
-        self._err = None
         self._state = IDLE
         self._stopped = threading.Event()
-        # Set to True when the underlying dd process has terminated, or when
-        # the read has timed out.
+        # Set to True while a check is in progress.
+        self._active = False
+        # Set to True when the check has completed, or when the read has timed
+        # out.
         self._completed = False
 
     def start(self):
@@ -251,7 +232,7 @@ class DirectioChecker(object):
         _log.debug("Checker %r stopping", self._path)
         self._state = STOPPING
         self._looper.stop()
-        if self._proc is None:
+        if not self._active:
             self._stop_completed()
 
     def wait(self, timeout=None):
@@ -276,7 +257,7 @@ class DirectioChecker(object):
         the checker is stopped.
         """
         assert self._state is RUNNING
-        if self._proc:
+        if self._active:
             if self._completed:
                 _log.warning("Checker %r is blocked for %.2f seconds",
                              self._path, self._loop.time() - self._check_time)
@@ -287,30 +268,19 @@ class DirectioChecker(object):
         self._check_time = self._loop.time()
         _log.debug("START check %r (delay=%.2f)",
                    self._path, self._check_time - self._looper.deadline)
-        try:
-            self._start_process()
-        except Exception as e:
-            self._err = "Error starting process: %s" % e
-            self._check_completed(EXEC_ERROR)
+        self._active = True
+        self._start_check()
 
-    def _start_process(self):
+    def _start_check(self):
         """
-        Starts a dd process performing direct I/O to path, reading the process
-        stderr. When stderr has closed, _read_completed will be called.
+        Start a check, calling _check_completed() when the check completes.
         """
-        cmd = [constants.EXT_DD, "if=%s" % self._path, "of=/dev/null",
-               "bs=4096", "count=1", "iflag=direct"]
-        cmd = cmdutils.wrap_command(cmd)
-        self._proc = subprocess.Popen(
-            cmd, stdin=None, stdout=None,
-            stderr=subprocess.PIPE)
-        self._reader = self._loop.create_dispatcher(
-            asyncevent.BufferedReader, self._proc.stderr, self._read_completed)
+        raise NotImplementedError
 
     def _read_timeout(self):
         """
-        Called when the underlying dd process did not complete within the check
-        interval. The complete callback is invoked with an error.
+        Called when the check did not complete within the check interval. The
+        complete callback is invoked with an error.
         """
         assert self._state is not IDLE
         self._completed = True
@@ -324,30 +294,14 @@ class DirectioChecker(object):
         except Exception:
             _log.exception("Unhandled error in complete callback")
 
-    def _read_completed(self, data):
-        """
-        Called when dd process has closed stderr. At this point the process may
-        be still running.
-        """
-        assert self._state is not IDLE
-        self._reader = None
-        self._err = data
-        rc = self._proc.poll()
-        # About 95% of runs, the process has terminated at this point. If not,
-        # start the reaper to wait for it.
-        if rc is None:
-            self._reaper = asyncevent.Reaper(self._loop, self._proc,
-                                             self._check_completed)
-            return
-        self._check_completed(rc)
-
-    def _check_completed(self, rc):
+    def _check_completed(self, rc, err, read_delay=None):
         """
-        Called when the dd process has exited with exit code rc.
+        Called when the check has completed with exit code rc and error err.
+        If read_delay is set, the check was successful and it is the time in
+        seconds to read from path.
         """
         assert self._state is not IDLE
-        self._reaper = None
-        self._proc = None
+        self._active = False
         if self._state is STOPPING:
             self._stop_completed()
             return
@@ -357,8 +311,8 @@ class DirectioChecker(object):
         elapsed = self._loop.time() - self._check_time
         _log.debug("FINISH check %r (rc=%s, elapsed=%.02f)",
                    self._path, rc, elapsed)
-        result = CheckResult(self._path, rc, self._err, self._check_time,
-                             elapsed)
+        result = CheckResult(self._path, rc, err, self._check_time,
+                             elapsed, read_delay=read_delay)
         try:
             self._complete(result)
         except Exception:
@@ -373,22 +327,258 @@ class DirectioChecker(object):
         return "<%s at 0x%x>" % (" ".join(info), id(self))
 
 
+class DirectioChecker(Checker):
+    """
+    Check path availability using direct I/O.
+
+    DirectioChecker is created with a complete callback.  Each time a check
+    cycle is completed, the complete callback will be invoked with a
+    CheckResult instance.
+
+    CheckResult provides a delay() method returning the read delay in
+    seconds. If the check failed, the delay() method will raise the
+    appropriate exception that can be reported to engine.
+
+    Note that the complete callback must not block as it will block the entire
+    event loop thread.
+
+    The checker runs exactly every interval seconds. If a check did not
+    complete before the next check is scheduled, the next check will be delayed
+    to the next interval.
+
+    Checker is not thread safe. Use EventLoop.call_soon_threadsafe() to start
+    or stop a checker. The only thread safe method is wait().
+
+    Usage::
+
+        # Start the event loop thread
+
+        loop = asyncevent.EventLoop()
+        concurrent.thread(loop.run_forever).start()
+
+        # The complete callback
+
+        def complete(result):
+            try:
+                check_delay = result.delay()
+            except Exception as e:
+                check_error = e
+            check_time = time.time()
+
+        # Start a checker on the event loop thread
+
+        checker = DirectioChecker(loop, path, complete)
+        loop.call_soon_threadsafe(checker.start)
+
+        ...
+
+        # Stop a checker from another thread
+
+        loop.call_soon_threadsafe(checker.stop)
+
+        # If needed, wait until a checker actually stopped.
+
+        checker.wait(30)
+
+    """
+
+    log = logging.getLogger("storage.directiochecker")
+
+    def __init__(self, loop, path, complete, interval=10.0):
+        super(DirectioChecker, self).__init__(
+            loop, path, complete, interval=interval)
+        self._proc = None
+        self._reader = None
+        self._reaper = None
+        self._err = None
+
+    def _start_check(self):
+        try:
+            self._start_process()
+        except Exception as e:
+            self._err = "Error starting process: %s" % e
+            self._process_completed(EXEC_ERROR)
+
+    def _start_process(self):
+        """
+        Starts a dd process performing direct I/O to path, reading the process
+        stderr. When stderr has closed, _read_completed will be called.
+        """
+        cmd = [constants.EXT_DD, "if=%s" % self._path, "of=/dev/null",
+               "bs=%d" % CHECK_BLOCK_SIZE, "count=1", "iflag=direct"]
+        cmd = cmdutils.wrap_command(cmd)
+        self._proc = subprocess.Popen(
+            cmd, stdin=None, stdout=None,
+            stderr=subprocess.PIPE)
+        self._reader = self._loop.create_dispatcher(
+            asyncevent.BufferedReader, self._proc.stderr, self._read_completed)
+
+    def _read_completed(self, data):
+        """
+        Called when dd process has closed stderr. At this point the process may
+        be still running.
+        """
+        assert self._state is not IDLE
+        self._reader = None
+        self._err = data
+        rc = self._proc.poll()
+        # About 95% of runs, the process has terminated at this point. If not,
+        # start the reaper to wait for it.
+        if rc is None:
+            self._reaper = asyncevent.Reaper(self._loop, self._proc,
+                                             self._process_completed)
+            return
+        self._process_completed(rc)
+
+    def _process_completed(self, rc):
+        """
+        Called when the dd process has exited with exit code rc.
+        """
+        self._reaper = None
+        self._proc = None
+        self._check_completed(rc, self._err)
+
+
+class ReaderChecker(Checker):
+    """
+    Check path availability using direct I/O in the current process.
+
+    Like DirectioChecker, but instead of running a dd process for every
+    check, the path is read by a DirectReader thread, and the result is
+    passed back to the event loop thread.
+
+    If storage is not responsive, a check may block the reader thread for
+    long time. The reader starts new threads as needed, so a blocked check
+    blocks only its own checker.
+    """
+
+    def __init__(self, loop, path, complete, reader, interval=10.0):
+        super(ReaderChecker, self).__init__(
+            loop, path, complete, interval=interval)
+        self._reader = reader
+
+    def _start_check(self):
+        try:
+            self._reader.read(self._path, self._read_completed)
+        except Exception as e:
+            self._check_completed(EXEC_ERROR, "Error starting read: %s" % e)
+
+    def _read_completed(self, read_delay, err):
+        """
+        Called in the reader thread when the read has completed.
+        """
+        self._loop.call_soon_threadsafe(
+            self._reader_completed, read_delay, err)
+
+    def _reader_completed(self, read_delay, err):
+        if err is None:
+            self._check_completed(0, None, read_delay=read_delay)
+        else:
+            self._check_completed(1, err)
+
+
+class DirectReader(object):
+    """
+    Pool of threads performing blocking direct I/O reads.
+
+    Reads are performed by idle threads. If no thread is idle, a new thread
+    is started, so a read blocked on inaccessible storage does not delay
+    other reads. Threads exit when there are more than max_idle idle threads.
+    """
+
+    def __init__(self, max_idle=4):
+        self._max_idle = max_idle
+        self._cond = threading.Condition(threading.Lock())
+        self._requests = collections.deque()
+        self._idle = 0
+        self._running = True
+
+    def read(self, path, callback):
+        """
+        Read the first block of path using direct I/O, and call
+        callback(read_delay, err) in the reader thread when the read has
+        completed. On success err is None, on failure it describes the error.
+        """
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Reader is stopped")
+            self._requests.append((path, callback))
+            if self._idle >= len(self._requests):
+                self._cond.notify()
+                return
+        t = concurrent.thread(self._run, name="check/reader", log=_log)
+        t.start()
+
+    def stop(self):
+        """
+        Stop idle threads. Threads blocked on storage will exit when the read
+        completes.
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._requests:
+                    if not self._running or self._idle >= self._max_idle:
+                        return
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                path, callback = self._requests.popleft()
+            read_delay, err = read_block(path)
+            try:
+                callback(read_delay, err)
+            except Exception:
+                _log.exception("Unhandled error in read callback")
+
+
+def read_block(path, size=CHECK_BLOCK_SIZE):
+    """
+    Read the first block of path using direct I/O, like dd does.
+
+    Returns tuple (read_delay, err). On success, read_delay is the time in
+    seconds to read the block and err is None. On failure read_delay is None
+    and err describes the error.
+    """
+    buf = mmap.mmap(-1, size, mmap.MAP_SHARED)
+    with utils.closing(buf, log=_log.name):
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_DIRECT)
+        except EnvironmentError as e:
+            return None, "failed to open %r: %s" % (path, e.strerror)
+        with io.FileIO(fd, "r", closefd=True) as f:
+            start = time.monotonic_time()
+            try:
+                uninterruptible(f.readinto, buf)
+            except EnvironmentError as e:
+                return None, "error reading %r: %s" % (path, e.strerror)
+            return time.monotonic_time() - start, None
+
+
 class CheckResult(object):
 
     _PATTERN = re.compile(br".*, ([\de\-.]+) s,[^,]+")
 
-    def __init__(self, path, rc, err, time, elapsed):
+    def __init__(self, path, rc, err, time, elapsed, read_delay=None):
         self.path = path
         self.rc = rc
         self.err = err
         self.time = time
         self.elapsed = elapsed
+        # Set by checkers measuring the read delay, instead of parsing dd
+        # output.
+        self.read_delay = read_delay
 
     def delay(self):
         # TODO: Raising MiscFileReadException for all errors to keep the old
         # behavior. Should probably use StorageDomainAccessError.
         if self.rc != 0:
             raise exception.MiscFileReadException(self.path, self.rc, self.err)
+        if self.read_delay is not None:
+            return self.read_delay
         if not self.err:
             raise exception.MiscFileReadException(self.path, "no stats")
         stats = self.err.splitlines()[-1]
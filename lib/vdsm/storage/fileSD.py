@@ -47,6 +47,7 @@ from vdsm.storage import outOfProcess as oop
 from vdsm.storage import sd
 from vdsm.storage import xlease
 from vdsm.storage.persistent import PersistentDict, DictValidator
+from vdsm.storage.volumemetadata import VolumeMetadata
 
 from vdsm import constants
 from vdsm.storage.constants import LEASE_FILEEXT, UUID_GLOB_PATTERN
@@ -217,6 +218,32 @@ class FileStorageDomainManifest(sd.StorageDomainManifest):
         """
         return fileVolume.FileVolumeManifest
 
+    def image_chain(self, imgUUID):
+        """
+        Return sd.ImageChain of image imgUUID, reading every volume metadata
+        in the image directory once.
+
+        The image directory contains also the template volume metadata, linked
+        from the template image directory.
+        """
+        img_dir = self.getImagePath(imgUUID)
+        pattern = os.path.join(glob_escape(img_dir), "*.meta")
+        parents = {}
+        external = []
+        for meta_path in self.oop.glob.glob(pattern):
+            vol_id = os.path.splitext(os.path.basename(meta_path))[0]
+            try:
+                data = self.oop.readFile(meta_path, direct=True)
+            except Exception as e:
+                self.log.error(e, exc_info=True)
+                raise se.VolumeMetadataReadError("%s: %s" % (meta_path, e))
+            md = VolumeMetadata.from_lines(data.rstrip(b"\0").splitlines())
+            if md.image == imgUUID:
+                parents[vol_id] = md.puuid
+            else:
+                external.append(vol_id)
+        return sd.ImageChain(imgUUID, parents, external=external)
+
     def getDeletedImagePath(self, imgUUID):
         currImgDir = self.getImagePath(imgUUID)
         dirName, baseName = os.path.split(currImgDir)
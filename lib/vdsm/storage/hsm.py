@@ -1975,7 +1975,8 @@ class HSM(object):
         return dict(devList=devices)
 
     def _getDeviceList(self, storageType=None, guids=(), checkStatus=True):
-        sdCache.refreshStorage()
+        # Refresh only the requested devices, if specified.
+        sdCache.refreshStorage(guids=guids or ())
         typeFilter = lambda dev: True
         if storageType:
             if sd.storageType(storageType) == sd.type2name(sd.ISCSI_DOMAIN):
@@ -2253,6 +2254,16 @@ class HSM(object):
         ret = self.taskMng.getAllTasks()
         return dict(tasks=ret)
 
+    @public
+    def getResourceStats(self):
+        """
+        Get the resource manager contention statistics.
+
+        :returns: A dict of statistics for each resource namespace.
+        :rtype: dict
+        """
+        return dict(stats=rm.getStats())
+
     @public
     def stopTask(self, taskID, spUUID=None, options=None):
         """
@@ -2426,11 +2437,11 @@ class HSM(object):
 
             res.append({'id': conDef["id"], 'status': status})
 
-        # In case there were changes in devices size
-        # while the VDSM was not connected, we need to
-        # call refreshStorage.
+        # Rescan to find the new devices. Devices are resized when
+        # producing the domains using them, in case their size changed
+        # while the VDSM was not connected.
         if domType in (sd.FCP_DOMAIN, sd.ISCSI_DOMAIN):
-            sdCache.refreshStorage()
+            sdCache.refreshStorage(resize=False)
 
         for conObj in connections:
             try:
@@ -3209,8 +3220,12 @@ class HSM(object):
         if leafUUID not in imgVolumes:
             raise se.VolumeDoesNotExist(leafUUID)
 
+        metadata = dom.volumes_metadata(imgUUID, imgVolumes)
         for volUUID in imgVolumes:
-            legality = dom.produceVolume(imgUUID, volUUID).getLegality()
+            if volUUID in metadata:
+                legality = metadata[volUUID].legality
+            else:
+                legality = dom.produceVolume(imgUUID, volUUID).getLegality()
             if legality == sc.ILLEGAL_VOL:
                 if allowIllegal:
                     self.log.info("Preparing illegal volume %s", leafUUID)
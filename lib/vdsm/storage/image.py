@@ -157,6 +157,34 @@ class Image:
         Return the chain of volumes of image as a sorted list
         (not including a shared base (template) if any)
         """
+        dom = sdCache.produce(sdUUID)
+        return self._getChain(dom, dom.image_chain(imgUUID), volUUID)
+
+    def _getChain(self, dom, image_chain, volUUID=None):
+        """
+        Return the chain of volumes using image_chain, the volumes graph of the
+        image. If the chain cannot be resolved from the graph, fall back to
+        walking the chain using the volumes metadata.
+        """
+        imgUUID = image_chain.img_id
+        if volUUID is None and not image_chain.parents:
+            raise se.ImageDoesNotExistInSD(imgUUID, dom.sdUUID)
+
+        vol_ids = image_chain.chain(volUUID)
+        if vol_ids is None:
+            self.log.debug("Cannot resolve chain from %s, reading volumes "
+                           "metadata", image_chain)
+            return self._walkChain(dom.sdUUID, imgUUID, volUUID)
+
+        volclass = dom.getVolumeClass()
+        return [volclass(self.repoPath, dom.sdUUID, imgUUID, vol_id)
+                for vol_id in vol_ids]
+
+    def _walkChain(self, sdUUID, imgUUID, volUUID=None):
+        """
+        Return the chain of volumes of image, walking the chain using the
+        volumes metadata.
+        """
         chain = []
         volclass = sdCache.produce(sdUUID).getVolumeClass()
 
@@ -278,14 +306,17 @@ class Image:
                                    "%s", volParams['imgUUID'], destDom.sdUUID,
                                    exc_info=True)
 
-    def isLegal(self, sdUUID, imgUUID):
+    def isLegal(self, sdUUID, imgUUID, image_chain=None):
         """
         Check correctness of the whole chain (excluding template)
         """
         try:
             legal = True
-            volclass = sdCache.produce(sdUUID).getVolumeClass()
-            vollist = volclass.getImageVolumes(sdUUID, imgUUID)
+            dom = sdCache.produce(sdUUID)
+            volclass = dom.getVolumeClass()
+            if image_chain is None:
+                image_chain = dom.image_chain(imgUUID)
+            vollist = list(image_chain.parents)
             self.log.info("image %s in domain %s has vollist %s", imgUUID,
                           sdUUID, str(vollist))
             for v in vollist:
@@ -607,9 +638,11 @@ class Image:
         """
         Check correctness of the whole chain (including template if exists)
         """
-        if not self.isLegal(sdUUID, imgUUID):
+        dom = sdCache.produce(sdUUID)
+        image_chain = dom.image_chain(imgUUID)
+        if not self.isLegal(sdUUID, imgUUID, image_chain=image_chain):
             raise se.ImageIsNotLegalChain(imgUUID)
-        chain = self.getChain(sdUUID, imgUUID)
+        chain = self._getChain(dom, image_chain)
         log_str = logutils.volume_chain_to_str(vol.volUUID for vol in chain)
         self.log.info("Current chain=%s ", log_str)
 
@@ -897,8 +930,7 @@ class Image:
         """
         # Prepare volumes
         dom = sdCache.produce(sdUUID)
-        allVols = dom.getAllVolumes()
-        imgVolumes = sd.getVolsOfImage(allVols, imgUUID).keys()
+        imgVolumes = dom.image_chain(imgUUID).volumes()
         dom.activateVolumes(imgUUID, imgVolumes)
 
         # Walk the volume chain using qemu-img.  Not safe for running VMs
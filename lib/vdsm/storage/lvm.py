@@ -36,6 +36,7 @@ import grp
 import logging
 from collections import namedtuple
 import pprint as pp
+import select
 import threading
 import time
 
@@ -48,6 +49,7 @@ from vdsm import utils
 from vdsm.common import errors
 from vdsm.common import commands
 from vdsm.common.compat import subprocess
+from vdsm.common.time import monotonic_time
 from vdsm.common.units import MiB
 
 from vdsm.storage import devicemapper
@@ -66,7 +68,7 @@ PV_FIELDS = ("uuid,name,size,vg_name,vg_uuid,pe_start,pe_count,"
 PV_FIELDS_LEN = len(PV_FIELDS.split(","))
 
 VG_FIELDS = ("uuid,name,attr,size,free,extent_size,extent_count,free_count,"
-             "tags,vg_mda_size,vg_mda_free,lv_count,pv_count,pv_name")
+             "tags,vg_mda_size,vg_mda_free,lv_count,pv_count,seqno,pv_name")
 VG_FIELDS_LEN = len(VG_FIELDS.split(","))
 
 LV_FIELDS = "uuid,name,vg_name,attr,size,seg_start_pe,devices,tags"
@@ -306,6 +308,250 @@ class LVMRunner(object):
         return p.returncode, out, err
 
 
+class ShellError(errors.Base):
+    msg = "LVM shell error: {self.reason}"
+
+    def __init__(self, reason):
+        self.reason = reason
+
+
+class ShellCommandError(ShellError):
+    msg = "LVM shell command error: {self.reason}"
+
+
+class LVMShell(object):
+    """
+    A long-lived "lvm" interactive shell process.
+
+    Commands are written to the shell stdin, one command per line, and the
+    output is read until the shell prints the next prompt. Since the shell
+    does not report the exit code of the command, we get it by running the
+    "lastlog" shell command after every command.
+
+    The shell can run only one command at a time; callers must not share a
+    shell between threads.
+    """
+
+    PROMPT = b"lvm> "
+
+    # Report the status of the last command. The shell reports LVM internal
+    # return codes; ECMD_PROCESSED (1) means success.
+    LASTLOG_CMD = ("lastlog", "--noheadings", "-o", "log_ret_code",
+                   "-S", "log_type=status")
+    ECMD_PROCESSED = 1
+
+    # lastlog reports nothing unless the last command collected a log
+    # report. The selection matches no log records, so the log report is
+    # collected but not mixed with the command output.
+    LOG_CONFIG = ('log { report_command_log=1 '
+                  'command_log_selection="log_seq_num<0" }')
+
+    # Maximum time to wait for the shell prompt. Commands taking more time
+    # are likely stuck on inaccessible storage; the shell is killed and the
+    # command fails.
+    TIMEOUT = 60
+
+    def __init__(self, lvm=constants.EXT_LVM, sudo=True):
+        self._proc = commands.start(
+            [lvm],
+            sudo=sudo,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        self._poller = select.poll()
+        self._poller.register(self._proc.stdout.fileno(), select.POLLIN)
+        self._poller.register(self._proc.stderr.fileno(), select.POLLIN)
+        try:
+            self._read_until_prompt()
+        except ShellError:
+            self.close()
+            raise
+
+    def run(self, args):
+        """
+        Run lvm command args (without the "lvm" executable) in the shell.
+
+        Returns:
+            rc, out, err tuple, like LVMRunner._run_command()
+
+        Raises:
+            ShellError if the command could not be sent to the shell.
+            ShellCommandError if the shell failed after the command was
+            sent, for example if the command timed out. The shell cannot be
+            used after that.
+        """
+        self._write(self._with_log_config(args))
+        try:
+            return self._read_result()
+        except ShellError as e:
+            raise ShellCommandError(e.reason)
+        except EnvironmentError as e:
+            raise ShellCommandError("Error reading from shell: %s" % e)
+
+    def _read_result(self):
+        out, err = self._read_until_prompt()
+
+        self._write(self.LASTLOG_CMD)
+        status, _ = self._read_until_prompt()
+        try:
+            ret_code = int(status.strip())
+        except ValueError:
+            raise ShellError("Invalid lastlog output: %r" % status)
+
+        rc = 0 if ret_code == self.ECMD_PROCESSED else ret_code
+        return rc, out, err
+
+    def _with_log_config(self, args):
+        """
+        Return args with LOG_CONFIG added to the command --config option.
+        """
+        args = list(args)
+        try:
+            i = args.index("--config")
+        except ValueError:
+            args[1:1] = ["--config", self.LOG_CONFIG]
+        else:
+            args[i + 1] = args[i + 1] + " " + self.LOG_CONFIG
+        return args
+
+    def close(self):
+        try:
+            self._proc.stdin.close()
+        except EnvironmentError:
+            pass
+        commands.terminate(self._proc)
+        self._proc.stdout.close()
+        self._proc.stderr.close()
+
+    def alive(self):
+        return self._proc.poll() is None
+
+    def _write(self, args):
+        line = " ".join(_shell_quote(a) for a in args) + "\n"
+        try:
+            self._proc.stdin.write(line.encode("utf-8"))
+            self._proc.stdin.flush()
+        except EnvironmentError as e:
+            raise ShellError("Error writing to shell: %s" % e)
+
+    def _read_until_prompt(self):
+        out = bytearray()
+        err = bytearray()
+        deadline = monotonic_time() + self.TIMEOUT
+
+        while not out.endswith(self.PROMPT):
+            timeout = deadline - monotonic_time()
+            if timeout <= 0:
+                raise ShellError("Timeout waiting for shell prompt")
+            for fd, _ in self._poller.poll(timeout * 1000):
+                data = os.read(fd, 65536)
+                if not data:
+                    raise ShellError(
+                        "Shell terminated rc=%s" % self._proc.poll())
+                if fd == self._proc.stdout.fileno():
+                    out += data
+                else:
+                    err += data
+
+        # Collect error output written before the prompt.
+        for fd, _ in self._poller.poll(0):
+            if fd == self._proc.stderr.fileno():
+                err += os.read(fd, 65536)
+
+        del out[-len(self.PROMPT):]
+        return bytes(out), bytes(err)
+
+
+def _shell_quote(arg):
+    """
+    Quote an argument for the lvm shell line parser, which supports only
+    arguments starting and ending with a quote.
+    """
+    if arg and not re.search(r"[\s'\"]", arg):
+        return arg
+    if "'" in arg:
+        raise ShellError("Cannot quote argument %r" % arg)
+    return "'%s'" % arg
+
+
+class LVMShellRunner(LVMRunner):
+    """
+    Run LVM report commands in long-lived lvm shell processes, avoiding
+    fork, sudo and lvm startup for every command.
+
+    Idle shells are kept in a pool, so concurrent commands run in different
+    shells. Other commands, or commands that could not be sent to the shell,
+    are run in a new process. Commands failing after they were sent to the
+    shell, for example commands stuck on inaccessible storage, fail without
+    running them again.
+    """
+
+    SHELL_COMMANDS = frozenset(["pvs", "vgs", "lvs"])
+
+    def __init__(self, max_shells=10, sudo=True):
+        self._max_shells = max_shells
+        self._sudo = sudo
+        self._lock = threading.Lock()
+        self._shells = []
+
+    def _run_command(self, cmd):
+        if cmd[1] not in self.SHELL_COMMANDS:
+            return super(LVMShellRunner, self)._run_command(cmd)
+
+        try:
+            shell = self._get_shell(cmd[0])
+            try:
+                res = shell.run(cmd[1:])
+            except ShellError:
+                shell.close()
+                raise
+        except ShellCommandError as e:
+            # The command may be stuck on inaccessible storage; running it
+            # again in a new process would wait again.
+            log.warning("Error running command %s in lvm shell: %s", cmd, e)
+            return 1, b"", str(e).encode("utf-8")
+        except (ShellError, EnvironmentError) as e:
+            log.warning("Error running command in lvm shell, running in a "
+                        "new process: %s", e)
+            return super(LVMShellRunner, self)._run_command(cmd)
+
+        self._put_shell(shell)
+        return res
+
+    def close(self):
+        with self._lock:
+            shells = self._shells
+            self._shells = []
+        for shell in shells:
+            shell.close()
+
+    def _get_shell(self, lvm):
+        while True:
+            with self._lock:
+                if not self._shells:
+                    break
+                shell = self._shells.pop()
+            if shell.alive():
+                return shell
+            log.warning("Idle lvm shell terminated, closing it")
+            shell.close()
+        log.debug("Starting new lvm shell")
+        return LVMShell(lvm, sudo=self._sudo)
+
+    def _put_shell(self, shell):
+        with self._lock:
+            if len(self._shells) < self._max_shells:
+                self._shells.append(shell)
+                return
+        shell.close()
+
+
+def _create_runner():
+    if config.getboolean("irs", "lvm_use_shell"):
+        return LVMShellRunner(max_shells=LVMCache.MAX_COMMANDS)
+    return LVMRunner()
+
+
 class LVMCache(object):
     """
     Keep all the LVM information.
@@ -337,6 +583,11 @@ class LVMCache(object):
         self._pvs = {}
         self._vgs = {}
         self._lvs = {}
+        # VG metadata seqno when the VG LVs were loaded.
+        self._lvs_seqno = {}
+        # VGs whose LVs must be validated using the VG seqno before use.
+        self._unvalidated_vgs = set()
+        self._stats = {"hits": 0, "misses": 0, "reloads": 0}
         self._runner = cmd_runner
 
     def set_read_only(self, value):
@@ -443,6 +694,26 @@ class LVMCache(object):
         self._reloadvgs()
         self._loadAllLvs()
 
+    def stats(self):
+        """
+        Return LV cache statistics:
+            hits: getLv() calls served from the cache
+            misses: getLv() calls that had to reload LVs
+            reloads: lvs commands run to reload LVs
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _vgSeqno(self, vgName):
+        """
+        Return the cached VG metadata seqno, or None if the VG is not cached.
+        Must be called when holding self._lock.
+        """
+        vg = self._vgs.get(vgName)
+        if vg is None or isinstance(vg, Stub):
+            return None
+        return vg.seqno
+
     def _reloadpvs(self, pvName=None):
         cmd = list(PVS_CMD)
         pvNames = normalize_args(pvName)
@@ -568,6 +839,12 @@ class LVMCache(object):
         else:
             cmd.append(vgName)
 
+        # Take the seqno before running the command; if the VG is modified
+        # while we run the command, the next validation will reload the LVs.
+        with self._lock:
+            seqno = self._vgSeqno(vgName)
+            self._stats["reloads"] += 1
+
         rc, out, err = self.cmd(cmd, self._getVGDevs((vgName,)))
 
         with self._lock:
@@ -585,6 +862,7 @@ class LVMCache(object):
                 return dict(self._lvs)
 
             updatedLVs = {}
+            changed = 0
             for line in out:
                 fields = [field.strip() for field in line.split(SEPARATOR)]
                 if len(fields) != LV_FIELDS_LEN:
@@ -593,8 +871,11 @@ class LVMCache(object):
                 lv = makeLV(*fields)
                 # For LV we are only interested in its first extent
                 if lv.seg_start_pe == "0":
-                    self._lvs[(lv.vg_name, lv.name)] = lv
-                    updatedLVs[(lv.vg_name, lv.name)] = lv
+                    key = (lv.vg_name, lv.name)
+                    if self._lvs.get(key) != lv:
+                        self._lvs[key] = lv
+                        changed += 1
+                    updatedLVs[key] = lv
 
             # Determine if there are stale LVs
             if lvNames:
@@ -612,8 +893,14 @@ class LVMCache(object):
 
             if not lvNames:
                 self._stalelv = False
+                self._unvalidated_vgs.discard(vgName)
+                if seqno is None:
+                    self._lvs_seqno.pop(vgName, None)
+                else:
+                    self._lvs_seqno[vgName] = seqno
 
-            log.debug("lvs reloaded")
+            log.debug("lvs reloaded (vg=%s updated=%d changed=%d removed=%d)",
+                      vgName, len(updatedLVs), changed, len(staleLVs))
 
         return updatedLVs
 
@@ -622,6 +909,11 @@ class LVMCache(object):
         Used only during bootstrap.
         """
         cmd = list(LVS_CMD)
+
+        with self._lock:
+            seqnos = {name: self._vgSeqno(name) for name in self._vgs}
+            self._stats["reloads"] += 1
+
         rc, out, err = self.cmd(cmd)
 
         if rc == 0:
@@ -639,6 +931,10 @@ class LVMCache(object):
             with self._lock:
                 self._lvs = new_lvs
                 self._stalelv = False
+                self._unvalidated_vgs.clear()
+                self._lvs_seqno = {name: seqno
+                                   for name, seqno in six.iteritems(seqnos)
+                                   if seqno is not None}
 
         return dict(self._lvs)
 
@@ -678,11 +974,55 @@ class LVMCache(object):
                     if not isinstance(lv, Stub):
                         if lv.vg_name == vgName:
                             self._lvs[(vgName, lv.name)] = Stub(lv.name, True)
+                self._lvs_seqno.pop(vgName, None)
+                self._unvalidated_vgs.discard(vgName)
+
+    def _invalidatelvsIfChanged(self, vgName):
+        """
+        Invalidate the LVs in vgName if the VG metadata was modified since
+        the LVs were loaded.
+
+        Used when the VG may have been modified by another host. The LVs are
+        validated on the next getLv() by comparing the VG metadata seqno with
+        the seqno when the LVs were loaded, reloading the LVs only if the
+        seqno has changed.
+        """
+        with self._lock:
+            self._unvalidated_vgs.add(vgName)
+
+    def _validatelvs(self, vgName):
+        """
+        Return True if the cached LVs in vgName are valid, False if the LVs
+        must be reloaded.
+        """
+        with self._lock:
+            if vgName not in self._unvalidated_vgs:
+                return True
+
+        # Reloads the VG if it was invalidated, reading the current seqno.
+        vg = self.getVg(vgName)
+
+        with self._lock:
+            if vgName not in self._unvalidated_vgs:
+                return True
+            seqno = self._lvs_seqno.get(vgName)
+            if (vg is not None and not isinstance(vg, Stub) and
+                    seqno == vg.seqno):
+                log.debug("VG %s seqno %s not changed, using cached lvs",
+                          vgName, seqno)
+                self._unvalidated_vgs.discard(vgName)
+                return True
+
+        # The VG remains unvalidated until the LVs are reloaded.
+        log.debug("VG %s seqno changed, reloading lvs", vgName)
+        return False
 
     def _invalidateAllLvs(self):
         with self._lock:
             self._stalelv = True
             self._lvs.clear()
+            self._lvs_seqno.clear()
+            self._unvalidated_vgs.clear()
 
     def flush(self):
         self._invalidateAllPvs()
@@ -771,16 +1111,20 @@ class LVMCache(object):
         # If only 'lvName' is None then return all the LVs in the given VG
         # If only 'vgName' is None it is weird, so return nothing
         # (we can consider returning all the LVs with a given name)
+        valid = self._validatelvs(vgName)
         if lvName:
             # vgName, lvName
             lv = self._lvs.get((vgName, lvName))
-            if not lv or isinstance(lv, Stub):
+            if not valid or not lv or isinstance(lv, Stub):
+                self._count("misses")
                 # while we here reload all the LVs in the VG
                 lvs = self._reloadlvs(vgName)
                 lv = lvs.get((vgName, lvName))
                 if not lv:
                     log.warning("lv: %s not found in lvs vg: %s response",
                                 lvName, vgName)
+            else:
+                self._count("hits")
             res = lv
         else:
             # vgName, None
@@ -789,10 +1133,12 @@ class LVMCache(object):
             # be in the vg.
             # Will be better when the pvs dict will be part of the vg.
             # Fix me: should not be more stubs
-            if self._stalelv or any(isinstance(lv, Stub)
-                                    for lv in self._lvs.values()):
+            if not valid or self._stalelv or any(
+                    isinstance(lv, Stub) for lv in self._lvs.values()):
+                self._count("misses")
                 lvs = self._reloadlvs(vgName)
             else:
+                self._count("hits")
                 lvs = dict(self._lvs)
             # lvs = self._reloadlvs()
             lvs = [lv for lv in lvs.values()
@@ -800,8 +1146,12 @@ class LVMCache(object):
             res = lvs
         return res
 
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
 
-_lvminfo = LVMCache()
+_lvminfo = LVMCache(_create_runner())
 
 
 def bootstrap(skiplvs=()):
@@ -851,6 +1201,10 @@ def invalidateCache():
     _lvminfo.invalidateCache()
 
 
+def cache_stats():
+    return _lvminfo.stats()
+
+
 def _fqpvname(pv):
     if pv[0] == "/":
         # Absolute path, use as is.
@@ -1254,9 +1608,15 @@ def deactivateVG(vgName):
 
 
 def invalidateVG(vgName, invalidateLVs=True, invalidatePVs=False):
+    """
+    Invalidate a VG that may have been modified by another host.
+
+    If invalidateLVs is True, the VG LVs are reloaded on the next access only
+    if the VG metadata seqno has changed.
+    """
     _lvminfo._invalidatevgs(vgName)
     if invalidateLVs:
-        _lvminfo._invalidatelvs(vgName)
+        _lvminfo._invalidatelvsIfChanged(vgName)
     if invalidatePVs:
         vgPvs = listPVNames(vgName)
         _lvminfo._invalidatepvs(pvNames=vgPvs)
@@ -1669,3 +2029,11 @@ def lvsByTag(vgName, tag):
 
 def invalidateFilter():
     _lvminfo.invalidateFilter()
+
+
+def invalidatePVs(guids):
+    """
+    Invalidate cached PVs of multipath devices guids, for example after the
+    devices were resized.
+    """
+    _lvminfo._invalidatepvs([_fqpvname(guid) for guid in guids])
@@ -23,6 +23,8 @@ from __future__ import division
 
 import os
 import errno
+import mmap
+import re
 import time
 import threading
 import struct
@@ -32,14 +34,16 @@ import uuid
 
 from six.moves import queue
 
+from vdsm import metrics
+from vdsm.common.time import monotonic_time
 from vdsm.common.units import KiB
 from vdsm.config import config
 from vdsm.storage import misc
 from vdsm.storage import task
+from vdsm.storage import xlease
 from vdsm.storage.exception import InvalidParameterException
 from vdsm.storage.threadPool import ThreadPool
 
-from vdsm import constants
 from vdsm.common import concurrent
 
 __author__ = "ayalb"
@@ -62,6 +66,114 @@ SLOTS_PER_MAILBOX = int(MAILBOX_SIZE // MESSAGE_SIZE)
 # etc)
 MESSAGES_PER_MAILBOX = SLOTS_PER_MAILBOX - 1
 
+# Matches the first byte (message version) of non empty message slots.
+_NON_EMPTY_SLOT = re.compile(b"[^\0]")
+
+# Upper bounds of latency histogram buckets in milliseconds.
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2000, 5000, 10000)
+
+# Minimal time between sending mailbox metrics.
+METRICS_INTERVAL = 60
+
+
+class PollInterval(object):
+    """
+    Compute the interval between mailbox polls.
+
+    When adaptive polling is enabled, poll every min_interval seconds while
+    there is activity (requests waiting for a reply, new requests), and for
+    active_timeout seconds after the last activity. When idle, the interval
+    is doubled on every poll, up to max_interval.
+
+    When adaptive polling is disabled, always poll every max_interval
+    seconds.
+    """
+
+    def __init__(self, max_interval, adaptive=None, min_interval=None,
+                 active_timeout=None, clock=monotonic_time):
+        if adaptive is None:
+            adaptive = config.getboolean('irs', 'mailbox_adaptive_polling')
+        if min_interval is None:
+            min_interval = config.getfloat('irs', 'mailbox_min_poll_interval')
+        if active_timeout is None:
+            active_timeout = config.getfloat('irs', 'mailbox_active_timeout')
+
+        self._max_interval = max_interval
+        self._min_interval = min(min_interval, max_interval)
+        self._adaptive = adaptive
+        self._active_timeout = active_timeout
+        self._clock = clock
+        self._interval = max_interval
+        self._last_activity = None
+
+    @property
+    def adaptive(self):
+        return self._adaptive
+
+    def activity(self):
+        """
+        Called when mailbox activity is detected.
+        """
+        self._last_activity = self._clock()
+        self._interval = self._min_interval
+
+    def next(self):
+        """
+        Return the time to wait before the next poll.
+        """
+        if not self._adaptive:
+            return self._max_interval
+
+        if (self._last_activity is not None and
+                self._clock() - self._last_activity < self._active_timeout):
+            return self._min_interval
+
+        self._interval = min(self._interval * 2, self._max_interval)
+        return self._interval
+
+
+class LatencyHistogram(object):
+    """
+    Thread safe histogram of latencies, reported to the metrics collector.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._count = 0
+        self._sum = 0.0
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if ms <= bound:
+                break
+        else:
+            i = len(LATENCY_BUCKETS)
+        with self._lock:
+            self._buckets[i] += 1
+            self._count += 1
+            self._sum += ms
+
+    def report(self, prefix):
+        """
+        Return a metrics report with cumulative bucket counts, total count
+        and sum of latencies in milliseconds.
+        """
+        with self._lock:
+            buckets = list(self._buckets)
+            count = self._count
+            total = self._sum
+
+        report = {}
+        cumulative = 0
+        for bound, value in zip(LATENCY_BUCKETS + ("inf",), buckets):
+            cumulative += value
+            report["%s.le_%s" % (prefix, bound)] = cumulative
+        report[prefix + ".count"] = count
+        report[prefix + ".sum"] = total
+        return report
+
 
 def checksum(data):
     csum = sum(bytearray(data))
@@ -88,8 +200,91 @@ def runTask(args):
     ctask.prepare(cmd, *args)
 
 
-def _mboxExecCmd(*args, **kwargs):
-    return misc.execCmd(*args, **kwargs)
+class _MailboxFile(object):
+    """
+    Mailbox file accessed via the master domain link.
+
+    When the master domain migrates, the link is changed to point to the
+    mailbox of the new master domain. The file is opened when needed, and
+    reopened before I/O if the path resolves to another file, so we never
+    use the mailbox of the old master domain.
+    """
+
+    log = logging.getLogger('storage.MailBox')
+
+    def __init__(self, path):
+        self._path = path
+        self._file = None
+        self._ident = None
+
+    @property
+    def name(self):
+        return self._path
+
+    def pread(self, offset, buf):
+        return self._current().pread(offset, buf)
+
+    def pwrite(self, offset, buf):
+        self._current().pwrite(offset, buf)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._ident = None
+
+    def _current(self):
+        st = os.stat(self._path)
+        if (st.st_dev, st.st_ino) != self._ident:
+            if self._file is not None:
+                self.log.info("Mailbox %s was replaced, reopening",
+                              self._path)
+                self.close()
+            f = xlease.DirectFile(self._path)
+            try:
+                # Use the opened file identity, in case the link was
+                # changed again since we checked it.
+                st = os.fstat(f.fileno())
+            except Exception:
+                f.close()
+                raise
+            self._file = f
+            self._ident = (st.st_dev, st.st_ino)
+        return self._file
+
+
+def _mboxFile(path):
+    return _MailboxFile(path)
+
+
+def _alignedBuffer(size):
+    """
+    Return a page aligned buffer, suitable for direct I/O.
+    """
+    return mmap.mmap(-1, size, mmap.MAP_SHARED)
+
+
+def _readMail(mboxFile, offset, buf):
+    nread = mboxFile.pread(offset, buf)
+    if nread != len(buf):
+        raise RuntimeError("Could not read mailbox %s - read %d bytes "
+                           "instead of %d" % (mboxFile.name, nread, len(buf)))
+
+
+def _nonEmptySlots(mail):
+    """
+    Iterate over the ids of non empty message slots in mail, skipping the
+    mailboxes metadata slots.
+
+    The first byte of a message is the message version, so we extract the
+    first byte of all slots and search for non-zero bytes, avoiding a scan
+    of the entire mail in python.
+    """
+    versions = mail[0::MESSAGE_SIZE]
+    for match in _NON_EMPTY_SLOT.finditer(versions):
+        msgId = match.start()
+        if msgId % SLOTS_PER_MAILBOX != MESSAGES_PER_MAILBOX:
+            yield msgId
 
 
 class SPM_Extend_Message:
@@ -114,6 +309,7 @@ class SPM_Extend_Message:
         self.pool = volumeData['poolID']
         self.volumeData = volumeData
         self.callback = callbackFunction
+        self.created = monotonic_time()
 
         # Message structure is rigid (order must be kept and is relied upon):
         # Version (1 byte), OpCode (4 bytes), Domain UUID (16 bytes), Volume
@@ -225,6 +421,9 @@ class HSM_Mailbox:
     def wait(self, timeout=None):
         return self._mailman.wait(timeout)
 
+    def stats(self):
+        return self._mailman.stats()
+
 
 class HSM_MailMonitor(object):
     log = logging.getLogger('storage.MailBox.HsmMailMonitor')
@@ -239,27 +438,22 @@ class HSM_MailMonitor(object):
         self._queue = queue
         self._activeMessages = {}
         self._monitorInterval = monitorInterval
+        self._pollInterval = PollInterval(monitorInterval)
+        # Time from sendExtendMsg() until the request is written to the
+        # mailbox, and until the SPM reply is received.
+        self._sendLatency = LatencyHistogram()
+        self._replyLatency = LatencyHistogram()
+        self._lastMetrics = monotonic_time()
         self._hostID = int(hostID)
         self._used_slots_array = [0] * MESSAGES_PER_MAILBOX
-        self._outgoingMail = EMPTYMAILBOX
+        # Outgoing mail is modified in place and written directly to storage.
+        self._outgoingMail = _alignedBuffer(MAILBOX_SIZE)
         self._incomingMail = EMPTYMAILBOX
+        self._inbuf = _alignedBuffer(MAILBOX_SIZE)
+        self._mailboxOffset = self._hostID * MAILBOX_SIZE
         # TODO: add support for multiple paths (multiple mailboxes)
-        self._inCmd = [constants.EXT_DD,
-                       'if=' + str(inbox),
-                       'iflag=direct,fullblock',
-                       'bs=' + str(MAILBOX_SIZE),
-                       'count=1',
-                       'skip=' + str(self._hostID)
-                       ]
-        self._outCmd = [constants.EXT_DD,
-                        'of=' + str(outbox),
-                        'iflag=fullblock',
-                        'oflag=direct',
-                        'conv=notrunc',
-                        'bs=' + str(MAILBOX_SIZE),
-                        'count=1',
-                        'seek=' + str(self._hostID)
-                        ]
+        self._inbox = _mboxFile(inbox)
+        self._outbox = _mboxFile(outbox)
         self._init = False
         self._initMailbox()  # Read initial mailbox state
         self._msgCounter = 0
@@ -270,14 +464,15 @@ class HSM_MailMonitor(object):
 
     def _initMailbox(self):
         # Sync initial incoming mail state with storage view
-        (rc, out, err) = _mboxExecCmd(self._inCmd, raw=True)
-        if rc == 0:
-            self._incomingMail = out
-            self._init = True
-        else:
+        try:
+            _readMail(self._inbox, self._mailboxOffset, self._inbuf)
+        except Exception as e:
             self.log.warning("HSM_MailboxMonitor - Could not initialize "
                              "mailbox, will not accept requests until init "
-                             "succeeds")
+                             "succeeds: %s", e)
+        else:
+            self._incomingMail = self._inbuf[:]
+            self._init = True
 
     def immStop(self):
         self._stop = True
@@ -286,28 +481,37 @@ class HSM_MailMonitor(object):
         self._thread.join(timeout=timeout)
         return not self._thread.is_alive()
 
+    def stats(self):
+        report = {}
+        report.update(self._sendLatency.report("send_latency"))
+        report.update(self._replyLatency.report("reply_latency"))
+        return report
+
+    def _sendMetrics(self):
+        now = monotonic_time()
+        if now - self._lastMetrics < METRICS_INTERVAL:
+            return
+        self._lastMetrics = now
+        prefix = "hosts.vdsm.mailbox.hsm."
+        metrics.send({prefix + k: v for k, v in self.stats().items()})
+
     def _handleResponses(self, newMsgs):
         rc = False
 
-        for i in range(0, MESSAGES_PER_MAILBOX):
+        # Most of the time the mailbox did not change since the last read.
+        if newMsgs == self._incomingMail:
+            return rc
+
+        for i in _nonEmptySlots(newMsgs):
             # Skip checking non used slots
             if self._used_slots_array[i] == 0:
                 continue
 
             start = i * MESSAGE_SIZE
+            end = start + MESSAGE_SIZE
 
-            # First byte of message is message version.
-            # A null byte indicates an empty response message to be skipped.
-            if newMsgs[start:start + 1] == b"\0":
-                continue
-
-            for j in range(start, start + MESSAGE_SIZE):
-                if newMsgs[j] != self._incomingMail[j]:
-                    break
-
-            # If search exhausted then message hasn't changed since last read
-            # and can be skipped
-            if j == (start + MESSAGE_SIZE - 1):
+            # If message hasn't changed since last read it can be skipped
+            if newMsgs[start:end] == self._incomingMail[start:end]:
                 continue
 
             #
@@ -317,21 +521,19 @@ class HSM_MailMonitor(object):
             #
             rc = True
 
-            newMsg = newMsgs[start:start + MESSAGE_SIZE]
+            newMsg = newMsgs[start:end]
 
             if newMsg == CLEAN_MESSAGE:
                 del self._activeMessages[i]
                 self._used_slots_array[i] = 0
                 self._msgCounter -= 1
-                self._outgoingMail = self._outgoingMail[0:start] + \
-                    MESSAGE_SIZE * b"\0" + self._outgoingMail[start +
-                                                              MESSAGE_SIZE:]
+                self._outgoingMail[start:end] = MESSAGE_SIZE * b"\0"
                 continue
 
             msg = self._activeMessages[i]
             self._activeMessages[i] = CLEAN_MESSAGE
-            self._outgoingMail = self._outgoingMail[0:start] + \
-                CLEAN_MESSAGE + self._outgoingMail[start + MESSAGE_SIZE:]
+            self._outgoingMail[start:end] = CLEAN_MESSAGE
+            self._replyLatency.observe(monotonic_time() - msg.created)
 
             try:
                 self.log.debug("HSM_MailboxMonitor(%s/%s) - Checking reply: "
@@ -361,30 +563,20 @@ class HSM_MailMonitor(object):
                                exc_info=True)
         # Finished processing incoming mail, now save mail to compare against
         # next batch
-        self._incomingMail = newMsgs
+        self._incomingMail = bytes(newMsgs)
         return rc
 
     def _checkForMail(self):
         # self.log.debug("HSM_MailMonitor - checking for mail")
-        # self.log.debug("Running command: " + str(self._inCmd))
-        (rc, in_mail, err) = misc.execCmd(self._inCmd, raw=True)
-        if rc:
-            raise RuntimeError("_handleResponses.Could not read mailbox - rc "
-                               "%s" % rc)
-        if (len(in_mail) != MAILBOX_SIZE):
-            raise RuntimeError("_handleResponses.Could not read mailbox - len "
-                               "%s != %s" % (len(in_mail), MAILBOX_SIZE))
-        # self.log.debug("Parsing inbox content: %s", in_mail)
-        return self._handleResponses(in_mail)
+        _readMail(self._inbox, self._mailboxOffset, self._inbuf)
+        return self._handleResponses(self._inbuf[:])
 
     def _sendMail(self):
-        self.log.info("HSM_MailMonitor sending mail to SPM - " +
-                      str(self._outCmd))
-        pChk = packed_checksum(
+        self.log.info("HSM_MailMonitor sending mail to SPM - %s offset=%d",
+                      self._outbox.name, self._mailboxOffset)
+        self._outgoingMail[MAILBOX_SIZE - CHECKSUM_BYTES:] = packed_checksum(
             self._outgoingMail[0:MAILBOX_SIZE - CHECKSUM_BYTES])
-        self._outgoingMail = \
-            self._outgoingMail[0:MAILBOX_SIZE - CHECKSUM_BYTES] + pChk
-        _mboxExecCmd(self._outCmd, data=self._outgoingMail)
+        self._outbox.pwrite(self._mailboxOffset, self._outgoingMail)
 
     def _handleMessage(self, message):
         # TODO: add support for multiple mailboxes
@@ -412,8 +604,8 @@ class HSM_MailMonitor(object):
         self._activeMessages[freeSlot] = message
         start = freeSlot * MESSAGE_SIZE
         end = start + MESSAGE_SIZE
-        self._outgoingMail = self._outgoingMail[0:start] + message.payload + \
-            self._outgoingMail[end:]
+        self._outgoingMail[start:end] = message.payload
+        self._sendLatency.observe(monotonic_time() - message.created)
         self.log.debug("HSM_MailMonitor - start: %s, end: %s, len: %s, "
                        "message(%s/%s): %s" %
                        (start, end, len(self._outgoingMail), self._msgCounter,
@@ -482,6 +674,8 @@ class HSM_MailMonitor(object):
                     if sendMail:
                         self._sendMail()
 
+                    self._sendMetrics()
+
                     # If there are active messages waiting for SPM reply, wait
                     # a few seconds before performing another IO op
                     if self._activeMessages and not self._stop:
@@ -490,7 +684,10 @@ class HSM_MailMonitor(object):
                         if (failures > 9):
                             time.sleep(60)
                         else:
-                            time.sleep(self._monitorInterval)
+                            # Requests waiting for a reply keep the mailbox
+                            # active.
+                            self._pollInterval.activity()
+                            time.sleep(self._pollInterval.next())
 
                 except:
                     self.log.error("HSM_MailboxMonitor - Incoming mail"
@@ -499,8 +696,17 @@ class HSM_MailMonitor(object):
         finally:
             self.log.info("HSM_MailboxMonitor - Incoming mail monitoring "
                           "thread stopped, clearing outgoing mail")
-            self._outgoingMail = EMPTYMAILBOX
-            self._sendMail()  # Clear outgoing mailbox
+            self._outgoingMail[:] = EMPTYMAILBOX
+            try:
+                self._sendMail()  # Clear outgoing mailbox
+            finally:
+                self._close()
+
+    def _close(self):
+        self._inbox.close()
+        self._outbox.close()
+        self._inbuf.close()
+        self._outgoingMail.close()
 
 
 class SPM_MailMonitor:
@@ -542,31 +748,31 @@ class SPM_MailMonitor:
         self._numHosts = int(maxHostID)
         self._outMailLen = MAILBOX_SIZE * self._numHosts
         self._monitorInterval = monitorInterval
+        self._pollInterval = PollInterval(monitorInterval)
+        # Time from detecting a request until sending the reply.
+        self._requestTimes = {}
+        self._replyLatency = LatencyHistogram()
+        self._lastMetrics = monotonic_time()
         # TODO: add support for multiple paths (multiple mailboxes)
-        self._outgoingMail = self._outMailLen * b"\0"
-        self._incomingMail = self._outgoingMail
-        self._inCmd = ['dd',
-                       'if=' + str(self._inbox),
-                       'iflag=direct,fullblock',
-                       'count=1'
-                       ]
-        self._outCmd = ['dd',
-                        'of=' + str(self._outbox),
-                        'oflag=direct',
-                        'iflag=fullblock',
-                        'conv=notrunc',
-                        'count=1'
-                        ]
+        self._inFile = _mboxFile(self._inbox)
+        self._outFile = _mboxFile(self._outbox)
+        # Outgoing mail is modified in place and written directly to storage.
+        self._outgoingMail = _alignedBuffer(self._outMailLen)
+        # Incoming mail is read alternately into 2 buffers, so we can compare
+        # new mail with the previous mail without copying.
+        self._inBuffers = [_alignedBuffer(self._outMailLen),
+                           _alignedBuffer(self._outMailLen)]
+        self._incomingMail = self._inBuffers[1]
         self._outLock = threading.Lock()
         self._inLock = threading.Lock()
         # Clear outgoing mail
-        self.log.debug("SPM_MailMonitor - clearing outgoing mail, command is: "
-                       "%s", self._outCmd)
-        cmd = self._outCmd + ['bs=' + str(self._outMailLen)]
-        (rc, out, err) = _mboxExecCmd(cmd, data=self._outgoingMail)
-        if rc:
-            self.log.warning("SPM_MailMonitor couldn't clear outgoing mail, "
-                             "dd failed")
+        self.log.debug("SPM_MailMonitor - clearing outgoing mail: %s",
+                       self._outbox)
+        try:
+            self._outFile.pwrite(0, self._outgoingMail)
+        except EnvironmentError as e:
+            self.log.warning("SPM_MailMonitor couldn't clear outgoing mail: "
+                             "%s", e)
 
         self._thread = concurrent.thread(
             self._run, name="mailbox-spm", log=self.log)
@@ -585,6 +791,17 @@ class SPM_MailMonitor:
     def isStopped(self):
         return self._stopped
 
+    def stats(self):
+        return self._replyLatency.report("reply_latency")
+
+    def _sendMetrics(self):
+        now = monotonic_time()
+        if now - self._lastMetrics < METRICS_INTERVAL:
+            return
+        self._lastMetrics = now
+        prefix = "hosts.vdsm.mailbox.spm."
+        metrics.send({prefix + k: v for k, v in self.stats().items()})
+
     @classmethod
     def validateMailbox(self, mailbox, mailboxIndex):
         """
@@ -609,94 +826,78 @@ class SPM_MailMonitor:
 
         send = False
 
-        # run through all messages and check if new messages have arrived
-        # (since last read)
-        for host in range(0, self._numHosts):
-            # Check mailbox checksum
-            mailboxStart = host * MAILBOX_SIZE
-
-            isMailboxValidated = False
-
-            for i in range(0, MESSAGES_PER_MAILBOX):
-
-                msgId = host * SLOTS_PER_MAILBOX + i
-                msgStart = msgId * MESSAGE_SIZE
-
-                # First byte of message is message version.
-                # A null byte indicates an empty message to be skipped.
-                if newMail[msgStart:msgStart + 1] == b"\0":
-                    continue
-
-                # Most mailboxes are probably empty so it costs less to check
-                # that all messages start with 0 than to validate the mailbox,
-                # therefor this is done after we find a non empty message in
-                # mailbox
-                if not isMailboxValidated:
-                    if not self.validateMailbox(
-                            newMail[mailboxStart:mailboxStart + MAILBOX_SIZE],
-                            host):
-                        # Cleaning invalid mbx in newMail
-                        newMail = newMail[:mailboxStart] + EMPTYMAILBOX + \
-                            newMail[mailboxStart + MAILBOX_SIZE:]
-                        break
+        # Mailboxes known to be valid or invalid in this batch.
+        validated = {}
+
+        # Run through all non empty messages and check if new messages have
+        # arrived (since last read). Most mailboxes are probably empty so it
+        # costs less to find the non empty messages than to validate all the
+        # mailboxes.
+        for msgId in _nonEmptySlots(newMail):
+            host = msgId // SLOTS_PER_MAILBOX
+            msgStart = msgId * MESSAGE_SIZE
+            msgEnd = msgStart + MESSAGE_SIZE
+
+            # Check mailbox checksum, once per mailbox.
+            if host not in validated:
+                mailboxStart = host * MAILBOX_SIZE
+                mailboxEnd = mailboxStart + MAILBOX_SIZE
+                validated[host] = self.validateMailbox(
+                    newMail[mailboxStart:mailboxEnd], host)
+                if validated[host]:
                     self.log.debug("SPM_MailMonitor: Mailbox %s validated, "
                                    "checking mail", host)
-                    isMailboxValidated = True
-
-                newMsg = newMail[msgStart:msgStart + MESSAGE_SIZE]
-                msgOffset = msgId * MESSAGE_SIZE
-                if newMsg == CLEAN_MESSAGE:
-                    # Should probably put a setter on outgoingMail which would
-                    # take the lock
-                    with self._outLock:
-                        self._outgoingMail = \
-                            self._outgoingMail[0:msgOffset] + CLEAN_MESSAGE + \
-                            self._outgoingMail[msgOffset + MESSAGE_SIZE:
-                                               self._outMailLen]
-                    send = True
-                    continue
-
-                # Message isn't empty, check if its new
-                isMessageNew = False
-                for j in range(msgStart, msgStart + MESSAGE_SIZE):
-                    if newMail[j] != self._incomingMail[j]:
-                        isMessageNew = True
-                        break
+                else:
+                    # Cleaning invalid mbx in newMail
+                    if isinstance(newMail, bytes):
+                        newMail = bytearray(newMail)
+                    newMail[mailboxStart:mailboxEnd] = EMPTYMAILBOX
 
-                # If search exhausted, i.e. message hasn't changed since last
-                # read, it can be skipped
-                if not isMessageNew:
-                    continue
+            if not validated[host]:
+                continue
 
-                # We only get here if there is a novel request
-                try:
-                    msgType = newMail[msgStart + 1:msgStart + 5]
-                    if msgType in self._messageTypes:
-                        # Use message class to process request according to
-                        # message specific logic
-                        id = str(uuid.uuid4())
-                        self.log.debug("SPM_MailMonitor: processing request: "
-                                       "%s" % repr(newMail[
-                                           msgStart:msgStart + MESSAGE_SIZE]))
-                        res = self.tp.queueTask(
-                            id, runTask, (self._messageTypes[msgType], msgId,
-                                          newMail[msgStart:
-                                                  msgStart + MESSAGE_SIZE])
-                        )
-                        if not res:
-                            raise Exception()
-                    else:
-                        self.log.error("SPM_MailMonitor: unknown message type "
-                                       "encountered: %s", msgType)
-                except RuntimeError as e:
-                    self.log.error("SPM_MailMonitor: exception: %s caught "
-                                   "while handling message: %s", str(e),
-                                   newMail[msgStart:msgStart + MESSAGE_SIZE])
-                except:
-                    self.log.error("SPM_MailMonitor: exception caught while "
-                                   "handling message: %s",
-                                   newMail[msgStart:msgStart + MESSAGE_SIZE],
-                                   exc_info=True)
+            newMsg = newMail[msgStart:msgEnd]
+            if newMsg == CLEAN_MESSAGE:
+                # Should probably put a setter on outgoingMail which would
+                # take the lock
+                with self._outLock:
+                    self._outgoingMail[msgStart:msgEnd] = CLEAN_MESSAGE
+                send = True
+                continue
+
+            # Message isn't empty, if it hasn't changed since last read, it
+            # can be skipped
+            if newMsg == self._incomingMail[msgStart:msgEnd]:
+                continue
+
+            # We only get here if there is a novel request
+            self._pollInterval.activity()
+            self._requestTimes[msgId] = monotonic_time()
+            try:
+                msgType = newMsg[1:5]
+                if msgType in self._messageTypes:
+                    # Use message class to process request according to
+                    # message specific logic
+                    id = str(uuid.uuid4())
+                    self.log.debug("SPM_MailMonitor: processing request: "
+                                   "%r", newMsg)
+                    res = self.tp.queueTask(
+                        id, runTask, (self._messageTypes[msgType], msgId,
+                                      newMsg)
+                    )
+                    if not res:
+                        raise Exception()
+                else:
+                    self.log.error("SPM_MailMonitor: unknown message type "
+                                   "encountered: %s", msgType)
+            except RuntimeError as e:
+                self.log.error("SPM_MailMonitor: exception: %s caught "
+                               "while handling message: %s", str(e),
+                               newMsg)
+            except:
+                self.log.error("SPM_MailMonitor: exception caught while "
+                               "handling message: %s", newMsg,
+                               exc_info=True)
 
         self._incomingMail = newMail
         return send
@@ -706,50 +907,47 @@ class SPM_MailMonitor:
         # incomingMail is not changed during checkForMail
         with self._inLock:
             # self.log.debug("SPM_MailMonitor -_checking for mail")
-            cmd = self._inCmd + ['bs=' + str(self._outMailLen)]
-            # self.log.debug("SPM_MailMonitor - reading incoming mail, "
-            #               "command: " + str(cmd))
-            (rc, in_mail, err) = misc.execCmd(cmd, raw=True)
-            if rc:
+            # Read into the buffer not holding the previous mail.
+            in_mail = self._inBuffers[0]
+            if in_mail is self._incomingMail:
+                in_mail = self._inBuffers[1]
+            try:
+                _readMail(self._inFile, 0, in_mail)
+            except EnvironmentError as e:
                 raise IOError(errno.EIO, "_handleRequests._checkForMail - "
-                              "Could not read mailbox: %s" % self._inbox)
-
-            if (len(in_mail) != (self._outMailLen)):
-                self.log.error('SPM_MailMonitor: _checkForMail - dd succeeded '
-                               'but read %d bytes instead of %d, cannot check '
-                               'mail.  Read mail contains: %s', len(in_mail),
-                               self._outMailLen, repr(in_mail[:80]))
-                raise RuntimeError("_handleRequests._checkForMail - Could not "
-                                   "read mailbox")
+                              "Could not read mailbox: %s: %s" %
+                              (self._inbox, e))
             # self.log.debug("Parsing inbox content: %s", in_mail)
             if self._handleRequests(in_mail):
                 with self._outLock:
-                    cmd = self._outCmd + ['bs=' + str(self._outMailLen)]
-                    (rc, out, err) = _mboxExecCmd(cmd,
-                                                  data=self._outgoingMail)
-                    if rc:
+                    try:
+                        self._outFile.pwrite(0, self._outgoingMail)
+                    except EnvironmentError as e:
                         self.log.warning("SPM_MailMonitor couldn't write "
-                                         "outgoing mail, dd failed")
+                                         "outgoing mail: %s", e)
 
     def sendReply(self, msgID, msg):
         # Lock is acquired in order to make sure that
         # outgoingMail is not changed while used
         with self._outLock:
+            requestTime = self._requestTimes.pop(msgID, None)
+            if requestTime is not None:
+                self._replyLatency.observe(monotonic_time() - requestTime)
+            # Keep polling fast until the host acknowledges the reply.
+            self._pollInterval.activity()
             msgOffset = msgID * MESSAGE_SIZE
-            self._outgoingMail = \
-                self._outgoingMail[0:msgOffset] + msg.payload + \
-                self._outgoingMail[msgOffset + MESSAGE_SIZE:self._outMailLen]
+            self._outgoingMail[msgOffset:msgOffset + MESSAGE_SIZE] = \
+                msg.payload
             mailboxOffset = (msgID // SLOTS_PER_MAILBOX) * MAILBOX_SIZE
-            mailbox = self._outgoingMail[mailboxOffset:
-                                         mailboxOffset + MAILBOX_SIZE]
-            cmd = self._outCmd + ['bs=' + str(MAILBOX_SIZE),
-                                  'seek=' + str(mailboxOffset // MAILBOX_SIZE)]
-            # self.log.debug("Running command: %s, for message id: %s",
-            #               str(cmd), str(msgID))
-            (rc, out, err) = _mboxExecCmd(cmd, data=mailbox)
-            if rc:
+            mailbox = memoryview(self._outgoingMail)[
+                mailboxOffset:mailboxOffset + MAILBOX_SIZE]
+            try:
+                self._outFile.pwrite(mailboxOffset, mailbox)
+            except EnvironmentError as e:
                 self.log.error("SPM_MailMonitor: sendReply - couldn't send "
-                               "reply, dd failed")
+                               "reply: %s", e)
+            finally:
+                mailbox.release()
 
     def _run(self):
         try:
@@ -758,13 +956,23 @@ class SPM_MailMonitor:
                     self._checkForMail()
                 except:
                     self.log.error("Error checking for mail", exc_info=True)
-                time.sleep(self._monitorInterval)
+                self._sendMetrics()
+                time.sleep(self._pollInterval.next())
         finally:
             self._stopped = True
             self.tp.joinAll()
+            self._close()
             self.log.info("SPM_MailMonitor - Incoming mail monitoring thread "
                           "stopped")
 
+    def _close(self):
+        with self._inLock, self._outLock:
+            self._inFile.close()
+            self._outFile.close()
+            for buf in self._inBuffers:
+                buf.close()
+            self._outgoingMail.close()
+
 
 def wait_timeout(monitor_interval):
     """
@@ -28,12 +28,14 @@ import errno
 from glob import glob
 import logging
 import re
+import threading
 from collections import namedtuple
 from contextlib import closing
 
 from vdsm import utils
 from vdsm.common import cmdutils
 from vdsm.common import commands
+from vdsm.common import concurrent
 from vdsm.common import supervdsm
 from vdsm.common import udevadm
 from vdsm.common.compat import subprocess
@@ -49,6 +51,13 @@ DEV_MIXED = "MIXED"
 SYS_BLOCK = "/sys/block"
 QUEUE = "queue"
 
+# udev rewrites the database entry of a device for every event processed for
+# the device.
+UDEV_DATA = "/run/udev/data"
+
+# Number of threads scanning multipath devices in pathListIter.
+SCAN_WORKERS = 8
+
 TOXIC_CHARS = '()*+?|^$.\\'
 
 log = logging.getLogger("storage.Multipath")
@@ -93,18 +102,23 @@ def rescan():
     udevadm.settle(timeout)
 
 
-def resize_devices():
+def resize_devices(guids=None):
     """
     This is needed in case a device has been increased on the storage server
     Resize multipath map if the underlying slaves are bigger than
     the map size.
     The slaves can be bigger if the LUN size has been increased on the storage
     server after the initial discovery.
+
+    If guids is specified, check only these devices instead of all multipath
+    devices.
     """
-    log.info("Resizing multipath devices")
+    if guids is None:
+        guids = [guid for _, guid in getMPDevsIter()]
+    log.info("Resizing multipath devices (count=%d)", len(guids))
     with utils.stopwatch(
             "Resizing multipath devices", level=logging.INFO, log=log):
-        for dmId, guid in getMPDevsIter():
+        for guid in guids:
             try:
                 _resize_if_needed(guid)
             except Exception:
@@ -252,130 +266,244 @@ def getHBTL(physdev):
     return HBTL(*hbtl[0].split(":"))
 
 
+class DeviceCache(object):
+    """
+    Cache device attributes that change only when udev processes an event
+    for the device.
+
+    An entry is valid while the udev database entry of the device is not
+    modified. Devices without udev database entry are not cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, dev, load, complete=bool):
+        """
+        Return the cached value for dev, or call load(dev) to load the value.
+        The value is cached only if complete(value) is True.
+        """
+        stamp = _udev_stamp(dev)
+        if stamp is not None:
+            with self._lock:
+                entry = self._entries.get(dev)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+
+        value = load(dev)
+
+        if stamp is not None and complete(value):
+            with self._lock:
+                self._entries[dev] = (stamp, value)
+        return value
+
+    def prune(self, devs):
+        """
+        Drop entries for devices not in devs.
+        """
+        with self._lock:
+            for dev in set(self._entries) - set(devs):
+                del self._entries[dev]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _udev_stamp(dev):
+    """
+    Return the identity of the udev database entry of dev, or None if dev
+    has no udev database entry.
+    """
+    try:
+        with open(os.path.join(SYS_BLOCK, dev, "dev")) as f:
+            devno = f.read().strip()
+        st = os.stat(os.path.join(UDEV_DATA, "b" + devno))
+    except EnvironmentError:
+        return None
+    return devno, st.st_ino, st.st_mtime
+
+
+# Serial of multipath devices.
+_serials = DeviceCache()
+
+# Attributes of multipath devices slaves.
+_slaves = DeviceCache()
+
+_SLAVE_ATTRIBUTES = ("vendor", "product", "fwrev", "logicalblocksize",
+                     "physicalblocksize")
+
+
+def _slave_attributes(slave):
+    """
+    Read the attributes of a multipath device slave from sysfs. Attributes
+    that cannot be read are not included.
+    """
+    attrs = {}
+
+    try:
+        attrs["vendor"] = getVendor(slave)
+    except Exception:
+        log.warn("Problem getting vendor from device `%s`",
+                 slave, exc_info=True)
+
+    try:
+        attrs["product"] = getModel(slave)
+    except Exception:
+        log.warn("Problem getting model name from device `%s`",
+                 slave, exc_info=True)
+
+    try:
+        attrs["fwrev"] = getFwRev(slave)
+    except Exception:
+        log.warn("Problem getting fwrev from device `%s`",
+                 slave, exc_info=True)
+
+    try:
+        logBlkSize, phyBlkSize = getDeviceBlockSizes(slave)
+        attrs["logicalblocksize"] = str(logBlkSize)
+        attrs["physicalblocksize"] = str(phyBlkSize)
+    except Exception:
+        log.warn("Problem getting blocksize from device `%s`",
+                 slave, exc_info=True)
+
+    try:
+        hbtl = getHBTL(slave)
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            log.warn("Device has no hbtl: %s", slave)
+            attrs["lun"] = 0
+        else:
+            log.error("Error: %s while trying to get hbtl of device: "
+                      "%s", e, slave)
+            raise
+    else:
+        attrs["lun"] = hbtl.lun
+
+    attrs["iscsi"] = iscsi.devIsiSCSI(slave)
+
+    return attrs
+
+
+def _complete_slave_attributes(attrs):
+    return all(name in attrs for name in _SLAVE_ATTRIBUTES)
+
+
 def pathListIter(filterGuids=()):
     filterLen = len(filterGuids) if filterGuids else -1
-    devsFound = 0
     knownSessions = {}
     pathStatuses = devicemapper.getPathsStatus()
 
+    devices = []
     for dmId, guid in getMPDevsIter():
-        if devsFound == filterLen:
+        if len(devices) == filterLen:
             break
 
         if filterGuids and guid not in filterGuids:
             continue
 
-        devsFound += 1
-
-        devInfo = {
-            "guid": guid,
-            "dm": dmId,
-            "capacity": str(getDeviceSize(dmId)),
-            "serial": get_scsi_serial(dmId),
-            "paths": [],
-            "connections": [],
-            "devtypes": [],
-            "devtype": "",
-            "vendor": "",
-            "product": "",
-            "fwrev": "",
-            "logicalblocksize": "",
-            "physicalblocksize": "",
-            "discard_max_bytes": getDeviceDiscardMaxBytes(dmId),
-        }
-
-        for slave in devicemapper.getSlaves(dmId):
-            if not devicemapper.isBlockDevice(slave):
-                log.warning("No such physdev '%s' is ignored" % slave)
-                continue
+        devices.append((dmId, guid))
+
+    def scan(item):
+        idx, (dmId, guid) = item
+        return idx, _device_info(dmId, guid, pathStatuses, knownSessions)
+
+    # Devices are independent; reading attributes of devices not in the
+    # cache is slow, so scan devices in parallel, reporting them in order.
+    results = [None] * len(devices)
+    for res in concurrent.tmap(
+            scan, enumerate(devices), max_workers=SCAN_WORKERS,
+            name="multipath"):
+        if not res.succeeded:
+            raise res.value
+        idx, devInfo = res.value
+        results[idx] = devInfo
+
+    if not filterGuids:
+        _serials.prune(dmId for dmId, _ in devices)
+        _slaves.prune(path["physdev"] for devInfo in results
+                      for path in devInfo["paths"])
+
+    for devInfo in results:
+        yield devInfo
 
-            if not devInfo["vendor"]:
-                try:
-                    devInfo["vendor"] = getVendor(slave)
-                except Exception:
-                    log.warn("Problem getting vendor from device `%s`",
-                             slave, exc_info=True)
-
-            if not devInfo["product"]:
-                try:
-                    devInfo["product"] = getModel(slave)
-                except Exception:
-                    log.warn("Problem getting model name from device `%s`",
-                             slave, exc_info=True)
-
-            if not devInfo["fwrev"]:
-                try:
-                    devInfo["fwrev"] = getFwRev(slave)
-                except Exception:
-                    log.warn("Problem getting fwrev from device `%s`",
-                             slave, exc_info=True)
-
-            if (not devInfo["logicalblocksize"] or
-                    not devInfo["physicalblocksize"]):
-                try:
-                    logBlkSize, phyBlkSize = getDeviceBlockSizes(slave)
-                    devInfo["logicalblocksize"] = str(logBlkSize)
-                    devInfo["physicalblocksize"] = str(phyBlkSize)
-                except Exception:
-                    log.warn("Problem getting blocksize from device `%s`",
-                             slave, exc_info=True)
-
-            pathInfo = {}
-            pathInfo["physdev"] = slave
-            pathInfo["state"] = pathStatuses.get(slave, "failed")
-            pathInfo["capacity"] = str(getDeviceSize(slave))
-            try:
-                hbtl = getHBTL(slave)
-            except OSError as e:
-                if e.errno == errno.ENOENT:
-                    log.warn("Device has no hbtl: %s", slave)
-                    pathInfo["lun"] = 0
-                else:
-                    log.error("Error: %s while trying to get hbtl of device: "
-                              "%s", e, slave)
-                    raise
-            else:
-                pathInfo["lun"] = hbtl.lun
-
-            if iscsi.devIsiSCSI(slave):
-                devInfo["devtypes"].append(DEV_ISCSI)
-                pathInfo["type"] = DEV_ISCSI
-                sessionID = iscsi.getiScsiSession(slave)
-                if sessionID not in knownSessions:
-                    # FIXME: This entire part is for BC. It should be moved to
-                    # hsm and not preserved for new APIs. New APIs should keep
-                    # numeric types and sane field names.
-                    sess = iscsi.getSessionInfo(sessionID)
-                    sessionInfo = {
-                        "connection": sess.target.portal.hostname,
-                        "port": str(sess.target.portal.port),
-                        "iqn": sess.target.iqn,
-                        "portal": str(sess.target.tpgt),
-                        "initiatorname": sess.iface.name
-                    }
-
-                    # Note that credentials must be sent back in order for
-                    # the engine to tell vdsm how to reconnect later
-                    if sess.credentials:
-                        cred = sess.credentials
-                        sessionInfo['user'] = cred.username
-                        sessionInfo['password'] = cred.password
-
-                    knownSessions[sessionID] = sessionInfo
-                devInfo["connections"].append(knownSessions[sessionID])
-            else:
-                devInfo["devtypes"].append(DEV_FCP)
-                pathInfo["type"] = DEV_FCP
-
-            if devInfo["devtype"] == "":
-                devInfo["devtype"] = pathInfo["type"]
-            elif (devInfo["devtype"] != DEV_MIXED and
-                  devInfo["devtype"] != pathInfo["type"]):
-                devInfo["devtype"] == DEV_MIXED
-
-            devInfo["paths"].append(pathInfo)
 
-        yield devInfo
+def _device_info(dmId, guid, pathStatuses, knownSessions):
+    devInfo = {
+        "guid": guid,
+        "dm": dmId,
+        "capacity": str(getDeviceSize(dmId)),
+        "serial": _serials.get(dmId, get_scsi_serial),
+        "paths": [],
+        "connections": [],
+        "devtypes": [],
+        "devtype": "",
+        "vendor": "",
+        "product": "",
+        "fwrev": "",
+        "logicalblocksize": "",
+        "physicalblocksize": "",
+        "discard_max_bytes": getDeviceDiscardMaxBytes(dmId),
+    }
+
+    for slave in devicemapper.getSlaves(dmId):
+        if not devicemapper.isBlockDevice(slave):
+            log.warning("No such physdev '%s' is ignored" % slave)
+            continue
+
+        attrs = _slaves.get(
+            slave, _slave_attributes, complete=_complete_slave_attributes)
+
+        for name in _SLAVE_ATTRIBUTES:
+            if not devInfo[name] and name in attrs:
+                devInfo[name] = attrs[name]
+
+        pathInfo = {}
+        pathInfo["physdev"] = slave
+        pathInfo["state"] = pathStatuses.get(slave, "failed")
+        pathInfo["capacity"] = str(getDeviceSize(slave))
+        pathInfo["lun"] = attrs["lun"]
+
+        if attrs["iscsi"]:
+            devInfo["devtypes"].append(DEV_ISCSI)
+            pathInfo["type"] = DEV_ISCSI
+            sessionID = iscsi.getiScsiSession(slave)
+            if sessionID not in knownSessions:
+                # FIXME: This entire part is for BC. It should be moved to
+                # hsm and not preserved for new APIs. New APIs should keep
+                # numeric types and sane field names.
+                sess = iscsi.getSessionInfo(sessionID)
+                sessionInfo = {
+                    "connection": sess.target.portal.hostname,
+                    "port": str(sess.target.portal.port),
+                    "iqn": sess.target.iqn,
+                    "portal": str(sess.target.tpgt),
+                    "initiatorname": sess.iface.name
+                }
+
+                # Note that credentials must be sent back in order for
+                # the engine to tell vdsm how to reconnect later
+                if sess.credentials:
+                    cred = sess.credentials
+                    sessionInfo['user'] = cred.username
+                    sessionInfo['password'] = cred.password
+
+                knownSessions[sessionID] = sessionInfo
+            devInfo["connections"].append(knownSessions[sessionID])
+        else:
+            devInfo["devtypes"].append(DEV_FCP)
+            pathInfo["type"] = DEV_FCP
+
+        if devInfo["devtype"] == "":
+            devInfo["devtype"] = pathInfo["type"]
+        elif (devInfo["devtype"] != DEV_MIXED and
+              devInfo["devtype"] != pathInfo["type"]):
+            devInfo["devtype"] == DEV_MIXED
+
+        devInfo["paths"].append(pathInfo)
+
+    return devInfo
 
 
 TOXIC_REGEX = re.compile(r"[%s]" % re.sub(r"[\-\\\]]",
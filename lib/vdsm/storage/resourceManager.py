@@ -34,6 +34,7 @@ from six.moves import queue
 from vdsm import utils
 from vdsm.common import concurrent
 from vdsm.common.logutils import SimpleLogAdapter
+from vdsm.common.time import monotonic_time
 from vdsm.storage import exception as se
 from vdsm.storage import guarded
 from vdsm.storage import rwlock
@@ -85,6 +86,11 @@ STATUS_FREE = "free"
 STATUS_SHARED = "shared"
 STATUS_LOCKED = "locked"
 
+# Number of shards in a namespace. Resources are assigned to shards by name,
+# so requests for unrelated resources in the same namespace do not contend on
+# the same lock.
+NAMESPACE_SHARDS = 16
+
 
 def _statusFromType(locktype):
     if str(locktype) == SHARED:
@@ -179,6 +185,7 @@ class Request(object):
         self._doneEvent = threading.Event()
         self._callback = callback
         self.reqID = str(uuid4())
+        self.registered = monotonic_time()
         self._log = SimpleLogAdapter(self._log, {"ResName": self.full_name,
                                                  "ReqID": self.reqID})
 
@@ -378,8 +385,9 @@ class _ResourceManager(object):
             except KeyError:
                 raise ValueError("Namespace '%s' is not registered with this "
                                  "manager" % namespace)
-            resources = namespaceObj.resources
-            with namespaceObj.lock:
+            shard = namespaceObj.shard(name)
+            resources = shard.resources
+            with shard.lock:
                 if not namespaceObj.factory.resourceExists(name):
                     raise KeyError("No such resource '%s.%s'" % (namespace,
                                                                  name))
@@ -474,6 +482,25 @@ class _ResourceManager(object):
         request = Request(namespace, name, lockType, callback)
         self._log.debug("Trying to register resource '%s' for lock type '%s'",
                         full_name, lockType)
+
+        if self._enqueueRequest(request):
+            self._createResource(request)
+
+        return RequestRef(request)
+
+    def _enqueueRequest(self, request):
+        """
+        Grant request or add it to the resource queue.
+
+        If the resource does not exist, reserve it for request and return
+        True. The caller must create the resource by calling
+        _createResource() after the locks are released, so creating a
+        resource does not block other requests in the namespace.
+        """
+        namespace = request.namespace
+        name = request.name
+        full_name = request.full_name
+
         with utils.RollbackContext() as contextCleanup, self._syncRoot.shared:
             try:
                 namespaceObj = self._namespaces[namespace]
@@ -481,15 +508,17 @@ class _ResourceManager(object):
                 raise ValueError("Namespace '%s' is not registered with this "
                                  "manager" % namespace)
 
-            resources = namespaceObj.resources
-            with namespaceObj.lock:
+            shard = namespaceObj.shard(name)
+            resources = shard.resources
+            with shard.lock:
                 try:
                     resource = resources[name]
                 except KeyError:
                     if not namespaceObj.factory.resourceExists(name):
                         raise KeyError("No such resource '%s'" % (full_name))
                 else:
-                    if len(resource.queue) == 0 and \
+                    if not resource.creating and \
+                            len(resource.queue) == 0 and \
                             resource.currentLock == SHARED and \
                             request.lockType == SHARED:
                         resource.activeUsers += 1
@@ -498,45 +527,113 @@ class _ResourceManager(object):
                                         "shared lock (%d active users)",
                                         full_name, resource.activeUsers)
                         request.grant()
+                        namespaceObj.stats.request_granted(request)
                         contextCleanup.defer(request.emit,
                                              ResourceRef(namespace, name,
                                                          resource.realObj,
                                                          request.reqID))
-                        return RequestRef(request)
+                        return False
 
                     resource.queue.insert(0, request)
+                    namespaceObj.stats.request_queued()
                     self._log.debug("Resource '%s' is currently locked, "
                                     "Entering queue (%d in queue)",
                                     full_name, len(resource.queue))
-                    return RequestRef(request)
-
-                # TODO : Creating the object inside the namespace lock causes
-                #        the entire namespace to lock and might cause
-                #        performance issues. As this is no currently a problem
-                #        I left it as it is to keep the code simple. If there
-                #        is a bottleneck in the resource framework, its
-                #        probably here.
-                try:
-                    obj = namespaceObj.factory.createResource(name, lockType)
-                except:
-                    self._log.warning(
-                        "Resource factory failed to create resource"
-                        " '%s'. Canceling request.", full_name, exc_info=True)
-                    contextCleanup.defer(request.cancel)
-                    return RequestRef(request)
-
-                resource = resources[name] = ResourceInfo(obj, namespace, name)
+                    return False
+
+                # Reserve the resource for this request. Requests for the
+                # resource will wait in the queue until the resource is
+                # created.
+                resource = ResourceInfo(None, namespace, name)
+                resources[name] = resource
+                resource.creating = True
                 resource.currentLock = request.lockType
                 resource.activeUsers += 1
+                return True
+
+    def _createResource(self, request):
+        """
+        Create the resource reserved for request, and grant the request.
 
-                self._log.debug("Resource '%s' is free. Now locking as '%s' "
-                                "(1 active user)", full_name, request.lockType)
+        If creating the resource fails, cancel the request and retry the
+        requests waiting for the resource.
+        """
+        namespace = request.namespace
+        name = request.name
+        full_name = request.full_name
+        namespaceObj = self._namespaces[namespace]
+        shard = namespaceObj.shard(name)
+
+        try:
+            obj = namespaceObj.factory.createResource(name, request.lockType)
+        except:
+            self._log.warning(
+                "Resource factory failed to create resource"
+                " '%s'. Canceling request.", full_name, exc_info=True)
+            with shard.lock:
+                resource = shard.resources.pop(name)
+                waiting = []
+                while resource.queue:
+                    waiting.append(resource.queue.pop())
+                    namespaceObj.stats.request_dequeued()
+            request.cancel()
+            self._retryRequests(waiting)
+            return
+
+        with utils.RollbackContext() as contextCleanup, shard.lock:
+            resource = shard.resources[name]
+            resource.realObj = obj
+            resource.creating = False
+            resource.granted = monotonic_time()
+
+            try:
                 request.grant()
-                contextCleanup.defer(request.emit,
-                                     ResourceRef(namespace, name,
-                                                 resource.realObj,
-                                                 request.reqID))
-                return RequestRef(request)
+            except RequestAlreadyProcessedError:
+                # A retried request may be canceled by its owner while we
+                # create the resource.
+                self._log.debug("Request '%s' was canceled while creating "
+                                "the resource", request)
+                contextCleanup.defer(self.releaseResource, namespace, name)
+                return
+
+            self._log.debug("Resource '%s' is free. Now locking as '%s' "
+                            "(1 active user)", full_name, request.lockType)
+            namespaceObj.stats.request_granted(request)
+            contextCleanup.defer(request.emit,
+                                 ResourceRef(namespace, name,
+                                             resource.realObj,
+                                             request.reqID))
+
+            # Requests for a shared lock may have been queued while the
+            # resource was created.
+            if resource.currentLock == SHARED:
+                self._grantSharedRequests(namespaceObj, resource,
+                                          contextCleanup)
+
+    def _retryRequests(self, requests):
+        """
+        Register again requests that were waiting for a resource that could
+        not be created. The first request will try to create the resource
+        again.
+        """
+        for request in requests:
+            if request.canceled():
+                continue
+            try:
+                if not self._enqueueRequest(request):
+                    continue
+            except Exception:
+                # For example, the resource was removed. Cancel the request
+                # and continue with the other requests.
+                self._log.warning("Cannot retry request %s, canceling "
+                                  "request", request, exc_info=True)
+                try:
+                    request.cancel()
+                except RequestAlreadyProcessedError:
+                    pass
+                continue
+
+            self._createResource(request)
 
     def releaseResource(self, namespace, name):
         # WARN : unlike in resource acquire the user now has the request
@@ -552,9 +649,10 @@ class _ResourceManager(object):
             except KeyError:
                 raise ValueError("Namespace '%s' is not registered with this "
                                  "manager", namespace)
-            resources = namespaceObj.resources
+            shard = namespaceObj.shard(name)
+            resources = shard.resources
 
-            with namespaceObj.lock:
+            with shard.lock:
                 try:
                     resource = resources[name]
                 except KeyError:
@@ -568,6 +666,8 @@ class _ResourceManager(object):
                 # Is some one else is using the resource
                 if resource.activeUsers > 0:
                     return
+
+                namespaceObj.stats.resource_released(resource)
                 self._log.debug("Resource '%s' is free, finding out if anyone "
                                 "is waiting for it.", full_name)
                 # Grant a request
@@ -584,6 +684,7 @@ class _ResourceManager(object):
                                     "Handling top request.", full_name,
                                     len(resource.queue))
                     nextRequest = resource.queue.pop()
+                    namespaceObj.stats.request_dequeued()
                     # We lock the request to simulate a transaction. We cannot
                     # grant the request before there is a resource switch. And
                     # we can't do a resource switch before we can guarantee
@@ -606,6 +707,8 @@ class _ResourceManager(object):
                             continue
 
                         nextRequest.grant()
+                        namespaceObj.stats.request_granted(nextRequest)
+                        resource.granted = monotonic_time()
                         contextCleanup.defer(
                             partial(nextRequest.emit,
                                     ResourceRef(namespace, name,
@@ -623,43 +726,143 @@ class _ResourceManager(object):
                     return
 
                 # Keep granting shared locks
-                self._log.debug("This is a shared lock. Granting all shared "
-                                "requests")
-                while len(resource.queue) > 0:
+                self._grantSharedRequests(namespaceObj, resource,
+                                          contextCleanup)
+
+    def _grantSharedRequests(self, namespaceObj, resource, contextCleanup):
+        """
+        Grant the requests for a shared lock at the head of the queue of a
+        resource locked in shared mode. Must be called with the resource
+        shard lock held.
+        """
+        self._log.debug("This is a shared lock. Granting all shared "
+                        "requests")
+        while len(resource.queue) > 0:
+
+            nextRequest = resource.queue[-1]
+            if nextRequest.canceled():
+                resource.queue.pop()
+                namespaceObj.stats.request_dequeued()
+                continue
 
-                    nextRequest = resource.queue[-1]
-                    if nextRequest.canceled():
-                        resource.queue.pop()
-                        continue
+            if nextRequest.lockType == EXCLUSIVE:
+                break
 
-                    if nextRequest.lockType == EXCLUSIVE:
-                        break
+            nextRequest = resource.queue.pop()
+            namespaceObj.stats.request_dequeued()
+            try:
+                nextRequest.grant()
+                contextCleanup.defer(
+                    partial(nextRequest.emit,
+                            ResourceRef(resource.namespace, resource.name,
+                                        resource.realObj,
+                                        nextRequest.reqID)))
+            except RequestAlreadyProcessedError:
+                continue
 
-                    nextRequest = resource.queue.pop()
-                    try:
-                        nextRequest.grant()
-                        contextCleanup.defer(
-                            partial(nextRequest.emit,
-                                    ResourceRef(namespace, name,
-                                                resource.realObj,
-                                                nextRequest.reqID)))
-                    except RequestAlreadyProcessedError:
-                        continue
+            namespaceObj.stats.request_granted(nextRequest)
+            resource.activeUsers += 1
+            self._log.debug("Request '%s' was granted (%d "
+                            "active users)", nextRequest,
+                            resource.activeUsers)
 
-                    resource.activeUsers += 1
-                    self._log.debug("Request '%s' was granted (%d "
-                                    "active users)", nextRequest,
-                                    resource.activeUsers)
+    def getStats(self):
+        """
+        Return contention statistics for all namespaces.
+        """
+        with self._syncRoot.shared:
+            return {name: namespaceObj.stats.info()
+                    for name, namespaceObj in six.iteritems(self._namespaces)}
 
 
 class Namespace(object):
     """
     Namespace struct
+
+    Resources are kept in shards selected by the resource name. Each shard
+    has its own lock protecting the shard resources.
     """
-    def __init__(self, factory):
-        self.resources = {}
-        self.lock = threading.Lock()  # rwlock.RWLock()
+    def __init__(self, factory, shards=NAMESPACE_SHARDS):
+        self.shards = [Shard() for i in range(shards)]
         self.factory = factory
+        self.stats = NamespaceStats()
+
+    def shard(self, name):
+        return self.shards[hash(name) % len(self.shards)]
+
+
+class Shard(object):
+    """
+    Shard struct
+    """
+    def __init__(self):
+        self.resources = {}
+        self.lock = threading.Lock()
+
+
+class NamespaceStats(object):
+    """
+    Contention statistics of a namespace.
+
+    - requests: number of granted requests
+    - contended: number of requests that had to wait in a resource queue
+    - wait_time, max_wait_time: total and maximum time in seconds between
+      registering a request and granting it
+    - holds: number of times a resource was released by all its users
+    - hold_time, max_hold_time: total and maximum time in seconds a resource
+      was held by a group of users
+    - queued, max_queued: current and maximum number of queued requests
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._contended = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._holds = 0
+        self._hold_time = 0.0
+        self._max_hold_time = 0.0
+        self._queued = 0
+        self._max_queued = 0
+
+    def request_queued(self):
+        with self._lock:
+            self._contended += 1
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+    def request_dequeued(self):
+        with self._lock:
+            self._queued -= 1
+
+    def request_granted(self, request):
+        wait_time = monotonic_time() - request.registered
+        with self._lock:
+            self._requests += 1
+            self._wait_time += wait_time
+            self._max_wait_time = max(self._max_wait_time, wait_time)
+
+    def resource_released(self, resource):
+        hold_time = monotonic_time() - resource.granted
+        with self._lock:
+            self._holds += 1
+            self._hold_time += hold_time
+            self._max_hold_time = max(self._max_hold_time, hold_time)
+
+    def info(self):
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "contended": self._contended,
+                "wait_time": self._wait_time,
+                "max_wait_time": self._max_wait_time,
+                "holds": self._holds,
+                "hold_time": self._hold_time,
+                "max_hold_time": self._max_hold_time,
+                "queued": self._queued,
+                "max_queued": self._max_queued,
+            }
 
 
 class ResourceInfo(object):
@@ -671,6 +874,10 @@ class ResourceInfo(object):
         self.activeUsers = 0
         self.currentLock = None
         self.realObj = realObj
+        # True while the resource is created outside of the shard lock.
+        self.creating = False
+        # Time the resource was granted to its current users.
+        self.granted = None
         self.namespace = namespace
         self.name = name
         self.full_name = "%s.%s" % (namespace, name)
@@ -833,6 +1040,13 @@ def releaseResource(namespace, name):
     _manager.releaseResource(namespace, name)
 
 
+def getStats():
+    """
+    Return contention statistics for all namespaces.
+    """
+    return _manager.getStats()
+
+
 def getNamespace(*args):
     """
     Format namespace stirng from sequence of names.
@@ -166,6 +166,96 @@ ImgsPar = namedtuple("ImgsPar", "imgs,parent")
 ISO_IMAGE_UUID = '11111111-1111-1111-1111-111111111111'
 BLANK_UUID = '00000000-0000-0000-0000-000000000000'
 
+
+class ImageChain(object):
+    """
+    Volumes graph of an image, built by StorageDomainManifest.image_chain()
+    from a single scan of the domain, without creating volume objects.
+
+    Arguments:
+        img_id (str): image UUID
+        parents (dict): mapping of image volume UUID to parent volume UUID,
+            not including the template volume.
+        external (iterable): UUIDs of volumes in other images that may be the
+            parent of the image volumes (template volumes).
+    """
+
+    log = logging.getLogger("storage.ImageChain")
+
+    def __init__(self, img_id, parents, external=()):
+        self.img_id = img_id
+        self.parents = parents
+        children = frozenset(six.itervalues(parents))
+        # Volumes with no child in the image.
+        self.leaves = sorted(vol_id for vol_id in parents
+                             if vol_id not in children)
+        self.template = None
+        external = frozenset(external)
+        for parent in children:
+            if parent not in parents and parent in external:
+                self.template = parent
+                break
+
+    @property
+    def leaf(self):
+        """
+        Return the leaf volume UUID, or None if the image has no leaf or more
+        than one leaf.
+        """
+        if len(self.leaves) == 1:
+            return self.leaves[0]
+        return None
+
+    def volumes(self):
+        """
+        Return list of image volumes UUIDs, including the template volume.
+        """
+        vols = list(self.parents)
+        if self.template:
+            vols.append(self.template)
+        return vols
+
+    def chain(self, vol_id=None):
+        """
+        Return list of volume UUIDs from the base volume to vol_id, or to the
+        leaf volume if vol_id is not specified, not including the template.
+
+        Returns None if the chain cannot be resolved from the graph: the
+        image does not have a single leaf, vol_id is not an image volume, or a
+        parent volume is missing.
+
+        Raises se.ImageIsNotLegalChain if the chain has a loop.
+        """
+        if vol_id is None:
+            vol_id = self.leaf
+        if vol_id not in self.parents:
+            return None
+
+        chain = []
+        seen = set()
+        while True:
+            chain.append(vol_id)
+            seen.add(vol_id)
+            parent = self.parents[vol_id]
+            if parent == BLANK_UUID or parent == self.template:
+                break
+            if parent in seen:
+                self.log.error("Image %s volume %s has invalid parent UUID %s",
+                               self.img_id, vol_id, parent)
+                raise se.ImageIsNotLegalChain(self.img_id)
+            if parent not in self.parents:
+                return None
+            vol_id = parent
+
+        chain.reverse()
+        return chain
+
+    def __repr__(self):
+        return ("<ImageChain img_id={self.img_id} leaves={self.leaves} "
+                "template={self.template} at {addr:#x}>").format(
+                    self=self, addr=id(self))
+
+
 UNICODE_MINIMAL_VERSION = 3
 
 # The LEASE_SLOT is used by Sanlock to not overlap with safelease in
@@ -659,6 +749,27 @@ class StorageDomainManifest(object):
         """
         raise NotImplementedError
 
+    def image_chain(self, imgUUID):
+        """
+        Return ImageChain of image imgUUID.
+        """
+        raise NotImplementedError
+
+    def volumes_metadata(self, imgUUID, vol_ids):
+        """
+        Return dict mapping volume id to VolumeMetadata for volumes vol_ids
+        of image imgUUID. Volumes with invalid metadata are not included.
+        """
+        metadata = {}
+        for vol_id in vol_ids:
+            try:
+                vol = self.produceVolume(imgUUID, vol_id)
+                metadata[vol_id] = vol.getMetadata()
+            except se.StorageException as e:
+                self.log.warning("Ignoring volume %s invalid metadata: %s",
+                                 vol_id, e)
+        return metadata
+
     # External leases support
 
     @classmethod
@@ -818,6 +929,12 @@ class StorageDomain(object):
     def getAllVolumes(self):
         return self._manifest.getAllVolumes()
 
+    def image_chain(self, imgUUID):
+        return self._manifest.image_chain(imgUUID)
+
+    def volumes_metadata(self, imgUUID, vol_ids):
+        return self._manifest.volumes_metadata(imgUUID, vol_ids)
+
     def iter_volumes(self):
         """
         Iterate over all volumes.
@@ -25,12 +25,12 @@ for keeping storage related data that is expensive to harvest, but needed often
 from __future__ import absolute_import
 
 import logging
+import os
 import threading
 
 from vdsm import utils
 from vdsm.storage import exception as se
 from vdsm.storage import lvm
-from vdsm.storage import misc
 from vdsm.storage import multipath
 
 
@@ -51,6 +51,40 @@ class DomainProxy(object):
         return self._cache._realProduce(self._sdUUID)
 
 
+class RefreshScope(object):
+    """
+    Storage to refresh. A scope without volume groups and devices refreshes
+    all storage.
+    """
+
+    def __init__(self, vgs=(), guids=(), resize=True):
+        self.vgs = frozenset(vgs)
+        self.guids = frozenset(guids)
+        self.resize = resize
+
+    @property
+    def full(self):
+        return not self.vgs and not self.guids
+
+    def merge(self, other):
+        """
+        Return a scope refreshing both this scope and other.
+        """
+        resize = self.resize or other.resize
+        if self.full or other.full:
+            return RefreshScope(resize=resize)
+        return RefreshScope(
+            vgs=self.vgs | other.vgs,
+            guids=self.guids | other.guids,
+            resize=resize)
+
+    def __repr__(self):
+        if self.full:
+            return "full, resize={}".format(self.resize)
+        return "vgs={}, guids={}, resize={}".format(
+            sorted(self.vgs), sorted(self.guids), self.resize)
+
+
 class StorageDomainCache:
     """
     Storage Domain List keeps track of all the storage domains accessible by
@@ -68,33 +102,137 @@ class StorageDomainCache:
         self.__domainCache = {}
         self.__inProgress = set()
         self.__staleStatus = self.STORAGE_STALE
+        # Number of invalidateStorage() calls, and its value when storage
+        # was last rescanned, or when a volume group was last refreshed.
+        self.__invalidations = 0
+        self.__rescanned = -1
+        self.__refreshedVGs = {}
         self.knownSDs = {}  # {sdUUID: mod.findDomain}
 
+        # Refresh requests are coalesced. A refresh generation is started
+        # when a refresh starts running, and completed when it finishes.
+        self._refreshCond = threading.Condition(threading.Lock())
+        self._refreshPending = None
+        self._refreshRunning = False
+        self._refreshStarted = 0
+        self._refreshCompleted = 0
+
     def invalidateStorage(self):
         self.log.info("Invalidating storage domain cache")
         with self._syncroot:
             self.__staleStatus = self.STORAGE_STALE
+            self.__invalidations += 1
+
+    def refreshStorage(self, resize=True, vgs=(), guids=()):
+        """
+        Refresh storage, and return the generation of the refresh.
+
+        If vgs or guids are specified, refresh only the specified volume
+        groups and multipath devices: rescan storage if it was invalidated
+        since the last rescan, resize only the specified devices and the
+        devices of the specified volume groups, and invalidate only their
+        lvm cache. Otherwise rescan and refresh all storage.
+
+        Concurrent calls are coalesced. A caller arriving while a refresh
+        is running waits for it, and then for the next refresh, refreshing
+        the scopes of all callers waiting for it. Every caller returns
+        after a refresh started after the call has completed.
+        """
+        scope = RefreshScope(vgs=vgs, guids=guids, resize=resize)
+
+        with self._refreshCond:
+            if self._refreshPending is None:
+                self._refreshPending = scope
+            else:
+                self._refreshPending = self._refreshPending.merge(scope)
+
+            generation = self._refreshStarted + 1
+
+            while self._refreshCompleted < generation:
+                if not self._refreshRunning:
+                    # Nobody is running the refresh we wait for, so we run
+                    # it, refreshing the scopes of all waiting callers.
+                    self._refreshRunning = True
+                    self._refreshStarted = generation
+                    scope = self._refreshPending
+                    self._refreshPending = None
+                    break
+                self._refreshCond.wait()
+            else:
+                return generation
 
-    @misc.samplingmethod
-    def refreshStorage(self, resize=True):
-        self.log.info("Refreshing storage domain cache (resize=%s)", resize)
+        try:
+            self._refresh(scope)
+        finally:
+            with self._refreshCond:
+                self._refreshRunning = False
+                self._refreshCompleted = generation
+                self._refreshCond.notify_all()
+
+        return generation
+
+    def _refresh(self, scope):
+        self.log.info("Refreshing storage domain cache (%s)", scope)
         with utils.stopwatch(
                 "Refreshing storage domain cache",
                 level=logging.INFO,
                 log=self.log):
-            self.__staleStatus = self.STORAGE_REFRESHING
-
-            multipath.rescan()
-            if resize:
-                multipath.resize_devices()
-            lvm.invalidateCache()
+            with self._syncroot:
+                invalidations = self.__invalidations
+                # Devices requested by guid (e.g. getDeviceList refreshing
+                # a resized LUN) must always be rescanned. Refreshing only
+                # domains' vgs may skip the rescan if the storage was not
+                # invalidated since the last rescan.
+                rescan = (scope.full or scope.guids or
+                          self.__rescanned != invalidations)
+                if scope.full:
+                    self.__staleStatus = self.STORAGE_REFRESHING
+
+            if rescan:
+                multipath.rescan()
+
+            if scope.full:
+                if scope.resize:
+                    multipath.resize_devices()
+                lvm.invalidateCache()
+            else:
+                guids = self._scopeDevices(scope)
+                if scope.resize and guids:
+                    multipath.resize_devices(guids=guids)
+                # New devices may be visible after a rescan.
+                lvm.invalidateFilter()
+                lvm.invalidatePVs(guids)
+                for vgName in sorted(scope.vgs):
+                    lvm.invalidateVG(vgName)
 
-            # If a new invalidateStorage request came in after the refresh
-            # started then we cannot flag the storages as updated (force a
-            # new rescan later).
             with self._syncroot:
-                if self.__staleStatus == self.STORAGE_REFRESHING:
-                    self.__staleStatus = self.STORAGE_UPDATED
+                if rescan:
+                    self.__rescanned = invalidations
+                # If a new invalidateStorage request came in after the
+                # refresh started then we cannot flag the storages as
+                # updated (force a new rescan later).
+                if scope.full:
+                    if self.__staleStatus == self.STORAGE_REFRESHING:
+                        self.__staleStatus = self.STORAGE_UPDATED
+                else:
+                    for vgName in scope.vgs:
+                        self.__refreshedVGs[vgName] = invalidations
+
+    def _scopeDevices(self, scope):
+        guids = set(scope.guids)
+        for vgName in scope.vgs:
+            try:
+                pvNames = lvm.listPVNames(vgName)
+            except se.VolumeGroupDoesNotExist:
+                # Not a block domain, or not visible yet.
+                continue
+            guids.update(os.path.basename(pvName) for pvName in pvNames)
+        return sorted(guids)
+
+    def _isFresh(self, sdUUID):
+        with self._syncroot:
+            return (self.__staleStatus == self.STORAGE_UPDATED
+                    or self.__refreshedVGs.get(sdUUID) == self.__invalidations)
 
     def produce_manifest(self, sdUUID):
         """
@@ -131,10 +269,9 @@ class StorageDomainCache:
 
         try:
             # If multiple calls reach this point and the storage is not
-            # updated the refreshStorage() sampling method is called
-            # serializing (and eventually grouping) the requests.
-            if self.__staleStatus != self.STORAGE_UPDATED:
-                self.refreshStorage()
+            # updated, the refreshStorage() calls are coalesced.
+            if not self._isFresh(sdUUID):
+                self._refreshDomainStorage(sdUUID)
 
             domain = self._findDomain(sdUUID)
 
@@ -147,6 +284,25 @@ class StorageDomainCache:
                 self.__inProgress.remove(sdUUID)
                 self._syncroot.notifyAll()
 
+    def _refreshDomainStorage(self, sdUUID):
+        """
+        Refresh the storage needed to find domain sdUUID.
+        """
+        from vdsm.storage import blockSD
+
+        findMethod = self.knownSDs.get(sdUUID)
+        if findMethod is blockSD.findDomain:
+            # Refresh only the domain volume group.
+            self.refreshStorage(vgs=(sdUUID,))
+        elif findMethod is None:
+            # Unknown domain, may be a block domain on storage which is not
+            # visible yet.
+            self.refreshStorage()
+        else:
+            # File domains do not use block storage.
+            self.log.debug("Skipping storage refresh for file domain %s",
+                           sdUUID)
+
     def _findDomain(self, sdUUID):
         try:
             findMethod = self.knownSDs[sdUUID]
@@ -66,6 +66,7 @@ from vdsm.storage import exception as se
 from vdsm.storage import constants as sc
 from vdsm.storage import outOfProcess as oop
 from vdsm.storage import resourceManager
+from vdsm.storage import taskjournal
 
 
 KEY_SEPARATOR = "="
@@ -88,6 +89,18 @@ def getProcPool():
     return oop.getProcessPool(sc.GLOBAL_OOP)
 
 
+def useJournal():
+    return config.getboolean('irs', 'task_journal')
+
+
+def _cleanStore(store, taskID, cleanDir):
+    journal = taskjournal.get(store)
+    if journal.get(taskID) is not None:
+        journal.remove(taskID)
+    if cleanDir:
+        getProcPool().fileUtils.cleanupdir(os.path.join(store, taskID))
+
+
 def _eq_encode(s):
     if KEY_SEPARATOR_ENCODED in s:
         raise ValueError("%s includes %s" % (s, KEY_SEPARATOR_ENCODED))
@@ -513,6 +526,7 @@ class Task:
         self.jobs = []
         self.nrecoveries = 0    # just utility count - used by save/load
         self.njobs = 0          # just utility count - used by save/load
+        self._loaded = False
 
         # Used by tests to wait for a task from another thread.
         self._is_done = threading.Event()
@@ -520,20 +534,21 @@ class Task:
         self.log = SimpleLogAdapter(self.log, {"Task": self.id})
 
     def __del__(self):
-        def finalize(log, owner, taskDir):
+        def finalize(log, owner, store, taskID, cleanDir):
             log.warn("Task was autocleaned")
             owner.releaseAll()
-            if taskDir is not None:
-                getProcPool().fileUtils.cleanupdir(taskDir)
+            if store is not None:
+                _cleanStore(store, taskID, cleanDir)
 
         if not self.state.isDone():
-            taskDir = None
+            store = None
             if (self.cleanPolicy == TaskCleanType.auto and
                     self.store is not None):
-                taskDir = os.path.join(self.store, self.id)
+                store = self.store
             t = concurrent.thread(
                 finalize,
-                args=(self.log, self.resOwner, taskDir),
+                args=(self.log, self.resOwner, store, self.id,
+                      self._cleanDir()),
                 name="task/" + self.id[:8])
             t.start()
 
@@ -699,6 +714,26 @@ class Task:
             cls.log.error("Unexpected error", exc_info=True)
             raise se.TaskMetaDataSaveError(filename)
 
+    @classmethod
+    def _dumpDict(cls, obj, fields):
+        values = {}
+        for field in fields:
+            try:
+                values[field] = six.text_type(getattr(obj, field))
+            except AttributeError:
+                cls.log.warning("object %s field %s not found" %
+                                (obj, field), exc_info=True)
+        return values
+
+    @classmethod
+    def _loadDict(cls, values, obj, fields):
+        for field, value in six.iteritems(values):
+            if field not in fields:
+                cls.log.warning("Task._loadDict: ignoring field %s", field)
+                continue
+            ftype = fields[field]
+            setattr(obj, field, ftype(value))
+
     def _loadTaskMetaFile(self, taskDir):
         taskFile = os.path.join(taskDir, self.id + TASK_EXT)
         self._loadMetaFile(taskFile, self, Task.fields)
@@ -767,7 +802,67 @@ class Task:
             self._loadRecoveryMetaFile(taskDir, rn)
             self.recoveries[rn].setOwnerTask(self)
 
+    def _loadState(self, state):
+        """
+        Load task from state saved in the tasks journal.
+        """
+        self.log.debug("%s: load from journal", self)
+        if self.state != State.init:
+            raise se.TaskMetaDataLoadError("task %s - can't load self: "
+                                           "not in init state" % self)
+        oldid = self.id
+        try:
+            self._loadDict(state["task"], self, Task.fields)
+            if self.id != oldid:
+                raise se.TaskMetaDataLoadError(
+                    "task %s: loaded state do not match id (%s != %s)" %
+                    (self, self.id, oldid))
+            if self.state == State.finished:
+                self._loadDict(state["result"], self.result,
+                               TaskResult.fields)
+            for jn, values in enumerate(state["jobs"]):
+                self.jobs.append(Job("load", None))
+                self._loadDict(values, self.jobs[jn], Job.fields)
+                self.jobs[jn].setOwnerTask(self)
+            for rn, values in enumerate(state["recoveries"]):
+                self.recoveries.append(Recovery("load", "load",
+                                                "load", "load", ""))
+                self._loadDict(values, self.recoveries[rn], Recovery.fields)
+                self.recoveries[rn].setOwnerTask(self)
+        except se.TaskMetaDataLoadError:
+            raise
+        except Exception:
+            self.log.error("Unexpected error", exc_info=True)
+            raise se.TaskMetaDataLoadError(self.id)
+
+    def _dumpState(self):
+        """
+        Return task state for saving in the tasks journal.
+        """
+        self.njobs = len(self.jobs)
+        self.nrecoveries = len(self.recoveries)
+        state = {
+            "task": self._dumpDict(self, Task.fields),
+            "jobs": [self._dumpDict(job, Job.fields) for job in self.jobs],
+            "recoveries": [self._dumpDict(rec, Recovery.fields)
+                           for rec in self.recoveries],
+        }
+        if self.state == State.finished:
+            state["result"] = self._dumpDict(self.result, TaskResult.fields)
+        return state
+
+    def _cleanDir(self):
+        # Tasks persisted in the journal do not have a task directory, but
+        # loaded tasks may have one, saved by an older version.
+        return not useJournal() or self._loaded
+
     def _save(self, storPath):
+        if useJournal():
+            # One record with the entire task state is appended to the
+            # journal, instead of writing a file per job and recovery.
+            taskjournal.get(storPath).save(self.id, self._dumpState())
+            return
+
         origTaskDir = os.path.join(storPath, self.id)
         if not getProcPool().os.path.exists(origTaskDir):
             raise se.TaskDirError("_save: no such task dir '%s'" % origTaskDir)
@@ -801,8 +896,7 @@ class Task:
         getProcPool().fileUtils.fsyncPath(origTaskDir)
 
     def _clean(self, storPath):
-        taskDir = os.path.join(storPath, self.id)
-        getProcPool().fileUtils.cleanupdir(taskDir)
+        _cleanStore(storPath, self.id, self._cleanDir())
 
     def _recoverDone(self):
         # protect agains races with stop/abort
@@ -1113,13 +1207,14 @@ class Task:
         self.setCleanPolicy(cleanPolicy)
         if self.persistPolicy != TaskPersistType.none and not self.store:
             raise se.TaskPersistError("no store defined")
-        taskDir = os.path.join(self.store, self.id)
-        try:
-            getProcPool().fileUtils.createdir(taskDir)
-        except Exception as e:
-            self.log.error("Unexpected error", exc_info=True)
-            raise se.TaskPersistError("%s: cannot access/create taskdir"
-                                      " %s: %s" % (self, taskDir, e))
+        if not useJournal():
+            taskDir = os.path.join(self.store, self.id)
+            try:
+                getProcPool().fileUtils.createdir(taskDir)
+            except Exception as e:
+                self.log.error("Unexpected error", exc_info=True)
+                raise se.TaskPersistError("%s: cannot access/create taskdir"
+                                          " %s: %s" % (self, taskDir, e))
         if (self.persistPolicy == TaskPersistType.auto and
                 self.state != State.init):
             self.persist()
@@ -1149,6 +1244,22 @@ class Task:
     @classmethod
     def loadTask(cls, store, taskid):
         t = Task(taskid)
+        # Prefer the format used for saving tasks, since it has the most
+        # recent state if a task was persisted in both formats.
+        state = taskjournal.get(store).get(taskid)
+        if state is not None and useJournal():
+            t._loadState(state)
+        else:
+            try:
+                t._loadDir(store, taskid)
+            except se.TaskDirError:
+                if state is None:
+                    raise
+                t._loadState(state)
+        t._loaded = True
+        return t
+
+    def _loadDir(self, store, taskid):
         if getProcPool().os.path.exists(os.path.join(store, taskid)):
             ext = ""
         # TBD: is this the correct order (temp < backup) + should temp
@@ -1162,8 +1273,7 @@ class Task:
         else:
             raise se.TaskDirError("loadTask: no such task dir '%s/%s'" %
                                   (store, taskid))
-        t._load(store, ext)
-        return t
+        self._load(store, ext)
 
     @threadlocal_task
     def prepare(self, func, *args, **kwargs):
@@ -27,6 +27,7 @@ import six
 
 from vdsm.config import config
 from vdsm.storage import exception as se
+from vdsm.storage import taskjournal
 from vdsm.storage.task import Task, Job, TaskCleanType
 from vdsm.storage.threadPool import ThreadPool
 
@@ -201,8 +202,12 @@ class TaskManager:
         if not os.path.exists(store):
             self.log.debug("task dump path %s does not exist.", store)
             return
-        # taskID is the root part of each (root.ext) entry in the dump task dir
-        tasksIDs = set(os.path.splitext(tid)[0] for tid in os.listdir(store))
+        # Replay the journal, since another host may have modified it.
+        tasksIDs = set(taskjournal.get(store).load())
+        # taskID is the root part of each (root.ext) entry in the dump task
+        # dir, except the journal.
+        tasksIDs.update(os.path.splitext(tid)[0] for tid in os.listdir(store)
+                        if not tid.startswith(taskjournal.JOURNAL_NAME))
         for taskID in tasksIDs:
             self.log.debug("Loading dumped task %s", taskID)
             try:
@@ -0,0 +1,278 @@
+#
+# Copyright 2020 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+"""
+taskjournal - persist tasks state in an append only journal
+===========================================================
+
+Persistent tasks used to be stored in a directory per task, with a file
+for the task, its result, and every job and recovery. Saving a task
+required about a dozen operations on the master domain mount, which is
+slow on NFS.
+
+The journal is a single file in the tasks directory of the master
+domain. Every time a task is saved, a record with the entire task state
+is appended to the journal; when a task is cleaned, a record removing
+the task is appended. Appending a record is one write and one fsync.
+
+Record format
+-------------
+
+Every record is a line::
+
+    crc32 json\\n
+
+Where crc32 is the checksum of the json payload in hex. The payload is
+the JSON object::
+
+    {"id": task_id, "task": task_state}
+
+task_state is null when the task was removed. Records with a bad
+checksum, for example a partial record written when the SPM was fenced
+in the middle of a write, are ignored when loading the journal.
+
+Compaction
+----------
+
+Loading the journal replays all records, keeping the last state of every
+task. When the journal contains many records for removed or modified
+tasks, it is compacted by writing the current state of all tasks to a
+temporary file and replacing the journal.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+
+import json
+import logging
+import os
+import threading
+import zlib
+
+from vdsm.common import cmdutils
+from vdsm.common import commands
+from vdsm.common import constants
+from vdsm.storage import constants as sc
+from vdsm.storage import exception as se
+from vdsm.storage import outOfProcess as oop
+
+JOURNAL_NAME = "tasks.journal"
+TEMP_EXT = ".temp"
+
+# Compact the journal when it has more records than this, and more than
+# twice the number of tasks.
+COMPACT_RECORDS = 1000
+
+log = logging.getLogger("storage.taskjournal")
+
+
+def encode(task_id, state):
+    """
+    Encode a record with task state, or removing the task if state is
+    None, returning bytes.
+    """
+    payload = json.dumps(
+        {"id": task_id, "task": state}, sort_keys=True).encode("utf-8")
+    return b"%08x %s\n" % (zlib.crc32(payload) & 0xffffffff, payload)
+
+
+def decode(line):
+    """
+    Decode a record line, returning tuple (task_id, state).
+
+    Raises ValueError if the record is invalid.
+    """
+    if not line.endswith(b"\n"):
+        raise ValueError("Partial record")
+    checksum, _, payload = line[:-1].partition(b" ")
+    if int(checksum, 16) != zlib.crc32(payload) & 0xffffffff:
+        raise ValueError("Checksum mismatch")
+    record = json.loads(payload.decode("utf-8"))
+    try:
+        return record["id"], record["task"]
+    except (KeyError, TypeError):
+        raise ValueError("Invalid record: %r" % record)
+
+
+class Journal(object):
+
+    def __init__(self, path, ioproc=None):
+        """
+        Arguments:
+            path (str): path to journal file.
+            ioproc: object implementing the ioprocess interface. See
+                storage.outOfProcess module for more info. If not set, use
+                the global process pool.
+        """
+        self._path = path
+        self._ioproc = ioproc
+        self._lock = threading.Lock()
+        # Current state of the journal, initialized when loading the
+        # journal.
+        self._tasks = None
+        self._records = 0
+        # The last record is partial; the next record must start on a new
+        # line.
+        self._partial = False
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def _oop(self):
+        # Get the process pool when needed, since idle processes are
+        # stopped.
+        if self._ioproc is not None:
+            return self._ioproc
+        return oop.getProcessPool(sc.GLOBAL_OOP)
+
+    def load(self):
+        """
+        Replay the journal, returning dict of task id to task state.
+        """
+        with self._lock:
+            self._load()
+            return dict(self._tasks)
+
+    def get(self, task_id):
+        """
+        Return the state of task task_id, or None if the task is not in the
+        journal.
+        """
+        with self._lock:
+            if self._tasks is None:
+                self._load()
+            return self._tasks.get(task_id)
+
+    def save(self, task_id, state):
+        """
+        Append a record with task state to the journal.
+        """
+        self._append(task_id, state)
+
+    def remove(self, task_id):
+        """
+        Append a record removing a task to the journal.
+        """
+        self._append(task_id, None)
+
+    def _append(self, task_id, state):
+        record = encode(task_id, state)
+        with self._lock:
+            if self._tasks is None:
+                self._load()
+            if self._partial:
+                record = b"\n" + record
+            try:
+                self._write(record)
+            except cmdutils.Error as e:
+                # The write may have appended part of the record.
+                self._partial = True
+                raise se.TaskPersistError(
+                    "Cannot write to journal %s: %s" % (self._path, e))
+            self._partial = False
+
+            if state is None:
+                self._tasks.pop(task_id, None)
+            else:
+                self._tasks[task_id] = state
+            self._records += 1
+
+            if (self._records > COMPACT_RECORDS
+                    and self._records > 2 * len(self._tasks)):
+                try:
+                    self._compact()
+                except Exception:
+                    log.exception("Error compacting journal %s", self._path)
+
+    def _load(self):
+        tasks = {}
+        records = 0
+        partial = False
+        if self._oop.os.path.exists(self._path):
+            data = self._oop.readFile(self._path)
+            partial = data != b"" and not data.endswith(b"\n")
+            for n, line in enumerate(data.splitlines(True), start=1):
+                try:
+                    task_id, state = decode(line)
+                except ValueError as e:
+                    log.warning("Ignoring invalid record %d in %s: %s",
+                                n, self._path, e)
+                    continue
+                if state is None:
+                    tasks.pop(task_id, None)
+                else:
+                    tasks[task_id] = state
+                records += 1
+        log.debug("Loaded %d tasks from %d records in %s",
+                  len(tasks), records, self._path)
+        self._tasks = tasks
+        self._records = records
+        self._partial = partial
+
+    def _write(self, data):
+        # Write the record out of process, since the master domain mount may
+        # be unresponsive. See xlease.DirectFile.pwrite() for more info on
+        # the dd flags.
+        args = [
+            constants.EXT_DD,
+            "iflag=fullblock",
+            "of=%s" % self._path,
+            "oflag=append",
+            "bs=%d" % len(data),
+            "count=1",
+            # notrunc is required with oflag=append, fsync ensures that the
+            # record reached storage before we return.
+            "conv=notrunc,fsync",
+        ]
+        rc, out, err = commands.execCmd(
+            args, data=data, raw=True, resetCpuAffinity=False)
+        if rc != 0:
+            raise cmdutils.Error(args, rc, out, err)
+
+    def _compact(self):
+        log.info("Compacting journal %s (records=%d, tasks=%d)",
+                 self._path, self._records, len(self._tasks))
+        tmp = self._path + TEMP_EXT
+        data = b"".join(encode(task_id, state)
+                        for task_id, state in sorted(self._tasks.items()))
+        self._oop.writeFile(tmp, data)
+        self._oop.fileUtils.fsyncPath(tmp)
+        self._oop.os.rename(tmp, self._path)
+        self._oop.fileUtils.fsyncPath(os.path.dirname(self._path))
+        self._records = len(self._tasks)
+        self._partial = False
+
+
+_journals = {}
+_lock = threading.Lock()
+
+
+def get(store):
+    """
+    Return the journal for tasks directory store.
+    """
+    with _lock:
+        journal = _journals.get(store)
+        if journal is None:
+            journal = Journal(os.path.join(store, JOURNAL_NAME))
+            _journals[store] = journal
+        return journal
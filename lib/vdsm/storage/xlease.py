@@ -806,25 +806,14 @@ class VolumeIndex(object):
         otherwise.
         """
         prefix = LOOKUP_STRUCT.pack(lease_id.encode("ascii"))
-
-        # TODO: continue search if offset is not aligned to record size.
-        offset = self._buf.find(prefix, RECORD_BASE)
-        if offset == -1:
-            return -1
-
-        return self._record_number(offset)
+        return self._find_aligned(prefix)
 
     def find_free_record(self):
         """
         Find the first free record. Returns record number if found, -1
         otherwise.
         """
-        # TODO: continue search if offset is not aligned to record size.
-        offset = self._buf.find(EMPTY_RECORD.bytes(), RECORD_BASE)
-        if offset == -1:
-            return -1
-
-        return self._record_number(offset)
+        return self._find_aligned(EMPTY_RECORD.bytes())
 
     def read_record(self, recnum):
         """
@@ -925,6 +914,22 @@ class VolumeIndex(object):
     def _record_offset(self, recnum):
         return RECORD_BASE + recnum * RECORD_SIZE
 
+    def _find_aligned(self, data):
+        """
+        Search the records for a record starting with data. Returns record
+        number if found, -1 otherwise.
+
+        mmap.find() may find data in the middle of a record; continue the
+        search until a match aligned to record size is found.
+        """
+        end = self._record_offset(MAX_RECORDS)
+        offset = self._buf.find(data, RECORD_BASE, end)
+        while offset != -1:
+            if (offset - RECORD_BASE) % RECORD_SIZE == 0:
+                return self._record_number(offset)
+            offset = self._buf.find(data, offset + 1, end)
+        return -1
+
     def _record_number(self, offset):
         return (offset - RECORD_BASE) // RECORD_SIZE
 
@@ -999,6 +1004,9 @@ class DirectFile(object):
     def name(self):
         return self._path
 
+    def fileno(self):
+        return self._file.fileno()
+
     def pread(self, offset, buf):
         """
         Read len(buf) bytes from storage at offset into mmap buf.
@@ -481,19 +481,25 @@ class GuestAgent(object):
                 info['guestIPs'] = self.guestInfo['guestIPs']
             if len(self.guestInfo['guestFQDN']) > 0:
                 info['guestFQDN'] = self.guestInfo['guestFQDN']
+        # oVirt GA info is modified in place when messages are received, so
+        # return a copy to callers.
+        info = utils.picklecopy(info)
+        # QEMU GA info is a shared read only snapshot, do not modify it. Its
+        # values are never modified, so they are not copied.
         qga = self._qgaGuestInfo()
         if qga is not None:
-            if 'diskMapping' in qga:
-                diskMapping.update(qga['diskMapping'])
-                del qga['diskMapping']
-            if len(info['appsList']) > 0 and 'appsList' in qga:
-                # This is an exception since the entry from QEMU GA is faked.
-                # Prefer oVirt GA info if available. Take fake QEMU GA info
-                # only if the other is not available.
-                del qga['appsList']
-            info.update(qga)
+            for key, value in six.iteritems(qga):
+                if key == 'diskMapping':
+                    diskMapping.update(value)
+                elif key == 'appsList' and len(info['appsList']) > 0:
+                    # This is an exception since the entry from QEMU GA is
+                    # faked. Prefer oVirt GA info if available. Take fake
+                    # QEMU GA info only if the other is not available.
+                    continue
+                else:
+                    info[key] = value
         self.guestDiskMapping = diskMapping
-        return utils.picklecopy(info)
+        return info
 
     def onReboot(self):
         self.guestStatus = vmstatus.REBOOT_IN_PROGRESS
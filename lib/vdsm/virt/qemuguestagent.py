@@ -25,7 +25,6 @@ from __future__ import division
 Periodic scheduler that polls QEMU Guest Agent for information.
 """
 
-from collections import defaultdict
 import copy
 import json
 import libvirt
@@ -46,8 +45,8 @@ import libvirt
 import libvirt_qemu
 import six
 import threading
+import types
 
-from vdsm import utils
 from vdsm import executor
 from vdsm.common.time import monotonic_time
 from vdsm.config import config
@@ -98,7 +97,7 @@ class QemuGuestAgentPoller(object):
         self._capabilities_lock = threading.Lock()
         self._capabilities = {}
         self._guest_info_lock = threading.Lock()
-        self._guest_info = defaultdict(dict)
+        self._guest_info = {}
         self._last_failure_lock = threading.Lock()
         self._last_failure = {}
 
@@ -160,9 +159,14 @@ class QemuGuestAgentPoller(object):
             op.stop()
 
     def get_caps(self, vm_id):
-        with self._capabilities_lock:
-            # Return a copy so the caller has a stable representation
-            return utils.picklecopy(self._capabilities.get(vm_id, None))
+        """
+        Return read only snapshot of the VM capabilities, or None.
+
+        Snapshots are never modified; updating the capabilities replaces
+        the snapshot, so the caller has a stable representation without
+        copying. The caller must not modify the values in the snapshot.
+        """
+        return self._capabilities.get(vm_id, None)
 
     def update_caps(self, vm_id, caps):
         if self._capabilities.get(vm_id, None) != caps:
@@ -170,16 +174,29 @@ class QemuGuestAgentPoller(object):
                 "New QEMU-GA capabilities for vm_id=%s, qemu-ga=%s,"
                 " commands=%r", vm_id, caps['version'], caps['commands'])
             with self._capabilities_lock:
-                self._capabilities[vm_id] = caps
+                self._capabilities[vm_id] = types.MappingProxyType(
+                    dict(caps))
 
     def get_guest_info(self, vm_id):
-        with self._guest_info_lock:
-            # Return a copy so the caller has a stable representation
-            return utils.picklecopy(self._guest_info.get(vm_id, None))
+        """
+        Return read only snapshot of the VM guest info, or None.
+
+        Snapshots are never modified; updating the guest info replaces the
+        snapshot, so the caller has a stable representation without
+        copying. The caller must not modify the values in the snapshot.
+        """
+        return self._guest_info.get(vm_id, None)
 
     def update_guest_info(self, vm_id, info):
+        """
+        Replace the VM guest info snapshot with a new snapshot including
+        info. The values in info are shared with readers of the snapshot and
+        must not be modified by the caller.
+        """
         with self._guest_info_lock:
-            self._guest_info[vm_id].update(info)
+            guest_info = dict(self._guest_info.get(vm_id, ()))
+            guest_info.update(info)
+            self._guest_info[vm_id] = types.MappingProxyType(guest_info)
 
     def last_failure(self, vm_id):
         return self._last_failure.get(vm_id, None)
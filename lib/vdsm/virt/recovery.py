@@ -25,8 +25,11 @@ import logging
 
 import libvirt
 
+from vdsm.common import concurrent
 from vdsm.common import libvirtconnection
 from vdsm.common import response
+from vdsm.common.config import config
+from vdsm.common.time import monotonic_time
 from vdsm.virt import vmchannels
 from vdsm.virt import vmstatus
 from vdsm.virt import vmxml
@@ -60,33 +63,102 @@ def _is_ignored_vm(dom_uuid, dom_obj, dom_xml):
     return False
 
 
-def _list_domains():
-    conn = libvirtconnection.get()
-    domains = []
-    for dom_obj in conn.listAllDomains():
-        dom_uuid = 'unknown'
+class _Domain(object):
+    """
+    A domain found by libvirt, with the information needed for recovery.
+    """
+
+    def __init__(self, obj, uuid, xml, external, params):
+        self.obj = obj
+        self.uuid = uuid
+        self.xml = xml
+        self.external = external
+        # None if parsing the domain xml failed; the error will be reported
+        # when recovering the domain.
+        self.params = params
+
+
+class _Stats(object):
+    """
+    Per stage timing of recovering domains.
+    """
+
+    def __init__(self):
+        self.fetch = 0.0
+        self.create = 0.0
+
+    def __str__(self):
+        return "fetch=%.2f create=%.2f" % (self.fetch, self.create)
+
+
+def _fetch_domain(dom_obj):
+    """
+    Fetch and parse domain xml, returning a _Domain or None if the domain
+    should not be recovered.
+    """
+    dom_uuid = 'unknown'
+    try:
+        dom_uuid = dom_obj.UUIDString()
+        logging.debug("Found domain %s", dom_uuid)
+        dom_xml = dom_obj.XMLDesc(0)
+    except libvirt.libvirtError as e:
+        if e.get_error_code() == libvirt.VIR_ERR_NO_DOMAIN:
+            logging.exception("domain %s is dead", dom_uuid)
+            return None
+        raise
+
+    if _is_ignored_vm(dom_uuid, dom_obj, dom_xml):
+        return None
+
+    external = _is_external_vm(dom_xml)
+    try:
+        params = _recovery_params(dom_uuid, dom_xml, external)
+    except Exception:
+        params = None
+    return _Domain(dom_obj, dom_uuid, dom_xml, external, params)
+
+
+def _fetch_domains(dom_objs, workers, stats):
+    """
+    Fetch domains using workers threads, yielding (index, _Domain) tuples
+    for domains to recover in the order listed by libvirt, as soon as they
+    are available.
+
+    Raises libvirt.libvirtError if fetching a domain failed, except for
+    domains that disappeared.
+    """
+    def fetch(item):
+        idx, dom_obj = item
+        start = monotonic_time()
         try:
-            dom_uuid = dom_obj.UUIDString()
-            logging.debug("Found domain %s", dom_uuid)
-            dom_xml = dom_obj.XMLDesc(0)
-        except libvirt.libvirtError as e:
-            if e.get_error_code() == libvirt.VIR_ERR_NO_DOMAIN:
-                logging.exception("domain %s is dead", dom_uuid)
-            else:
-                raise
-        else:
-            if _is_ignored_vm(dom_uuid, dom_obj, dom_xml):
-                continue
-            domains.append((dom_obj, dom_xml, _is_external_vm(dom_xml),))
-    return domains
+            return idx, True, _fetch_domain(dom_obj), monotonic_time() - start
+        except Exception as e:
+            return idx, False, e, monotonic_time() - start
 
+    fetched = {}
+    next_idx = 0
+    for res in concurrent.tmap(
+            fetch, enumerate(dom_objs), max_workers=workers,
+            name="recovery"):
+        idx, succeeded, value, elapsed = res.value
+        stats.fetch += elapsed
+        fetched[idx] = (succeeded, value)
+        while next_idx in fetched:
+            succeeded, value = fetched.pop(next_idx)
+            if not succeeded:
+                raise value
+            if value is not None:
+                yield next_idx, value
+            next_idx += 1
 
-def _recover_domain(cif, vm_id, dom_xml, external):
+
+def _recover_domain(cif, vm_id, dom_xml, external, params=None):
     external_str = " (external)" if external else ""
     cif.log.debug("recovery: trying with VM%s %s", external_str, vm_id)
     try:
-        res = cif.createVm(_recovery_params(vm_id, dom_xml, external),
-                           vmRecover=True)
+        if params is None:
+            params = _recovery_params(vm_id, dom_xml, external)
+        res = cif.createVm(params, vmRecover=True)
     except Exception:
         cif.log.exception("Error recovering VM%s: %s", external_str, vm_id)
         return False
@@ -112,27 +184,56 @@ def _recovery_params(vm_id, dom_xml, external):
     return params
 
 
-def all_domains(cif):
-    doms = _list_domains()
-    num_doms = len(doms)
-    for idx, (dom_obj, dom_xml, external) in enumerate(doms):
-        vm_id = dom_obj.UUIDString()
-        if _recover_domain(cif, vm_id, dom_xml, external):
+def all_domains(cif, workers=None):
+    """
+    Recover all domains found by libvirt.
+
+    Domains are fetched from libvirt and parsed by workers threads, while
+    the calling thread creates the Vm objects in the order listed by
+    libvirt. Returns when all domains were recovered or destroyed.
+
+    If fetching a domain fails, domains listed before it were already
+    recovered. When the recovery is retried, domains already known to cif
+    are skipped, so their Vm objects are not created again.
+    """
+    if workers is None:
+        workers = config.getint('vars', 'recovery_workers')
+    start = monotonic_time()
+    stats = _Stats()
+    conn = libvirtconnection.get()
+    dom_objs = conn.listAllDomains()
+    num_doms = len(dom_objs)
+    known_vms = cif.getVMs()
+    for idx, dom in _fetch_domains(dom_objs, workers, stats):
+        vm_id = dom.uuid
+        if vm_id in known_vms:
+            cif.log.info(
+                'recovery [1:%d/%d]: domain %s already recovered',
+                idx + 1, num_doms, vm_id)
+            continue
+        create_start = monotonic_time()
+        recovered = _recover_domain(
+            cif, vm_id, dom.xml, dom.external, dom.params)
+        stats.create += monotonic_time() - create_start
+        if recovered:
             cif.log.info(
                 'recovery [1:%d/%d]: recovered domain %s',
                 idx + 1, num_doms, vm_id)
-        elif external:
+        elif dom.external:
             cif.log.info("Failed to recover external domain: %s" % (vm_id,))
         else:
             cif.log.info(
                 'recovery [1:%d/%d]: loose domain %s found, killing it.',
                 idx + 1, num_doms, vm_id)
             try:
-                dom_obj.destroy()
+                dom.obj.destroy()
             except libvirt.libvirtError:
                 cif.log.exception(
                     'recovery [1:%d/%d]: failed to kill loose domain %s',
                     idx + 1, num_doms, vm_id)
+    cif.log.info(
+        'recovery: processed %d domains in %.2f seconds (%s)',
+        num_doms, monotonic_time() - start, stats)
 
 
 def lookup_external_vms(cif):
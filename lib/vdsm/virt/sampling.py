@@ -23,33 +23,37 @@ from __future__ import division
 
 import libvirt
 import six
-from six.moves import map
+from six.moves import intern
 
 """
 Support for VM and host statistics sampling.
 """
 
-from collections import defaultdict, deque, namedtuple
+from array import array
+from collections import defaultdict, namedtuple
 import logging
 import os
-import re
 import threading
 import time
+import weakref
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # python2
+    from collections import Mapping
 
 from vdsm import hugepages
 from vdsm import numa
-from vdsm import utils
 import vdsm.common.time
 from vdsm.common.units import KiB, MiB
 from vdsm.config import config
 from vdsm.constants import P_VDSM_RUN
 from vdsm.host import api as hostapi
+from vdsm.host import procfs
+from vdsm.virt import vmstats
 from vdsm.virt.utils import ExpiringCache
 
 
-_THP_STATE_PATH = '/sys/kernel/mm/transparent_hugepage/enabled'
-if not os.path.exists(_THP_STATE_PATH):
-    _THP_STATE_PATH = '/sys/kernel/mm/redhat_transparent_hugepage/enabled'
 _METRICS_ENABLED = config.getboolean('metrics', 'enabled')
 _NOWAIT_ENABLED = config.getboolean('nowait', 'enabled')
 
@@ -58,12 +62,10 @@ class TotalCpuSample(object):
     """
     A sample of total CPU consumption.
 
-    The sample is taken at initialization time and can't be updated.
+    The sample is taken from a procfs snapshot and can't be updated.
     """
-    def __init__(self):
-        with open('/proc/stat') as f:
-            self.user, userNice, self.sys, self.idle = \
-                map(int, f.readline().split()[1:5])
+    def __init__(self, snapshot):
+        self.user, userNice, self.sys, self.idle = snapshot.total_cpu
         self.user += userNice
 
 
@@ -71,24 +73,19 @@ class CpuCoreSample(object):
     """
     A sample of the CPU consumption of each core
 
-    The sample is taken at initialization time and can't be updated.
+    The sample is taken from a procfs snapshot and can't be updated.
     """
-    CPU_CORE_STATS_PATTERN = re.compile(r'cpu(\d+)\s+(.*)')
 
-    def __init__(self):
+    def __init__(self, snapshot):
         self.coresSample = {}
-        with open('/proc/stat') as src:
-            for line in src:
-                match = self.CPU_CORE_STATS_PATTERN.match(line)
-                if match:
-                    coreSample = {}
-                    user, userNice, sys, idle = \
-                        map(int, match.group(2).split()[0:4])
-                    coreSample['user'] = user
-                    coreSample['userNice'] = userNice
-                    coreSample['sys'] = sys
-                    coreSample['idle'] = idle
-                    self.coresSample[match.group(1)] = coreSample
+        for coreId, (user, userNice, sys, idle) in \
+                six.iteritems(snapshot.cpu_cores):
+            self.coresSample[coreId] = {
+                'user': user,
+                'userNice': userNice,
+                'sys': sys,
+                'idle': idle,
+            }
 
     def getCoreSample(self, coreId):
         strCoreId = str(coreId)
@@ -126,12 +123,10 @@ class PidCpuSample(object):
     """
     A sample of the CPU consumption of a process.
 
-    The sample is taken at initialization time and can't be updated.
+    The sample is taken from a procfs snapshot and can't be updated.
     """
-    def __init__(self, pid):
-        with open('/proc/%s/stat' % pid) as stat:
-            self.user, self.sys = \
-                map(int, stat.read().split()[13:15])
+    def __init__(self, snapshot):
+        self.user, self.sys = snapshot.pid_cpu
 
 
 class HostSample(object):
@@ -161,29 +156,21 @@ class HostSample(object):
         :param pid: The PID of this vdsm host.
         :type pid: int
         """
-        self.timestamp = time.time()
-        self.pidcpu = PidCpuSample(pid)
+        self.procfs = procfs.snapshot(pid)
+        self.timestamp = self.procfs.timestamp
+        self.pidcpu = PidCpuSample(self.procfs)
         self.ncpus = os.sysconf('SC_NPROCESSORS_ONLN')
-        self.totcpu = TotalCpuSample()
-        meminfo = utils.readMemInfo()
+        self.totcpu = TotalCpuSample(self.procfs)
+        meminfo = self.procfs.meminfo
         freeOrCached = (meminfo['MemFree'] +
                         meminfo['Cached'] + meminfo['Buffers'])
         self.memUsed = 100 - int(100.0 * (freeOrCached) / meminfo['MemTotal'])
         self.anonHugePages = meminfo.get('AnonHugePages', 0) // KiB
-        try:
-            with open('/proc/loadavg') as loadavg:
-                self.cpuLoad = loadavg.read().split()[1]
-        except:
-            self.cpuLoad = '0.0'
+        self.cpuLoad = self.procfs.cpu_load
         self.diskStats = self._getDiskStats()
-        try:
-            with open(_THP_STATE_PATH) as f:
-                s = f.read()
-                self.thpState = s[s.index('[') + 1:s.index(']')]
-        except:
-            self.thpState = 'never'
+        self.thpState = self.procfs.thp_state
         self.hugepages = hugepages.state()
-        self.cpuCores = CpuCoreSample()
+        self.cpuCores = CpuCoreSample(self.procfs)
         self.numaNodeMem = NumaNodeMemorySample()
 
 
@@ -191,14 +178,24 @@ _MINIMUM_SAMPLES = 1
 
 
 class SampleWindow(object):
-    """Keep sliding window of samples."""
+    """
+    Keep sliding window of samples.
+
+    Samples are kept in a preallocated ring buffer, so appending a sample and
+    accessing the first and last samples are O(1), regardless of the window
+    size.
+    """
 
     def __init__(self, size, timefn=time.time):
         if size < _MINIMUM_SAMPLES:
             raise ValueError("window size must be not less than %i" %
                              _MINIMUM_SAMPLES)
 
-        self._samples = deque(maxlen=size)
+        self._size = size
+        self._values = [None] * size
+        self._timestamps = array('d', [0.0] * size)
+        self._count = 0
+        self._next = 0
         self._timefn = timefn
 
     def append(self, value):
@@ -207,7 +204,11 @@ class SampleWindow(object):
         sample if needed.
         """
         timestamp = self._timefn()
-        self._samples.append((timestamp, value))
+        self._values[self._next] = value
+        self._timestamps[self._next] = timestamp
+        self._next = (self._next + 1) % self._size
+        if self._count < self._size:
+            self._count += 1
 
     def stats(self):
         """
@@ -215,11 +216,11 @@ class SampleWindow(object):
         the first and the last samples in the defined 'window' and the
         time difference between them.
         """
-        if len(self._samples) < 2:
+        if self._count < 2:
             return None, None, None
 
-        first_timestamp, first_sample = self._samples[0]
-        last_timestamp, last_sample = self._samples[-1]
+        first_timestamp, first_sample = self._item(self._count)
+        last_timestamp, last_sample = self._item(1)
 
         elapsed_time = last_timestamp - first_timestamp
         return first_sample, last_sample, elapsed_time
@@ -229,9 +230,80 @@ class SampleWindow(object):
         Return the nth-last collected sample, and its timestamp.
         Return (None, None) if the nth-last collected sample doesn't exist.
         """
-        if len(self._samples) < nth:
+        if self._count < nth:
             return None, None
-        return self._samples[-nth]
+        return self._item(nth)
+
+    def _item(self, nth):
+        index = (self._next - nth) % self._size
+        return self._timestamps[index], self._values[index]
+
+
+class _SampleKeys(object):
+    """
+    Counter names shared by compact samples with the same keys.
+    """
+
+    __slots__ = ('index', '__weakref__')
+
+    def __init__(self, keys):
+        self.index = {intern(key) if isinstance(key, str) else key: i
+                      for i, key in enumerate(keys)}
+
+
+class CompactSample(Mapping):
+    """
+    Read only mapping of counter names to values, storing only the values.
+
+    Bulk stats of a VM have the same counter names in most samples, so the
+    names are kept once in a _SampleKeys shared by all samples with the same
+    names, and every sample keeps only a tuple of values.
+    """
+
+    __slots__ = ('_keys', '_values')
+
+    def __init__(self, keys, values):
+        self._keys = keys
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._keys.index[key]]
+
+    def __contains__(self, key):
+        return key in self._keys.index
+
+    def __iter__(self):
+        return iter(self._keys.index)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return "<CompactSample %r>" % dict(self)
+
+
+class SampleCompactor(object):
+    """
+    Convert bulk stats dicts to CompactSample, sharing the counter names
+    between samples.
+    """
+
+    def __init__(self):
+        self._keys = weakref.WeakValueDictionary()
+
+    def compact(self, stats):
+        """
+        Return a CompactSample with the contents of stats dict. Values that
+        are not dicts are returned as is.
+        """
+        if not isinstance(stats, dict):
+            return stats
+        names = tuple(stats)
+        keys = self._keys.get(names)
+        if keys is None:
+            keys = _SampleKeys(names)
+            self._keys[names] = keys
+        return CompactSample(keys, tuple(six.itervalues(stats)))
 
 
 _StatsSample = namedtuple('StatsSample',
@@ -277,10 +349,12 @@ class StatsCache(object):
 
     _log = logging.getLogger("virt.sampling.StatsCache")
 
-    def __init__(self, clock=vdsm.common.time.monotonic_time):
+    def __init__(self, clock=vdsm.common.time.monotonic_time, size=2):
         self._clock = clock
         self._lock = threading.Lock()
-        self._samples = SampleWindow(size=2, timefn=self._clock)
+        self._samples = SampleWindow(size=size, timefn=self._clock)
+        self._compactor = SampleCompactor()
+        self._batch_stats = None
         self._last_sample_time = 0
         self._vm_last_timestamp = defaultdict(int)
 
@@ -340,6 +414,21 @@ class StatsCache(object):
                                             vm_id in self._vm_last_timestamp)
             }
 
+    def batch_stats(self):
+        """
+        Return vmstats.BatchStats for the available samples, or None if not
+        enough samples are available. The stats are computed once for all
+        VMs when first requested after adding a sample.
+        """
+        with self._lock:
+            if self._batch_stats is None:
+                first_batch, last_batch, interval = self._samples.stats()
+                if first_batch is None:
+                    return None
+                self._batch_stats = vmstats.BatchStats(
+                    first_batch, last_batch, interval)
+            return self._batch_stats
+
     def clock(self):
         """
         Provide timestamp compatible with what put() expects
@@ -358,7 +447,8 @@ class StatsCache(object):
         with self._lock:
             last_sample_time = self._last_sample_time
             if monotonic_ts >= last_sample_time:
-                self._samples.append(bulk_stats)
+                self._samples.append(self._compact(bulk_stats))
+                self._batch_stats = None
                 self._last_sample_time = monotonic_ts
 
                 self._update_ts(bulk_stats, monotonic_ts)
@@ -367,13 +457,18 @@ class StatsCache(object):
                     'dropped stale old sample: sampled %f stored %f',
                     monotonic_ts, last_sample_time)
 
+    def _compact(self, bulk_stats):
+        compact = self._compactor.compact
+        return {vmid: compact(stats)
+                for vmid, stats in six.iteritems(bulk_stats)}
+
     def _update_ts(self, bulk_stats, monotonic_ts):
         # FIXME: this is expected to be costly performance-wise.
         for vmid in bulk_stats:
             self._vm_last_timestamp[vmid] = monotonic_ts
 
 
-stats_cache = StatsCache()
+stats_cache = StatsCache(size=config.getint('vars', 'vm_sample_window'))
 
 
 # this value can be tricky to tune.
@@ -35,16 +35,25 @@ from vdsm.virt.utils import isVdsmImage
 _log = logging.getLogger('virt.vmstats')
 
 
-def produce(vm, first_sample, last_sample, interval):
+def produce(vm, first_sample, last_sample, interval, batch_stats=None):
     """
     Translates vm samples into stats.
+
+    If batch_stats is a BatchStats computed from the same samples, the
+    precomputed device stats are used.
     """
 
     stats = {}
 
+    sample_stats = None
+    if batch_stats is not None:
+        sample_stats = batch_stats.get(vm.id, first_sample, last_sample)
+
     cpu(stats, first_sample, last_sample, interval)
-    networks(vm, stats, first_sample, last_sample, interval)
-    disks(vm, stats, first_sample, last_sample, interval)
+    networks(vm, stats, first_sample, last_sample, interval,
+             sample_stats=sample_stats)
+    disks(vm, stats, first_sample, last_sample, interval,
+          sample_stats=sample_stats)
     balloon(vm, stats, last_sample)
     cpu_count(stats, last_sample)
     tune_io(vm, stats)
@@ -53,6 +62,67 @@ def produce(vm, first_sample, last_sample, interval):
     return stats
 
 
+class SampleStats(object):
+    """
+    Device stats computed from two bulk stats samples of one VM.
+
+    The device stats depend only on the samples, so they can be computed
+    once and used to produce the stats of the VM many times.
+    """
+
+    __slots__ = ("first_sample", "last_sample", "nics", "disks")
+
+    def __init__(self, first_sample, last_sample, interval):
+        self.first_sample = first_sample
+        self.last_sample = last_sample
+
+        # nic name -> (counters, errors)
+        self.nics = {}
+        first_indexes = _find_bulk_stats_reverse_map(first_sample, 'net')
+        last_indexes = _find_bulk_stats_reverse_map(last_sample, 'net')
+        for name, last_index in six.iteritems(last_indexes):
+            if name in first_indexes:
+                self.nics[name] = _nic_counters(last_sample, last_index)
+
+        # drive name -> stats
+        self.disks = {}
+        first_indexes = _find_bulk_stats_reverse_map(first_sample, 'block')
+        last_indexes = _find_bulk_stats_reverse_map(last_sample, 'block')
+        for name, last_index in six.iteritems(last_indexes):
+            if name in first_indexes:
+                self.disks[name] = _disk_stats(
+                    first_sample, first_indexes[name],
+                    last_sample, last_index,
+                    interval)
+
+
+class BatchStats(object):
+    """
+    SampleStats of all VMs in bulk stats samples window, computed in one
+    pass.
+    """
+
+    def __init__(self, first_batch, last_batch, interval):
+        self._stats = {}
+        for vm_id, last_sample in six.iteritems(last_batch):
+            first_sample = first_batch.get(vm_id)
+            if first_sample is not None:
+                self._stats[vm_id] = SampleStats(
+                    first_sample, last_sample, interval)
+
+    def get(self, vm_id, first_sample, last_sample):
+        """
+        Return SampleStats of vm_id if they were computed from first_sample
+        and last_sample, None otherwise.
+        """
+        sample_stats = self._stats.get(vm_id)
+        if (sample_stats is None or
+                sample_stats.first_sample is not first_sample or
+                sample_stats.last_sample is not last_sample):
+            return None
+        return sample_stats
+
+
 def translate(vm_stats):
     stats = {}
 
@@ -188,51 +258,53 @@ def cpu_count(stats, sample):
             _log.error('Failed to get VM cpu count')
 
 
-def _nic_traffic(vm_obj, nic,
-                 start_sample, start_index,
-                 end_sample, end_index):
+# Groups of (stat name, bulk stats counter). If a counter is missing, the
+# rest of the group is skipped.
+_NIC_COUNTERS = (
+    (
+        ('rxErrors', 'rx.errs'),
+        ('rxDropped', 'rx.drop'),
+        ('txErrors', 'tx.errs'),
+        ('txDropped', 'tx.drop'),
+    ),
+    (
+        ('rx', 'rx.bytes'),
+        ('tx', 'tx.bytes'),
+    ),
+)
+
+
+def _nic_counters(sample, index):
     """
-    Return per-nic statistics packed into a dictionary
-    - macAddr
-    - name
-    - speed
-    - state
-    - {rx,tx}Errors
-    - {rx,tx}Dropped
-    - {rx,tx}Rate
-    - {rx,tx}
-    - sampleTime
-    Produce as many statistics as possible, skipping errors.
-    Expect two samplings `start_sample' and `end_sample'
-    which must be data in the format of the libvirt bulk stats.
-    Expects the indexes of the nic whose statistics needs to be produced,
-    for each sampling:
-    `start_index' for `start_sample', `end_index' for `end_sample'.
-    `vm_obj' is the Vm instance to which the nic belongs.
-    `name', `model' and `mac' are the attributes of the said nic.
-    Those three value are reported in the output stats.
-    Return None on error,  if any needed data is missing or wrong.
-    Return the `stats' dictionary on success.
+    Return nic counters from bulk stats sample, and list of KeyError for
+    missing counters.
     """
+    counters = {}
+    errors = []
+    for group in _NIC_COUNTERS:
+        try:
+            for name, counter in group:
+                counters[name] = str(sample['net.%d.%s' % (index, counter)])
+        except KeyError as e:
+            errors.append(e)
+    return counters, errors
 
-    if_stats = nic_info(nic)
 
-    with _skip_if_missing_stats(vm_obj):
-        if_stats['rxErrors'] = str(end_sample['net.%d.rx.errs' % end_index])
-        if_stats['rxDropped'] = str(end_sample['net.%d.rx.drop' % end_index])
-        if_stats['txErrors'] = str(end_sample['net.%d.tx.errs' % end_index])
-        if_stats['txDropped'] = str(end_sample['net.%d.tx.drop' % end_index])
+def _nic_if_stats(vm_obj, nic, counters, errors):
+    if_stats = nic_info(nic)
+    if_stats.update(counters)
 
-    with _skip_if_missing_stats(vm_obj):
-        if_stats['rx'] = str(end_sample['net.%d.rx.bytes' % end_index])
-        if_stats['tx'] = str(end_sample['net.%d.tx.bytes' % end_index])
+    for error in errors:
+        with _skip_if_missing_stats(vm_obj):
+            raise error
 
     if_stats['sampleTime'] = monotonic_time()
 
     return if_stats
 
 
-def networks(vm, stats, first_sample, last_sample, interval):
+def networks(vm, stats, first_sample, last_sample, interval,
+             sample_stats=None):
     stats['network'] = {}
 
     if first_sample is None or last_sample is None:
@@ -243,8 +315,8 @@ def networks(vm, stats, first_sample, last_sample, interval):
             interval, vm.id)
         return None
 
-    first_indexes = _find_bulk_stats_reverse_map(first_sample, 'net')
-    last_indexes = _find_bulk_stats_reverse_map(last_sample, 'net')
+    if sample_stats is None:
+        sample_stats = SampleStats(first_sample, last_sample, interval)
 
     for nic in vm.getNicDevices():
         if nic.is_hostdevice:
@@ -256,13 +328,12 @@ def networks(vm, stats, first_sample, last_sample, interval):
             continue
 
         # may happen if nic is a new hot-plugged one
-        if nic.name not in first_indexes or nic.name not in last_indexes:
+        if nic.name not in sample_stats.nics:
             continue
 
-        stats['network'][nic.name] = _nic_traffic(
-            vm, nic,
-            first_sample, first_indexes[nic.name],
-            last_sample, last_indexes[nic.name])
+        counters, errors = sample_stats.nics[nic.name]
+        stats['network'][nic.name] = _nic_if_stats(
+            vm, nic, counters, errors)
 
     return stats
 
@@ -279,16 +350,17 @@ def nic_info(nic):
     return info
 
 
-def disks(vm, stats, first_sample, last_sample, interval):
+def disks(vm, stats, first_sample, last_sample, interval,
+          sample_stats=None):
     if first_sample is None or last_sample is None:
         return None
 
     # libvirt does not guarantee that disk will returned in the same
     # order across calls. It is usually like this, but not always,
     # for example if hotplug/hotunplug comes into play.
-    # To be safe, we need to find the mapping after each call.
-    first_indexes = _find_bulk_stats_reverse_map(first_sample, 'block')
-    last_indexes = _find_bulk_stats_reverse_map(last_sample, 'block')
+    # To be safe, SampleStats finds the mapping for each sample.
+    if sample_stats is None:
+        sample_stats = SampleStats(first_sample, last_sample, interval)
     disk_stats = {}
 
     for vm_drive in vm.getDiskDevices():
@@ -296,28 +368,14 @@ def disks(vm, stats, first_sample, last_sample, interval):
         try:
             drive_stats = disk_info(vm_drive)
 
-            if (vm_drive.name in first_indexes and
-               vm_drive.name in last_indexes):
+            if vm_drive.name in sample_stats.disks:
                 # will be None if sampled during recovery
                 if interval <= 0:
                     _log.warning(
                         'invalid interval %i when calculating '
                         'stats for vm %s disk %s',
                         interval, vm.id, vm_drive.name)
-                else:
-                    drive_stats.update(
-                        _disk_rate(
-                            first_sample, first_indexes[vm_drive.name],
-                            last_sample, last_indexes[vm_drive.name],
-                            interval))
-                drive_stats.update(
-                    _disk_latency(
-                        first_sample, first_indexes[vm_drive.name],
-                        last_sample, last_indexes[vm_drive.name]))
-                drive_stats.update(
-                    _disk_iops_bytes(
-                        first_sample, first_indexes[vm_drive.name],
-                        last_sample, last_indexes[vm_drive.name]))
+                drive_stats.update(sample_stats.disks[vm_drive.name])
 
         except AttributeError:
             _log.exception("Disk %s stats not available",
@@ -352,6 +410,20 @@ def disk_info(vm_drive):
     return drive_stats
 
 
+def _disk_stats(first_sample, first_index, last_sample, last_index, interval):
+    stats = {}
+    if interval > 0:
+        stats.update(
+            _disk_rate(
+                first_sample, first_index, last_sample, last_index,
+                interval))
+    stats.update(
+        _disk_latency(first_sample, first_index, last_sample, last_index))
+    stats.update(
+        _disk_iops_bytes(first_sample, first_index, last_sample, last_index))
+    return stats
+
+
 def _disk_rate(first_sample, first_index, last_sample, last_index, interval):
     stats = {}
 
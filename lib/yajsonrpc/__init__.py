@@ -26,6 +26,7 @@ from vdsm.common.threadlocal import vars
 from vdsm.common.time import monotonic_time
 from vdsm.common.password import protect_passwords, unprotect_passwords
 
+from yajsonrpc import codec
 from yajsonrpc import exception
 
 __all__ = ["betterAsyncore", "stompserver", "stomp"]
@@ -46,7 +47,7 @@ class JsonRpcRequest(object):
     @classmethod
     def decode(cls, msg):
         try:
-            obj = json.loads(msg)
+            obj = codec.loads(msg)
         except:
             raise exception.JsonRpcParseError()
 
@@ -117,12 +118,15 @@ class JsonRpcResponse(object):
         return res
 
     def encode(self):
+        """
+        Return the response encoded to JSON, as UTF-8 bytes.
+        """
         res = self.toDict()
-        return json.dumps(res)
+        return codec.dumps(res)
 
     @staticmethod
     def decode(msg):
-        obj = json.loads(msg)
+        obj = codec.loads(msg)
         return JsonRpcResponse.fromRawObject(obj)
 
     @staticmethod
@@ -174,11 +178,12 @@ class Notification(object):
         """
         self._add_notify_time(params)
         self._event_schema.verify_event_params(self._event_id, params)
-        notification = json.dumps({'jsonrpc': '2.0',
-                                   'method': self._event_id,
-                                   'params': params})
+        notification = codec.dumps({'jsonrpc': '2.0',
+                                    'method': self._event_id,
+                                    'params': params})
 
-        self.log.debug("Sending event %s", notification)
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug("Sending event %s", notification.decode("utf-8"))
         self._cb(notification)
 
     def _add_notify_time(self, body):
@@ -232,9 +237,9 @@ class _JsonRpcServeRequestContext(object):
         if len(encodedObjects) == 1:
             data = encodedObjects[0]
         else:
-            data = '[' + ','.join(encodedObjects) + ']'
+            data = b'[' + b','.join(encodedObjects) + b']'
 
-        self._client.send(data.encode('utf-8'))
+        self._client.send(data)
 
     def addResponse(self, response):
         self._responses.append(response)
@@ -258,6 +263,10 @@ class JsonRpcTask(object):
         self._ctx = ctx
         self._req = req
 
+    @property
+    def method(self):
+        return self._req.method
+
     def __call__(self):
         self._handler(self._ctx, self._req)
 
@@ -301,15 +310,19 @@ class JsonRpcServer(object):
             self._counter = 0
 
     def _serveRequest(self, ctx, req):
-        start_time = monotonic_time()
+        log_enabled = self.log.isEnabledFor(logging.INFO)
+        if log_enabled:
+            start_time = monotonic_time()
         response = self._handle_request(req, ctx)
-        error = getattr(response, "error", None)
-        if error is None:
-            response_log = "succeeded"
-        else:
-            response_log = "failed (error %s)" % (error.code,)
-        self.log.info("RPC call %s %s in %.2f seconds",
-                      req.method, response_log, monotonic_time() - start_time)
+        if log_enabled:
+            error = getattr(response, "error", None)
+            if error is None:
+                response_log = "succeeded"
+            else:
+                response_log = "failed (error %s)" % (error.code,)
+            self.log.info("RPC call %s %s in %.2f seconds",
+                          req.method, response_log,
+                          monotonic_time() - start_time)
         if response is not None:
             ctx.requestDone(response)
 
@@ -374,7 +387,7 @@ class JsonRpcServer(object):
         ctx = _JsonRpcServeRequestContext(client, server_address, context)
 
         try:
-            rawRequests = json.loads(msg)
+            rawRequests = codec.loads(msg)
         except:
             ctx.addResponse(JsonRpcResponse(
                 None, exception.JsonRpcParseError(), None))
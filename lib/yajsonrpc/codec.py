@@ -0,0 +1,58 @@
+# Copyright 2020 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public
+# License along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+"""
+JSON codec for JSON-RPC messages.
+
+Uses orjson when available, falling back to the json module from
+vdsm.common.compat. Values that orjson cannot handle (e.g. integers larger
+than 64 bits, NaN in input) are handled by the fallback module, so both
+implementations accept the same messages.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+
+from vdsm.common.compat import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj):
+    """
+    Encode obj to JSON, returning UTF-8 encoded bytes.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj).encode("utf-8")
+
+
+def loads(data):
+    """
+    Decode JSON data, given as bytes or text.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return json.loads(data)
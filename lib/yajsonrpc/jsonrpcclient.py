@@ -22,9 +22,8 @@ import six
 from six.moves import queue
 from threading import Lock, Event
 
-from vdsm.common.compat import json
-
 from yajsonrpc import \
+    codec, \
     exception, \
     CALL_TIMEOUT, \
     JsonRpcRequest, \
@@ -219,7 +218,7 @@ class JsonRpcClient(object):
 
     def _handleMessage(self, message, event_queue=None):
         try:
-            mobj = json.loads(message)
+            mobj = codec.loads(message)
         except ValueError:
             self.log.warning(
                 "Received message is not a valid JSON: %r",
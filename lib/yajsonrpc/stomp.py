@@ -156,6 +156,48 @@ class Frame(object):
         return Frame(self.command, self.headers.copy(), self.body)
 
 
+class MessageFrame(object):
+    """
+    MESSAGE frame sent to multiple subscribers.
+
+    The headers and body are encoded once. Subscriber frames returned by
+    subscriber_frame() add only their subscription header.
+    """
+    __slots__ = ("command", "_tail")
+
+    def __init__(self, headers, body):
+        self.command = Command.MESSAGE
+        frame = Frame(self.command, headers, body)
+        # Encoded frame without the command line.
+        self._tail = frame.encode()[len(self.command) + 1:]
+
+    def subscriber_frame(self, subscription_id):
+        return _SubscriberFrame(self, subscription_id)
+
+    def __repr__(self):
+        return "<StompMessageFrame command=%s>" % (repr(self.command))
+
+
+class _SubscriberFrame(object):
+    __slots__ = ("command", "_message", "_subscription_id")
+
+    def __init__(self, message, subscription_id):
+        self.command = message.command
+        self._message = message
+        self._subscription_id = subscription_id
+
+    def encode(self):
+        return b"".join((
+            encode_value(self.command), b"\n",
+            encode_value(Headers.SUBSCRIPTION), b":",
+            encode_value(self._subscription_id), b"\n",
+            self._message._tail,
+        ))
+
+    def __repr__(self):
+        return "<StompFrame command=%s>" % (repr(self.command))
+
+
 def decode_value(s):
     if not isinstance(s, six.binary_type):
         raise ValueError(
@@ -194,10 +236,22 @@ def encode_value(s):
 
 
 class Parser(object):
+    """
+    Incremental STOMP frame parser.
+
+    Received data is appended to a bytearray. The parser keeps the offset of
+    the first unconsumed byte and the offset where the next terminator
+    search should start, so consumed data is never copied or scanned again.
+    The consumed part of the buffer is discarded only when it is larger
+    than the unconsumed part, keeping the cost of parsing linear in the
+    amount of data received, even when a big frame is received in many
+    small chunks.
+    """
+
     _STATE_CMD = "Parsing command"
     _STATE_HEADER = "Parsing headers"
     _STATE_BODY = "Receiving body"
-    _FRAME_TERMINATOR = b"\x00" if six.PY2 else 0
+    _FRAME_TERMINATOR = 0
 
     def __init__(self):
         self._states = {
@@ -214,22 +268,42 @@ class Parser(object):
         self._state_cb = self._states[new_state]
 
     def _flush(self):
-        self._buffer = b""
+        self._buffer = bytearray()
+        # Offset of the first unconsumed byte.
+        self._pos = 0
+        # Offset where the next terminator search starts.
+        self._scan = 0
 
     def _write_buffer(self, buff):
         self._buffer += buff
 
-    def _get_buffer(self):
-        return self._buffer
+    def _compact_buffer(self):
+        if self._pos == len(self._buffer):
+            self._flush()
+        elif self._pos > len(self._buffer) // 2:
+            del self._buffer[:self._pos]
+            self._scan -= self._pos
+            self._pos = 0
+
+    def _consume(self, end, skip=0):
+        """
+        Return the unconsumed data up to end, and consume it and the next
+        skip bytes.
+        """
+        data = bytes(memoryview(self._buffer)[self._pos:end])
+        self._pos = end + skip
+        self._scan = self._pos
+        return data
 
     def _handle_terminator(self, term):
-        res, sep, rest = self._buffer.partition(term)
-        if not sep:
+        index = self._buffer.find(term, self._scan)
+        if index == -1:
+            # The data we scanned does not contain the terminator, no need
+            # to scan it again when more data is received.
+            self._scan = len(self._buffer)
             return None
 
-        self._buffer = rest
-
-        return res
+        return self._consume(index, skip=len(term))
 
     def _parse_command(self):
         cmd = self._handle_terminator(b"\n")
@@ -296,20 +370,15 @@ class Parser(object):
         return True
 
     def _parse_body_length(self):
-        buf = self._get_buffer()
         cl = self._content_length
-        ndata = len(buf)
-        if ndata < (cl + 1):
+        end = self._pos + cl
+        if len(self._buffer) < end + 1:
             return False
 
-        if buf[cl] != self._FRAME_TERMINATOR:
+        if self._buffer[end] != self._FRAME_TERMINATOR:
             raise RuntimeError("Frame doesn't end with NULL byte")
 
-        self._flush()
-        self._write_buffer(buf[cl + 1:])
-        body = buf[:cl]
-
-        self._tmp_frame.body = body
+        self._tmp_frame.body = self._consume(end, skip=1)
         self._push_frame()
 
         return True
@@ -322,6 +391,7 @@ class Parser(object):
         self._write_buffer(data)
         while self._state_cb():
             pass
+        self._compact_buffer()
 
     def pop_frame(self):
         try:
@@ -513,7 +583,8 @@ class AsyncDispatcher(object):
 
             self._update_outgoing_heartbeat()
             if numSent < len(data):
-                self._outbuf = data[numSent:]
+                # Avoid copying the rest of a big frame on partial writes.
+                self._outbuf = memoryview(data)[numSent:]
                 return
 
             self._outbuf = None
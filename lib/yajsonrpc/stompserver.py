@@ -20,9 +20,8 @@ from collections import deque
 import functools
 
 from vdsm.config import config
-from vdsm.common.compat import json
 from . import JsonRpcServer
-from . import stomp, stompclient
+from . import codec, stomp, stompclient
 from .betterAsyncore import Dispatcher, Reactor
 
 
@@ -235,7 +234,8 @@ class StompAdapterImpl(object):
         or for standard mode we use 'reply-to' header.
         """
         try:
-            self._handle_destination(dispatcher, req_dest, json.loads(request))
+            self._handle_destination(dispatcher, req_dest,
+                                     codec.loads(request))
         except Exception:
             # let json server process issue
             pass
@@ -304,7 +304,7 @@ class StompServer(object):
     Sends message to all subscribes that subscribed to destination.
     """
     def send(self, message, destination=stomp.SUBSCRIPTION_ID_RESPONSE):
-        resp = json.loads(message)
+        resp = codec.loads(message)
         if not isinstance(resp, dict):
             raise ValueError(
                 'Provided message %s failed parsing to dictionary' % message)
@@ -325,19 +325,19 @@ class StompServer(object):
                           destination)
             return
 
+        # Encode the message once for all subscribers.
+        res = stomp.MessageFrame(
+            {
+                stomp.Headers.DESTINATION: destination,
+                stomp.Headers.CONTENT_TYPE: "application/json",
+            },
+            message
+        )
         for connection in connections:
-            res = stomp.Frame(
-                stomp.Command.MESSAGE,
-                {
-                    stomp.Headers.DESTINATION: destination,
-                    stomp.Headers.CONTENT_TYPE: "application/json",
-                    stomp.Headers.SUBSCRIPTION: connection.id
-                },
-                message
-            )
             # we need to check whether the channel is not closed
             if not connection.client.is_closed():
-                connection.client.send_raw(res)
+                connection.client.send_raw(
+                    res.subscriber_frame(connection.id))
 
 
 def StompListener(reactor, server, acceptHandler, connected_socket):
@@ -23,7 +23,10 @@ from __future__ import division
 
 from __future__ import print_function
 
+import io
 import logging
+import logging.handlers
+import os
 import threading
 import time
 
@@ -33,6 +36,7 @@ from contextlib import contextmanager
 from testlib import VdsmTestCase as TestCaseBase
 from testlib import expandPermutations, permutations
 from testlib import forked
+from testlib import namedTemporaryDir
 
 from vdsm.common import concurrent
 from vdsm.common import logutils
@@ -97,10 +101,10 @@ class TestSetLevel(TestCaseBase):
 
 
 @contextmanager
-def threaded_handler(capacity, target, adaptive=True):
+def threaded_handler(capacity, target, adaptive=True, debug_sample=1):
     # Start the handler explicitly for deterministic capacity handling.
     handler = logutils.ThreadedHandler(
-        capacity, adaptive=adaptive, start=False)
+        capacity, adaptive=adaptive, start=False, debug_sample=debug_sample)
     with closing(handler):
         handler.setTarget(target)
         logger = logging.Logger("test")
@@ -141,6 +145,20 @@ class Handler(object):
                 now = time.time()
 
 
+class CountingStream(io.StringIO):
+    """
+    A stream counting write() calls.
+    """
+
+    def __init__(self):
+        io.StringIO.__init__(self)
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return io.StringIO.write(self, data)
+
+
 @expandPermutations
 class TestThreadedHandler(TestCaseBase):
 
@@ -330,3 +348,91 @@ class TestThreadedHandler(TestCaseBase):
 
         print("Logged %d messages in %.2f seconds" % (
               len(target.messages), elapsed))
+
+    def test_debug_sampling(self):
+        target = Handler()
+        with threaded_handler(
+                100, target, debug_sample=3) as (handler, logger):
+            other = logging.Logger("other")
+            other.addHandler(handler)
+            for i in range(7):
+                logger.debug("debug %d", i)
+                logger.info("info %d", i)
+            other.debug("other")
+            handler.start()
+
+        debug_messages = [m for m in target.messages
+                          if m.startswith("debug")]
+        self.assertEqual(debug_messages, ["debug 0", "debug 3", "debug 6"])
+
+        info_messages = [m for m in target.messages if m.startswith("info")]
+        self.assertEqual(info_messages, ["info %d" % i for i in range(7)])
+
+        # Every logger is sampled separately.
+        self.assertIn("other", target.messages)
+
+    def test_logger_rates(self):
+        target = Handler()
+        with threaded_handler(100, target) as (handler, logger):
+            handler.start()
+            self.assertEqual(handler.rates(), {})
+            for i in range(5):
+                logger.debug("debug %d", i)
+            # Complete the stats interval on the next record.
+            handler._last_report -= handler.STATS_INTERVAL
+            logger.info("info")
+            rates = handler.rates()
+
+        self.assertEqual(list(rates), ["test"])
+        self.assertAlmostEqual(
+            rates["test"], 6 / handler.STATS_INTERVAL, delta=0.01)
+
+    def test_stream_handler_single_write(self):
+        stream = CountingStream()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+
+        with threaded_handler(1000, target) as (handler, logger):
+            for i in range(100):
+                logger.info("message %d", i)
+            handler.start()
+
+        expected = "".join("INFO message %d\n" % i for i in range(100))
+        self.assertEqual(stream.getvalue(), expected)
+        self.assertEqual(stream.writes, 1)
+
+    def test_stream_handler_filter(self):
+        stream = CountingStream()
+        target = logging.StreamHandler(stream)
+        target.addFilter(lambda r: r.levelno > logging.DEBUG)
+
+        with threaded_handler(100, target) as (handler, logger):
+            logger.debug("filtered")
+            logger.info("logged")
+            handler.start()
+
+        self.assertEqual(stream.getvalue(), "logged\n")
+
+    def test_watched_file_handler_reopen(self):
+        with namedTemporaryDir() as tmpdir:
+            path = os.path.join(tmpdir, "vdsm.log")
+            target = logging.handlers.WatchedFileHandler(path)
+            try:
+                with threaded_handler(100, target) as (handler, logger):
+                    logger.info("before")
+                    handler.start()
+                    # Wait until the record is written.
+                    deadline = time.time() + 5
+                    while (not os.path.exists(path)
+                           or os.path.getsize(path) == 0):
+                        self.assertLess(time.time(), deadline)
+                        time.sleep(0.01)
+                    os.rename(path, path + ".1")
+                    logger.info("after")
+            finally:
+                target.close()
+
+            with open(path + ".1") as f:
+                self.assertEqual(f.read(), "before\n")
+            with open(path) as f:
+                self.assertEqual(f.read(), "after\n")
@@ -0,0 +1,242 @@
+#
+# Copyright 2020 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import errno
+import os
+import threading
+import time
+from multiprocessing import connection
+from multiprocessing.managers import BaseManager
+
+import pytest
+
+from vdsm.common import concurrent
+from vdsm.common import supervdsm
+
+
+class FakeSuperVdsm(object):
+    """
+    Stand-in for the supervdsm remote object.
+    """
+
+    arrived = threading.Semaphore(0)
+
+    def echo(self, *args, **kwargs):
+        return args, kwargs
+
+    def fail(self):
+        raise ValueError("fail")
+
+    def fail_os(self):
+        raise OSError(errno.ENOENT, "No such file")
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def meet(self, count):
+        # Return True if count callers run at the same time.
+        for _ in range(count - 1):
+            self.arrived.release()
+        for _ in range(count - 1):
+            if not self.arrived.acquire(timeout=2):
+                return False
+        return True
+
+
+class FakeManager(BaseManager):
+    pass
+
+
+FakeManager.register("instance", callable=FakeSuperVdsm)
+FakeManager.register("open", callable=open)
+
+
+@pytest.fixture
+def server(tmpdir):
+    address = str(tmpdir.join("svdsm.sock"))
+    manager = FakeManager(address=address, authkey=b"")
+    server = manager.get_server()
+    t = concurrent.thread(server.serve_forever, name="fake-svdsm")
+    t.start()
+    yield address
+    with connection.Client(address, authkey=b"") as conn:
+        server.shutdown(conn)
+    t.join()
+
+
+def proxy(address, connections=2, timeout=0):
+    return supervdsm.SuperVdsmProxy(
+        address=address, authkey=b"", connections=connections,
+        timeout=timeout)
+
+
+def test_call(server):
+    p = proxy(server)
+    assert p.echo(1, b=2) == ((1,), {"b": 2})
+    assert p.call("echo", (1,), {"b": 2}) == ((1,), {"b": 2})
+
+
+def test_open(server, tmpdir):
+    path = str(tmpdir.join("file"))
+    with open(path, "w") as f:
+        f.write("data")
+    p = proxy(server)
+    f = p.open(path)
+    assert f.read() == "data"
+
+
+def test_function_error(server):
+    p = proxy(server)
+    with pytest.raises(ValueError):
+        p.fail()
+    # The connection is still usable.
+    assert p.echo(1) == ((1,), {})
+    stats = p.stats()
+    assert stats["calls"] == 2
+    assert stats["errors"] == 1
+
+
+def test_function_os_error(server):
+    p = proxy(server)
+    generation = p._generation
+    with pytest.raises(OSError, match=r"\[Errno %d\]" % errno.ENOENT):
+        p.fail_os()
+    # The error does not break the connection.
+    assert p._generation == generation
+    assert p.echo(1) == ((1,), {})
+
+
+def test_broken_communication_reconnects(server):
+    p = proxy(server)
+    with pytest.raises(RuntimeError):
+        p.no_such_method()
+    assert p.echo(1) == ((1,), {})
+
+
+def test_parallel_calls(server):
+    p = proxy(server, connections=2)
+    results = []
+
+    def call():
+        results.append(p.meet(2))
+
+    threads = [concurrent.thread(call) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [True, True]
+
+
+def test_connections_limit(server):
+    p = proxy(server, connections=1)
+    t = concurrent.thread(p.sleep, args=(0.2,))
+    t.start()
+    try:
+        # Wait until the call is running, so the next call must wait.
+        while p.stats()["running"] == 0:
+            time.sleep(0.01)
+        p.echo(1)
+    finally:
+        t.join()
+    stats = p.stats()
+    assert stats["calls"] == 2
+    assert stats["max_queue_time"] > 0
+    assert stats["waiting"] == 0
+    assert stats["running"] == 0
+
+
+def test_unbounded_connections(server):
+    p = proxy(server, connections=0)
+    hung = [concurrent.thread(p.sleep, args=(0.5,)) for _ in range(3)]
+    for t in hung:
+        t.start()
+    try:
+        while p.stats()["running"] < len(hung):
+            time.sleep(0.01)
+        # Calls stuck in supervdsm do not delay unrelated calls.
+        assert p.echo(1) == ((1,), {})
+        assert p.stats()["max_queue_time"] < 0.5
+    finally:
+        for t in hung:
+            t.join()
+    # Idle connections are reused.
+    assert len(p._pool._idle) == len(hung) + 1
+    p.echo(1)
+    assert len(p._pool._idle) == len(hung) + 1
+
+
+def test_call_timeout(server):
+    p = proxy(server)
+    with pytest.raises(supervdsm.Timeout):
+        p.call("sleep", (0.5,), timeout=0.1)
+    assert p.stats()["timeouts"] == 1
+    # The timed out connection was discarded.
+    assert p.echo(1) == ((1,), {})
+
+
+def test_default_timeout(server):
+    p = proxy(server, timeout=0.1)
+    with pytest.raises(supervdsm.Timeout):
+        p.sleep(0.5)
+
+
+def test_queue_timeout(server):
+    p = proxy(server, connections=1)
+    t = concurrent.thread(p.sleep, args=(0.5,))
+    t.start()
+    try:
+        while p.stats()["running"] == 0:
+            time.sleep(0.01)
+        with pytest.raises(supervdsm.Timeout):
+            p.call("echo", timeout=0.1)
+    finally:
+        t.join()
+    assert p.stats()["waiting"] == 0
+
+
+@pytest.mark.stress
+@pytest.mark.parametrize("threads", [1, 4, 8])
+def test_benchmark(server, threads):
+    p = proxy(server, connections=threads)
+    calls = int(os.environ.get("SUPERVDSM_BENCH_CALLS", "5000"))
+    count = calls // threads
+
+    def run():
+        for _ in range(count):
+            p.echo(1)
+
+    workers = [concurrent.thread(run) for _ in range(threads)]
+    start = time.time()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.time() - start
+
+    stats = p.stats()
+    print("threads=%d calls=%d elapsed=%.3f seconds (%.2f calls/s, "
+          "max latency %.6f seconds, max queue time %.6f seconds)"
+          % (threads, stats["calls"], elapsed, stats["calls"] / elapsed,
+             stats["max_call_time"], stats["max_queue_time"]))
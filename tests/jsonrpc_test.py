@@ -20,10 +20,15 @@
 
 from __future__ import absolute_import
 from __future__ import division
+
+import threading
+
 from yajsonrpc import JsonRpcRequest, JsonRpcServer
 
+from vdsm import schedule
 from vdsm.common import exception
 from vdsm.common.compat import json
+from vdsm.rpc import bindingjsonrpc
 
 from testlib import VdsmTestCase
 
@@ -63,3 +68,125 @@ class ServerTests(VdsmTestCase):
         self.assertEqual({"reason": "Too many tasks",
                           "resource": "test",
                           "current_tasks": 0}, reason)
+
+
+class FakeTask(object):
+
+    def __init__(self, method, block=False):
+        self.method = method
+        self.started = threading.Event()
+        self.done = threading.Event()
+        self._release = threading.Event()
+        if not block:
+            self._release.set()
+
+    def release(self):
+        self._release.set()
+
+    def __call__(self):
+        self.started.set()
+        self._release.wait(5)
+        self.done.set()
+
+
+class RequestExecutorTests(VdsmTestCase):
+
+    def setUp(self):
+        self.scheduler = schedule.Scheduler()
+        self.scheduler.start()
+        self.executor = bindingjsonrpc.RequestExecutor(
+            self.scheduler,
+            workers=2,
+            max_tasks=2,
+            fast_workers=1,
+            fast_methods=["Host.getStats"],
+            limits={"Host.getDeviceList": 1})
+        self.executor.start()
+
+    def tearDown(self):
+        self.executor.stop()
+        self.scheduler.stop()
+
+    def test_fast_lane(self):
+        slow = [FakeTask("Image.prepare", block=True) for _ in range(2)]
+        for task in slow:
+            self.executor.dispatch(task)
+        for task in slow:
+            self.assertTrue(task.started.wait(5))
+
+        # All normal workers are blocked, but fast methods are served.
+        fast = FakeTask("Host.getStats")
+        self.executor.dispatch(fast)
+        self.assertTrue(fast.done.wait(5))
+
+        for task in slow:
+            task.release()
+            self.assertTrue(task.done.wait(5))
+
+    def test_method_limit(self):
+        tasks = [FakeTask("Host.getDeviceList", block=True) for _ in range(3)]
+        for task in tasks:
+            self.executor.dispatch(task)
+        self.assertTrue(tasks[0].started.wait(5))
+
+        stats = self.executor.stats()["Host.getDeviceList"]
+        self.assertEqual(stats["running"], 1)
+        self.assertEqual(stats["queued"], 2)
+
+        # Limited method is waiting without occupying a worker.
+        other = FakeTask("Image.prepare")
+        self.executor.dispatch(other)
+        self.assertTrue(other.done.wait(5))
+        self.assertFalse(tasks[1].started.is_set())
+
+        for task in tasks:
+            task.release()
+            self.assertTrue(task.done.wait(5))
+
+        stats = self.executor.stats()["Host.getDeviceList"]
+        self.assertEqual(stats["running"], 0)
+        self.assertEqual(stats["queued"], 0)
+        self.assertEqual(stats["calls"], 3)
+
+    def test_dispatch_waiting(self):
+        dispatched = []
+        ex = self.executor._executor
+        orig_dispatch = ex.dispatch
+
+        def dispatch(callable, **kwargs):
+            dispatched.append(callable)
+            orig_dispatch(callable, **kwargs)
+
+        ex.dispatch = dispatch
+
+        tasks = [FakeTask("Host.getDeviceList", block=True) for _ in range(3)]
+        for task in tasks:
+            self.executor.dispatch(task)
+        self.assertEqual(len(dispatched), 1)
+
+        for task in tasks:
+            task.release()
+            self.assertTrue(task.done.wait(5))
+
+        # Every waiting request runs in its own executor task.
+        self.assertEqual(len(dispatched), 3)
+
+    def test_too_many_waiting(self):
+        tasks = [FakeTask("Host.getDeviceList", block=True) for _ in range(3)]
+        for task in tasks:
+            self.executor.dispatch(task)
+
+        with self.assertRaises(exception.ResourceExhausted):
+            self.executor.dispatch(FakeTask("Host.getDeviceList"))
+
+        for task in tasks:
+            task.release()
+            self.assertTrue(task.done.wait(5))
+
+    def test_parse_limits(self):
+        limits = bindingjsonrpc.parse_limits(
+            "Host.getDeviceList:2, StoragePool.connectStorageServer:4,")
+        self.assertEqual(limits, {
+            "Host.getDeviceList": 2,
+            "StoragePool.connectStorageServer": 4,
+        })
@@ -163,6 +163,52 @@ def test_scripts_per_dir_should_accept_root_without_trailing_slash(monkeypatch,
         assert len(scripts) == 1
 
 
+def test_scripts_per_dir_cached(hooks_dir):
+    FileEntry("executable", 0o700, "").apply(hooks_dir)
+    # Make the directory old enough to be cached.
+    mtime = hooks_dir.mtime() - 10
+    hooks_dir.setmtime(mtime)
+    assert len(hooks._scriptsPerDir(hooks_dir.basename)) == 1
+
+    # Directory changes with the same mtime are not detected.
+    FileEntry("executable_2", 0o700, "").apply(hooks_dir)
+    hooks_dir.setmtime(mtime)
+    assert len(hooks._scriptsPerDir(hooks_dir.basename)) == 1
+
+    # Modifying the directory invalidates the cache.
+    hooks_dir.setmtime(mtime + 1)
+    assert len(hooks._scriptsPerDir(hooks_dir.basename)) == 2
+
+
+def test_scripts_per_dir_mode_change(hooks_dir):
+    FileEntry("script", 0o600, "").apply(hooks_dir)
+    mtime = hooks_dir.mtime() - 10
+    hooks_dir.setmtime(mtime)
+    assert hooks._scriptsPerDir(hooks_dir.basename) == []
+
+    # Changing the mode does not modify the directory mtime, but must be
+    # detected.
+    hooks_dir.join("script").chmod(0o700)
+    assert len(hooks._scriptsPerDir(hooks_dir.basename)) == 1
+
+    hooks_dir.join("script").chmod(0o600)
+    assert hooks._scriptsPerDir(hooks_dir.basename) == []
+
+
+def test_scripts_per_dir_recently_modified_not_cached(hooks_dir):
+    FileEntry("executable", 0o700, "").apply(hooks_dir)
+    mtime = hooks_dir.mtime()
+    assert len(hooks._scriptsPerDir(hooks_dir.basename)) == 1
+
+    FileEntry("executable_2", 0o700, "").apply(hooks_dir)
+    hooks_dir.setmtime(mtime)
+    assert len(hooks._scriptsPerDir(hooks_dir.basename)) == 2
+
+
+def test_scripts_per_dir_missing_dir(fake_hooks_root):
+    assert hooks._scriptsPerDir("missing") == []
+
+
 def test_rhd_should_return_unmodified_data_when_no_hooks(hooks_dir):
     assert hooks._runHooksDir(u"algo", hooks_dir.basename) == u"algo"
 
@@ -423,7 +469,7 @@ def mkstemp_path(monkeypatch, hooks_dir):
     with monkeypatch.context() as m:
         tmp_path = str(hooks_dir.join("tmp_file"))
 
-        def impl():
+        def impl(*args, **kwargs):
             return os.open(tmp_path, os.O_RDWR | os.O_CREAT, 0o600), tmp_path
 
         m.setattr(hooks.tempfile, 'mkstemp', impl)
@@ -451,6 +497,19 @@ def test_rhd_should_pass_data_file_to_hooks(hooks_dir, env_dump, mkstemp_path,
     assert env[var_name] == mkstemp_path
 
 
+def test_rhd_should_create_data_file_in_run_dir(monkeypatch, tmpdir,
+                                                hooks_dir, env_dump):
+    run_dir = tmpdir.mkdir("run")
+    monkeypatch.setattr(hooks, "P_VDSM_RUN", str(run_dir))
+    hooks._runHooksDir(None, hooks_dir.basename)
+    with open(env_dump, "rb") as f:
+        env = pickle.load(f)
+
+    assert os.path.dirname(env["_hook_domxml"]) == str(run_dir)
+    # The data file is removed after running the hooks.
+    assert run_dir.listdir() == []
+
+
 @pytest.fixture
 def hooking_client(hooks_dir):
     code = textwrap.dedent(
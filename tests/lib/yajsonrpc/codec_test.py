@@ -0,0 +1,78 @@
+#
+# Copyright 2020 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import math
+
+import pytest
+
+from vdsm.common.compat import json
+from yajsonrpc import codec
+from yajsonrpc import JsonRpcResponse
+
+
+@pytest.fixture(params=["default", "fallback"], autouse=True)
+def implementation(request, monkeypatch):
+    if request.param == "fallback":
+        monkeypatch.setattr(codec, "orjson", None)
+
+
+@pytest.mark.parametrize("obj", [
+    None,
+    True,
+    42,
+    3.5,
+    u"\u0105b\u0107",
+    [1, u"two", None],
+    {"jsonrpc": "2.0", "id": "1", "result": {"vms": [{"vmId": "x"}]}},
+    pytest.param(2**64, id="big int"),
+])
+def test_roundtrip(obj):
+    data = codec.dumps(obj)
+    assert isinstance(data, bytes)
+    assert codec.loads(data) == obj
+    assert json.loads(data.decode("utf-8")) == obj
+
+
+def test_dumps_non_string_keys():
+    assert codec.loads(codec.dumps({1: "a"})) == {"1": "a"}
+
+
+@pytest.mark.parametrize("data", [b'{"a": 1}', u'{"a": 1}'])
+def test_loads_bytes_and_text(data):
+    assert codec.loads(data) == {"a": 1}
+
+
+def test_loads_nan():
+    assert math.isnan(codec.loads(b"NaN"))
+
+
+def test_loads_invalid():
+    with pytest.raises(ValueError):
+        codec.loads(b"{invalid")
+
+
+def test_response_encode():
+    response = JsonRpcResponse({"key": u"\u0105"}, None, "id")
+    data = response.encode()
+    assert isinstance(data, bytes)
+    assert JsonRpcResponse.decode(data).result == {"key": u"\u0105"}
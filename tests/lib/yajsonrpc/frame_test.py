@@ -25,7 +25,7 @@ import pytest
 from collections import OrderedDict
 
 from yajsonrpc.stomp import _heartbeat_frame as heartbeat_frame
-from yajsonrpc.stomp import Command, Frame
+from yajsonrpc.stomp import Command, Frame, MessageFrame
 
 
 # https://stomp.github.io/stomp-specification-1.2.html#Heart-beating
@@ -120,3 +120,20 @@ def test_frame_should_have_a_copy_method():
     copy.headers["geh"] = "xyz"
 
     assert original.encode() == original_encoded
+
+
+def test_encoding_message_frame():
+    message = MessageFrame(
+        OrderedDict([("destination", "queue"), ("abc", "def")]), b"zorro")
+    for sub_id in ("sub-1", "sub-2"):
+        expected = Frame(
+            Command.MESSAGE,
+            OrderedDict([
+                ("subscription", sub_id),
+                ("destination", "queue"),
+                ("abc", "def"),
+            ]),
+            b"zorro").encode()
+        frame = message.subscriber_frame(sub_id)
+        assert frame.command == Command.MESSAGE
+        assert frame.encode() == expected
@@ -19,6 +19,9 @@
 #
 
 from __future__ import absolute_import
+from __future__ import division
+
+import time
 
 import pytest
 
@@ -169,3 +172,43 @@ def test_parser_should_skip_heartbeat_frames():
     decoded_frame = parser.pop_frame()
     assert decoded_frame is not None
     assert decoded_frame.command == Command.CONNECT
+
+
+@pytest.mark.parametrize("content_length", [True, False])
+def test_parser_big_frame_in_small_chunks(content_length):
+    body = b"x" * 1024**2
+    encoded_frame = Frame(Command.SEND, {"abc": "def"}, body).encode()
+    if not content_length:
+        # Without content-length the parser must search for the terminator.
+        encoded_frame = encoded_frame.replace(
+            b"content-length:%d\n" % len(body), b"")
+    parser = Parser()
+
+    data = encoded_frame * 2
+    for i in range(0, len(data), 4096):
+        parser.parse(data[i:i + 4096])
+
+    assert parser.pending == 2
+    for _ in range(2):
+        frame = parser.pop_frame()
+        assert frame.command == Command.SEND
+        assert frame.headers["abc"] == "def"
+        assert frame.body == body
+
+
+@pytest.mark.stress
+@pytest.mark.parametrize("size", [1024**2, 10 * 1024**2])
+def test_parser_benchmark(size):
+    encoded_frame = Frame(Command.SEND, {}, b"x" * size).encode()
+    chunks = [encoded_frame[i:i + 4096]
+              for i in range(0, len(encoded_frame), 4096)]
+    parser = Parser()
+
+    start = time.time()
+    for chunk in chunks:
+        parser.parse(chunk)
+    elapsed = time.time() - start
+
+    assert parser.pending == 1
+    print("size=%d chunks=%d elapsed=%.3f seconds (%.2f MiB/s)"
+          % (size, len(chunks), elapsed, size / 1024**2 / elapsed))
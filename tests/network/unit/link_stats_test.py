@@ -0,0 +1,124 @@
+# Copyright 2020 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import pytest
+
+from network.compat import mock
+
+from vdsm.network.link import iface
+from vdsm.network.link import stats
+from vdsm.network.netlink import libnl
+
+UP_FLAGS = libnl.IfaceStatus.IFF_UP | libnl.IfaceStatus.IFF_RUNNING
+
+
+def _link_info(name='eth0', index=1, flags=UP_FLAGS, state='up'):
+    return {
+        'name': name,
+        'index': index,
+        'flags': flags,
+        'state': state,
+        'type': iface.Type.NIC,
+        'stats': {
+            'rx_bytes': 1,
+            'tx_bytes': 2,
+            'rx_dropped': 3,
+            'tx_dropped': 4,
+            'rx_errors': 5,
+            'tx_errors': 6,
+        },
+    }
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def speed():
+    with mock.patch.object(stats, '_speed', return_value=1000) as speed:
+        with mock.patch.object(stats.nic, 'duplex', return_value='full'):
+            yield speed
+
+
+class TestSpeedCache(object):
+    def test_cached(self, speed):
+        cache = stats._SpeedCache(timeout=60, clock=FakeClock())
+        assert cache.get(_link_info()) == (1000, 'full')
+        assert cache.get(_link_info()) == (1000, 'full')
+        assert speed.call_count == 1
+
+    @pytest.mark.parametrize(
+        'changed',
+        [{'index': 2}, {'flags': 0}, {'state': 'down'}],
+        ids=['index', 'flags', 'state'],
+    )
+    def test_link_changed(self, speed, changed):
+        cache = stats._SpeedCache(timeout=60, clock=FakeClock())
+        cache.get(_link_info())
+        cache.get(_link_info(**changed))
+        assert speed.call_count == 2
+
+    def test_expired(self, speed):
+        clock = FakeClock()
+        cache = stats._SpeedCache(timeout=60, clock=clock)
+        cache.get(_link_info())
+        clock.now += 60
+        cache.get(_link_info())
+        assert speed.call_count == 2
+
+    def test_prune(self, speed):
+        cache = stats._SpeedCache(timeout=60, clock=FakeClock())
+        cache.get(_link_info(name='eth0'))
+        cache.get(_link_info(name='eth1'))
+        cache.prune({'eth1'})
+        cache.get(_link_info(name='eth0'))
+        cache.get(_link_info(name='eth1'))
+        assert speed.call_count == 3
+
+
+def test_generate_link_stats(speed):
+    stats._speed_cache.clear()
+    assert stats._generate_link_stats(_link_info()) == {
+        'name': 'eth0',
+        'rx': 1,
+        'tx': 2,
+        'state': 'up',
+        'rxDropped': 3,
+        'txDropped': 4,
+        'rxErrors': 5,
+        'txErrors': 6,
+        'speed': 1000,
+        'duplex': 'full',
+    }
+
+
+def test_generate_link_stats_down(speed):
+    stats._speed_cache.clear()
+    link_stats = stats._generate_link_stats(
+        _link_info(flags=libnl.IfaceStatus.IFF_UP, state='down')
+    )
+    assert link_stats['state'] == 'down'
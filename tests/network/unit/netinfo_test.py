@@ -23,15 +23,19 @@ from __future__ import absolute_import
 from __future__ import division
 import os
 import io
+import threading
+import time
 
 import pytest
 import six
+from six.moves import queue
 
 from vdsm.network import ipwrapper
 from vdsm.network.ip.address import prefix2netmask
 from vdsm.network.link import nic
 from vdsm.network.link.bond import Bond
 from vdsm.network.netinfo import addresses, bonding, misc, nics, routes
+from vdsm.network.netinfo import cache
 from vdsm.network.netinfo.cache import get
 
 from vdsm.network import nmstate
@@ -338,3 +342,136 @@ class TestNetinfo(object):
     def test_parse_bond_options(self):
         expected = {'mode': '4', 'miimon': '100'}
         assert expected == bonding.parse_bond_options('mode=4 miimon=100')
+
+
+class FakeMonitor(object):
+    def __init__(self, groups=()):
+        self.groups = groups
+        self._events = queue.Queue()
+        self._stopped = threading.Event()
+
+    def start(self):
+        pass
+
+    def send(self, event):
+        self._events.put(event)
+
+    def stop(self):
+        self._stopped.set()
+        self._events.put(None)
+
+    def is_stopped(self):
+        return self._stopped.is_set()
+
+    def wait(self):
+        pass
+
+    def __iter__(self):
+        return iter(self._events.get, None)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_monitor():
+    monitors = []
+
+    def create(groups=()):
+        mon = FakeMonitor(groups)
+        monitors.append(mon)
+        return mon
+
+    with mock.patch.object(cache.monitor, 'Monitor', create):
+        yield monitors
+
+
+class TestReportCache(object):
+    def setup_method(self, m):
+        self.builds = 0
+        self.clock = FakeClock()
+        self.cache = cache.ReportCache(
+            build=self._build, max_age=60, clock=self.clock
+        )
+
+    def teardown_method(self, m):
+        self.cache.stop()
+
+    def _build(self):
+        self.builds += 1
+        return {'nics': {'eth0': {'mtu': 1500}}, 'build': self.builds}
+
+    def test_not_monitoring(self):
+        self.cache.get()
+        self.cache.get()
+        assert self.builds == 2
+
+    def test_cached(self, fake_monitor):
+        self.cache.start()
+        assert self.cache.get()['build'] == 1
+        assert self.cache.get()['build'] == 1
+        assert self.builds == 1
+
+    def test_returns_copy(self, fake_monitor):
+        self.cache.start()
+        self.cache.get()['nics']['eth0']['mtu'] = '1500'
+        assert self.cache.get()['nics']['eth0']['mtu'] == 1500
+
+    def test_event_invalidates(self, fake_monitor):
+        self.cache.start()
+        self.cache.get()
+        version = self.cache.version
+        mon, = fake_monitor
+        mon.send({'event': 'new_link', 'name': 'eth1'})
+        deadline = time.time() + 5
+        while self.cache.version == version and time.time() < deadline:
+            time.sleep(0.01)
+        assert self.cache.version > version
+        assert self.cache.get()['build'] == 2
+
+    def test_invalidate(self, fake_monitor):
+        self.cache.start()
+        self.cache.get()
+        self.cache.invalidate()
+        assert self.cache.get()['build'] == 2
+        assert self.cache.get()['build'] == 2
+
+    def test_force(self, fake_monitor):
+        self.cache.start()
+        self.cache.get()
+        assert self.cache.get(force=True)['build'] == 2
+        assert self.cache.get()['build'] == 2
+
+    def test_expired(self, fake_monitor):
+        self.cache.start()
+        self.cache.get()
+        self.clock.now += 60
+        assert self.cache.get()['build'] == 2
+
+    def test_event_during_build(self, fake_monitor):
+        self.cache.start()
+
+        def build():
+            self.cache.invalidate()
+            return self._build()
+
+        self.cache._build = build
+        assert self.cache.get()['build'] == 1
+        assert self.cache.get()['build'] == 2
+
+    def test_stop(self, fake_monitor):
+        self.cache.start()
+        self.cache.get()
+        self.cache.stop()
+        assert not self.cache.monitoring
+        assert self.cache.get()['build'] == 2
+
+    def test_monitor_groups(self, fake_monitor):
+        self.cache.start()
+        mon, = fake_monitor
+        assert mon.groups == cache.MONITOR_GROUPS
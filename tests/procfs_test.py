@@ -0,0 +1,140 @@
+#
+# Copyright 2020 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import os
+
+import pytest
+
+from vdsm.host import procfs
+
+MEMINFO = b"""\
+MemTotal:       16149888 kB
+MemFree:         1207596 kB
+MemAvailable:    9002432 kB
+Buffers:          562864 kB
+Cached:          7299096 kB
+SwapCached:         3184 kB
+SwapTotal:       8126460 kB
+SwapFree:        8082940 kB
+AnonHugePages:   1263616 kB
+SReclaimable:     476844 kB
+"""
+
+STAT = b"""\
+cpu  4350684 14521 1120299 20687999 677480 197238 48056 0 1383 0
+cpu0 1082143 1040 335283 19253788 628168 104752 21570 0 351 0
+cpu1 1010362 2065 294113 474697 18915 41743 9793 0 308 0
+intr 1097281385 18 0 0 0 0 0 0 0 1 0 0 0 0 0 0 0 0 0 0 0
+ctxt 690239751
+btime 1395249141
+"""
+
+
+def test_reader(tmpdir):
+    path = str(tmpdir.join("file"))
+    data = b"x" * 100
+    with open(path, "wb") as f:
+        f.write(data)
+
+    # Use small buffer to test buffer resizing.
+    reader = procfs.Reader(size=8)
+    assert reader.read(path) == data
+    assert reader.read(path) == data
+
+
+def test_reader_procfs():
+    reader = procfs.Reader()
+    with open(procfs.PROC_STAT, "rb") as f:
+        first_line = f.readline()
+    assert reader.read(procfs.PROC_STAT).startswith(first_line[:3])
+
+
+def test_meminfo_parser():
+    parser = procfs.MemInfoParser()
+    meminfo = parser.parse(MEMINFO)
+    assert meminfo == {
+        "MemTotal": 16149888,
+        "MemFree": 1207596,
+        "Buffers": 562864,
+        "Cached": 7299096,
+        "SwapTotal": 8126460,
+        "SwapFree": 8082940,
+        "AnonHugePages": 1263616,
+        "SReclaimable": 476844,
+    }
+
+
+def test_meminfo_parser_layout_changed():
+    parser = procfs.MemInfoParser()
+    parser.parse(MEMINFO)
+
+    # Remove a line, moving the following fields.
+    lines = MEMINFO.splitlines()
+    del lines[2]
+    meminfo = parser.parse(b"\n".join(lines))
+    assert meminfo["MemTotal"] == 16149888
+    assert meminfo["SReclaimable"] == 476844
+
+
+def test_meminfo_parser_missing_field():
+    parser = procfs.MemInfoParser()
+    lines = [line for line in MEMINFO.splitlines()
+             if not line.startswith(b"AnonHugePages:")]
+    meminfo = parser.parse(b"\n".join(lines))
+    assert "AnonHugePages" not in meminfo
+
+
+def test_meminfo_parser_empty():
+    parser = procfs.MemInfoParser()
+    with pytest.raises(ValueError):
+        parser.parse(b"")
+
+
+def test_parse_stat():
+    total, cores = procfs.parse_stat(STAT)
+    assert total == (4350684, 14521, 1120299, 20687999)
+    assert cores == {
+        "0": (1082143, 1040, 335283, 19253788),
+        "1": (1010362, 2065, 294113, 474697),
+    }
+
+
+def test_parse_pid_stat():
+    data = (b"4242 (vdsmd (x) y) S 1 4242 4242 0 -1 4194560 5305 5 0 0 "
+            b"1234 567 0 0 20 0 25 0 3456 1234567 8901")
+    assert procfs.parse_pid_stat(data) == (1234, 567)
+
+
+def test_parse_thp_state():
+    data = b"always [madvise] never\n"
+    assert procfs.parse_thp_state(data) == "madvise"
+
+
+def test_snapshot():
+    collector = procfs.Collector()
+    snapshot = collector.snapshot(os.getpid())
+    assert snapshot.meminfo["MemTotal"] > 0
+    assert len(snapshot.total_cpu) == 4
+    assert len(snapshot.cpu_cores) > 0
+    assert len(snapshot.pid_cpu) == 2
+    assert snapshot.duration >= 0
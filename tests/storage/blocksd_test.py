@@ -27,6 +27,8 @@ import time
 import uuid
 import string
 
+from collections import namedtuple
+
 import pytest
 
 from vdsm.common.units import MiB, GiB
@@ -36,6 +38,7 @@ from vdsm.storage import exception as se
 from vdsm.storage import lvm
 from vdsm.storage import sd
 from vdsm.storage.sdc import sdCache
+from vdsm.storage.volumemetadata import VolumeMetadata
 
 from . import qemuio
 from . marks import requires_root
@@ -148,6 +151,200 @@ def test_metadata_offset(monkeypatch):
     assert 1867776 == sd_manifest.metadata_offset(100, version=5)
 
 
+FakeLV = namedtuple("FakeLV", "name, tags")
+
+
+@pytest.fixture
+def md_manifest(monkeypatch, tmpdir):
+    """
+    Block storage domain manifest using a file as metadata volume.
+    """
+    fake_metadata = {
+        sd.DMDK_VERSION: 5,
+        sd.DMDK_LOGBLKSIZE: 512,
+        sd.DMDK_PHYBLKSIZE: 512,
+    }
+    monkeypatch.setattr(sd.StorageDomainManifest, "_makeDomainLock",
+                        lambda _: None)
+    manifest = blockSD.BlockStorageDomainManifest(
+        str(uuid.uuid4()), fake_metadata)
+
+    path = str(tmpdir.join("metadata"))
+    with open(path, "wb") as f:
+        f.truncate(blockSD.METADATA_BASE_V5 +
+                   300 * blockSD.METADATA_SLOT_SIZE_V5)
+    monkeypatch.setattr(manifest, "metadata_volume_path", lambda: path)
+
+    manifest.lvs = []
+    monkeypatch.setattr(lvm, "getLV", lambda vg_name: manifest.lvs)
+
+    return manifest
+
+
+def add_volume(manifest, slot, **params):
+    vol_id = str(uuid.uuid4())
+    md = VolumeMetadata(
+        domain=manifest.sdUUID,
+        image=params.get("image", str(uuid.uuid4())),
+        puuid=params.get("parent", sc.BLANK_UUID),
+        capacity=GiB,
+        format=sc.type2name(sc.COW_FORMAT),
+        type=sc.type2name(sc.SPARSE_VOL),
+        voltype=sc.type2name(sc.LEAF_VOL),
+        disktype=sc.DATA_DISKTYPE,
+        description=params.get("description", ""),
+        legality=sc.LEGAL_VOL,
+        ctime=int(time.time()))
+    data = md.storage_format(5).ljust(sc.METADATA_SIZE, b"\0")
+    manifest.write_metadata_block(slot, data)
+    manifest.lvs.append(FakeLV(vol_id, (
+        sc.TAG_PREFIX_MD + str(slot),
+        sc.TAG_PREFIX_IMAGE + md.image,
+        sc.TAG_PREFIX_PARENT + md.puuid,
+    )))
+    return vol_id, md
+
+
+class TestVolumesMetadata:
+
+    def test_read_metadata_blocks(self, md_manifest):
+        slots = [1, 2, 5, 200, 201]
+        for slot in slots:
+            data = (b"slot=%d\n" % slot).ljust(sc.METADATA_SIZE, b"\0")
+            md_manifest.write_metadata_block(slot, data)
+
+        blocks = md_manifest.read_metadata_blocks(reversed(slots))
+
+        assert sorted(blocks) == slots
+        for slot in slots:
+            assert blocks[slot] == md_manifest.read_metadata_block(slot)
+            assert blocks[slot].startswith(b"slot=%d\n" % slot)
+
+    def test_read_metadata_blocks_empty(self, md_manifest):
+        assert md_manifest.read_metadata_blocks([]) == {}
+
+    def test_read_volumes_metadata(self, md_manifest):
+        volumes = dict(add_volume(md_manifest, slot) for slot in (1, 7, 150))
+        # Volume with invalid metadata is ignored.
+        md_manifest.lvs.append(FakeLV(str(uuid.uuid4()), (
+            sc.TAG_PREFIX_MD + "9",)))
+
+        slots = md_manifest._volumes_slots()
+        metadata = md_manifest.read_volumes_metadata(slots)
+
+        assert sorted(metadata) == sorted(volumes)
+        for vol_id, md in metadata.items():
+            assert md.storage_format(5) == volumes[vol_id].storage_format(5)
+
+    def test_read_volumes_metadata_from_storage(self, md_manifest):
+        vol_id, md = add_volume(md_manifest, 1)
+        slots = md_manifest._volumes_slots()
+        md_manifest.read_volumes_metadata(slots)
+
+        # Simulate metadata change by another host.
+        md.description = "new description"
+        data = md.storage_format(5).ljust(sc.METADATA_SIZE, b"\0")
+        with open(md_manifest.metadata_volume_path(), "r+b") as f:
+            f.seek(md_manifest.metadata_offset(1))
+            f.write(data)
+
+        metadata = md_manifest.read_volumes_metadata(slots)
+        assert metadata[vol_id].description == "new description"
+
+
+class TestImageChain:
+
+    def test_chain(self, md_manifest):
+        img_id = str(uuid.uuid4())
+        base, _ = add_volume(md_manifest, 1, image=img_id)
+        top, _ = add_volume(md_manifest, 2, image=img_id, parent=base)
+        add_volume(md_manifest, 3)
+
+        chain = md_manifest.image_chain(img_id)
+        assert chain.chain() == [base, top]
+
+    def test_chain_synced_metadata(self, md_manifest):
+        img_id = str(uuid.uuid4())
+        base, _ = add_volume(md_manifest, 1, image=img_id)
+        mid, _ = add_volume(md_manifest, 2, image=img_id, parent=base)
+        top, md = add_volume(md_manifest, 3, image=img_id, parent=mid)
+
+        # Simulate syncVolumeChain() after mid was merged into top, updating
+        # only top metadata.
+        md.puuid = base
+        data = md.storage_format(5).ljust(sc.METADATA_SIZE, b"\0")
+        md_manifest.write_metadata_block(3, data)
+
+        chain = md_manifest.image_chain(img_id)
+        assert chain.chain(top) == [base, top]
+
+    def test_chain_invalid_metadata(self, md_manifest):
+        img_id = str(uuid.uuid4())
+        base, _ = add_volume(md_manifest, 1, image=img_id)
+        top, _ = add_volume(md_manifest, 2, image=img_id, parent=base)
+        md_manifest.clear_metadata_block(2)
+
+        # Parent tag is used when metadata cannot be read.
+        chain = md_manifest.image_chain(img_id)
+        assert chain.chain() == [base, top]
+
+
+class TestAllVolumes:
+
+    def test_metadata_parents(self, md_manifest, monkeypatch):
+        img_id = str(uuid.uuid4())
+        base, _ = add_volume(md_manifest, 1, image=img_id)
+        mid, _ = add_volume(md_manifest, 2, image=img_id, parent=base)
+        top, md = add_volume(md_manifest, 3, image=img_id, parent=mid)
+        other, _ = add_volume(md_manifest, 4)
+
+        # Simulate syncVolumeChain() after mid was merged into top, updating
+        # only top metadata.
+        md.puuid = base
+        data = md.storage_format(5).ljust(sc.METADATA_SIZE, b"\0")
+        md_manifest.write_metadata_block(3, data)
+
+        reads = []
+        read_metadata_blocks = md_manifest.read_metadata_blocks
+
+        def count_reads(slots):
+            slots = sorted(slots)
+            reads.append(slots)
+            return read_metadata_blocks(slots)
+
+        monkeypatch.setattr(
+            md_manifest, "read_metadata_blocks", count_reads)
+
+        vols = md_manifest.getAllVolumes()
+        assert vols[top] == sd.ImgsPar([img_id], base)
+        assert vols[mid] == sd.ImgsPar([img_id], base)
+        assert vols[other].parent == sc.BLANK_UUID
+
+        # Metadata of all volumes is read at once.
+        assert reads == [[1, 2, 3, 4]]
+
+    def test_invalid_metadata(self, md_manifest):
+        img_id = str(uuid.uuid4())
+        base, _ = add_volume(md_manifest, 1, image=img_id)
+        top, _ = add_volume(md_manifest, 2, image=img_id, parent=base)
+        md_manifest.clear_metadata_block(2)
+
+        # Parent tag is used when metadata cannot be read.
+        vols = md_manifest.getAllVolumes()
+        assert vols[top] == sd.ImgsPar([img_id], base)
+
+    def test_volumes_metadata(self, md_manifest):
+        img_id = str(uuid.uuid4())
+        base, _ = add_volume(md_manifest, 1, image=img_id)
+        top, _ = add_volume(md_manifest, 2, image=img_id, parent=base)
+        add_volume(md_manifest, 3)
+
+        metadata = md_manifest.volumes_metadata(img_id, [base, top])
+        assert sorted(metadata) == sorted([base, top])
+        assert metadata[top].puuid == base
+        assert metadata[top].legality == sc.LEGAL_VOL
+
+
 @pytest.mark.parametrize("version,block_size", [
     # Before version 5 only 512 bytes is supported.
     (3, sc.BLOCK_SIZE_4K),
@@ -360,10 +360,133 @@ class TestDirectioCheckerTimings:
                 res.delay()
 
 
+class TestReaderChecker:
+
+    def setup_method(self, m):
+        self.loop = asyncevent.EventLoop()
+        self.reader = check.DirectReader()
+        self.results = []
+        self.checks = 1
+
+    def teardown_method(self, m):
+        self.reader.stop()
+        self.loop.close()
+
+    def complete(self, result):
+        self.results.append(result)
+        if len(self.results) == self.checks:
+            self.loop.stop()
+
+    def test_path_missing(self):
+        checker = check.ReaderChecker(
+            self.loop, "/no/such/path", self.complete, self.reader)
+        checker.start()
+        self.loop.run_forever()
+        pprint.pprint(self.results)
+        result = self.results[0]
+        with pytest.raises(exception.MiscFileReadException) as e:
+            result.delay()
+        assert "/no/such/path" in str(e.value)
+
+    def test_path_ok(self):
+        with temporaryPath(data=b"blah") as path:
+            checker = check.ReaderChecker(
+                self.loop, path, self.complete, self.reader)
+            checker.start()
+            self.loop.run_forever()
+            pprint.pprint(self.results)
+            result = self.results[0]
+            delay = result.delay()
+            print("delay:", delay)
+            assert type(delay) == float
+
+    def test_timeout(self):
+        # Expected events:
+        # +0.0 start checker
+        # +0.3 fail with timeout
+        # +0.4 read commpletes, result ignored
+        # +0.5 loop stopped
+
+        def complete(result):
+            self.results.append(result)
+            self.loop.call_later(0.2, self.loop.stop)
+
+        checker = check.ReaderChecker(
+            self.loop,
+            "/path",
+            complete,
+            FakeReader(delay=0.4),
+            interval=0.3)
+        checker.start()
+        self.loop.run_forever()
+
+        assert len(self.results) == 1
+        with pytest.raises(exception.MiscFileReadException) as e:
+            self.results[0].delay()
+        assert "Read timeout" in str(e.value)
+
+    def test_stop_during_check(self):
+        checker = check.ReaderChecker(
+            self.loop, "/path", self.complete, FakeReader(delay=0.1))
+        checker.start()
+        self.loop.call_later(0.05, checker.stop)
+        self.loop.call_later(0.2, self.loop.stop)
+        self.loop.run_forever()
+        assert checker.wait(0)
+        assert self.results == []
+
+
+class TestDirectReader:
+
+    def setup_method(self, m):
+        self.reader = check.DirectReader()
+
+    def teardown_method(self, m):
+        self.reader.stop()
+
+    def test_read(self):
+        done = threading.Event()
+        results = []
+
+        def callback(read_delay, err):
+            results.append((read_delay, err))
+            done.set()
+
+        with temporaryPath(data=b"blah") as path:
+            self.reader.read(path, callback)
+            assert done.wait(1.0)
+
+        read_delay, err = results[0]
+        assert err is None
+        assert read_delay >= 0
+
+    def test_blocked_read(self):
+        # A read blocked in the callback should not delay other reads.
+        blocked = threading.Event()
+        done = threading.Event()
+
+        with temporaryPath(data=b"blah") as path:
+            self.reader.read(path, lambda delay, err: blocked.wait(1.0))
+            self.reader.read(path, lambda delay, err: done.set())
+            assert done.wait(1.0)
+            blocked.set()
+
+    def test_stopped(self):
+        self.reader.stop()
+        with pytest.raises(RuntimeError):
+            self.reader.read("/path", lambda delay, err: None)
+
+
+def test_read_block_missing():
+    read_delay, err = check.read_block("/no/such/path")
+    assert read_delay is None
+    assert "/no/such/path" in err
+
+
 class TestCheckService:
 
     def setup_method(self, m):
-        self.service = check.CheckService()
+        self.service = check.CheckService(method=check.DD)
         self.service.start()
         self.result = None
         self.completed = threading.Event()
@@ -412,6 +535,40 @@ class TestCheckService:
         assert not self.service.is_checking("/path")
 
 
+class TestCheckServiceRead:
+
+    def setup_method(self, m):
+        self.service = check.CheckService(method=check.READ)
+        self.service.start()
+        self.result = None
+        self.completed = threading.Event()
+
+    def teardown_method(self, m):
+        self.service.stop()
+
+    def complete(self, result):
+        self.result = result
+        self.completed.set()
+
+    def test_start_checking(self):
+        with temporaryPath(data=b"blah") as path:
+            self.service.start_checking(path, self.complete)
+            assert self.service.is_checking(path)
+            assert self.completed.wait(1.0)
+            assert self.result.rc == 0
+            assert self.service.stop_checking(path, timeout=1.0)
+
+
+def test_check_service_unsupported_method():
+    with pytest.raises(ValueError):
+        check.CheckService(method="no-such-method")
+
+
+def test_check_result_read_delay():
+    result = check.CheckResult("/path", 0, None, 0, 0, read_delay=0.5)
+    assert result.delay() == 0.5
+
+
 @pytest.mark.parametrize('err, seconds', [
     (b"1\n2\n1 byte (1 B) copied, 1 s, 1 B/s\n",
      1.0),
@@ -483,6 +640,20 @@ echo 100 bytes copied, {delay} s, {rate} B/s >&2
             f.write(data)
 
 
+class FakeReader(object):
+    """
+    DirectReader completing reads after delay seconds.
+    """
+
+    def __init__(self, delay):
+        self._delay = delay
+
+    def read(self, path, callback):
+        t = threading.Timer(self._delay, callback, args=(self._delay, None))
+        t.daemon = True
+        t.start()
+
+
 @pytest.fixture
 def fake_dd(tmpdir, monkeypatch):
     path = str(tmpdir.join("fake-dd"))
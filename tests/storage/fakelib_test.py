@@ -73,7 +73,7 @@ class TestFakeLVMSimpleVG(VdsmTestCase):
            size='10334765056', free='10334765056', extent_size='134217728',
            extent_count='77', free_count='77',
            tags=('RHAT_storage_domain_UNREADY',), vg_mda_size='134217728',
-           vg_mda_free='67107328', lv_count='0', pv_count='1',
+           vg_mda_free='67107328', lv_count='0', pv_count='1', seqno='1',
            pv_name=('/dev/mapper/360014054d75cb132d474c0eae9825766',),
            writeable=True, partial='OK')
 
@@ -105,6 +105,7 @@ class TestFakeLVMSimpleVG(VdsmTestCase):
             vg_mda_size='134217728',
             lv_count='0',
             pv_count='1',
+            seqno='1',
             writeable=True,
             partial='OK',
             pv_name=tuple(('/dev/mapper/%s' % d for d in self.DEVICES)))
@@ -92,9 +92,9 @@ def fake_hsm(monkeypatch):
     (sd.POSIXFS_DOMAIN, [('invalidateStorage', (), {})]),
     (sd.GLUSTERFS_DOMAIN, [('invalidateStorage', (), {})]),
     (sd.LOCALFS_DOMAIN, [('invalidateStorage', (), {})]),
-    (sd.ISCSI_DOMAIN, [('refreshStorage', (), {}),
+    (sd.ISCSI_DOMAIN, [('refreshStorage', (), {'resize': False}),
                        ('invalidateStorage', (), {})]),
-    (sd.FCP_DOMAIN, [('refreshStorage', (), {}),
+    (sd.FCP_DOMAIN, [('refreshStorage', (), {'resize': False}),
                      ('invalidateStorage', (), {})]),
 ])
 def test_refresh_storage_once(fake_hsm, conn_type, expected_calls):
@@ -514,6 +514,318 @@ def test_change_read_only_mode(fake_devices, no_delay, workers):
     assert elapsed > fake_runner.delay * 2
 
 
+class FakeReportRunner(lvm.LVMRunner):
+    """
+    Simulate vgs and lvs commands reporting a single VG "vg" with metadata
+    seqno, and LVs.
+    """
+
+    def __init__(self):
+        self.seqno = 1
+        self.lvs = ["lv1", "lv2"]
+        self.calls = []
+
+    def _run_command(self, cmd):
+        self.calls.append(cmd[1])
+        if cmd[1] == "vgs":
+            lines = [
+                "vg-uuid|vg|wz--n-|10737418240|9663676416|134217728|80|72|"
+                "|134217728|67107328|{}|1|{}|/dev/mapper/a".format(
+                    len(self.lvs), self.seqno)
+            ]
+        elif cmd[1] == "lvs":
+            lines = [
+                "{0}-uuid|{0}|vg|-wi-------|1073741824|0|/dev/mapper/a(0)|"
+                .format(name)
+                for name in self.lvs
+            ]
+        else:
+            raise RuntimeError("Unexpected command: {}".format(cmd))
+
+        out = "".join("  " + line + "\n" for line in lines)
+        return 0, out.encode("utf-8"), b""
+
+
+def test_lvs_seqno_not_changed(fake_devices):
+    runner = FakeReportRunner()
+    lc = lvm.LVMCache(runner)
+
+    # Loading the VG and its LVs records the seqno.
+    lc.getVg("vg")
+    assert lc.getLv("vg", "lv1").name == "lv1"
+    assert runner.calls == ["vgs", "lvs"]
+
+    # Invalidating the VG reloads the VG, but since the VG seqno did not
+    # change, the LVs are served from the cache.
+    del runner.calls[:]
+    lc._invalidatevgs("vg")
+    lc._invalidatelvsIfChanged("vg")
+    assert lc.getLv("vg", "lv2").name == "lv2"
+    assert sorted(lv.name for lv in lc.getLv("vg")) == ["lv1", "lv2"]
+    assert runner.calls == ["vgs"]
+
+    assert lc.stats() == {"hits": 2, "misses": 1, "reloads": 1}
+
+
+def test_lvs_seqno_changed(fake_devices):
+    runner = FakeReportRunner()
+    lc = lvm.LVMCache(runner)
+    lc.getVg("vg")
+    lv1 = lc.getLv("vg", "lv1")
+
+    # Simulate another host modifying the VG.
+    runner.seqno = 2
+    runner.lvs = ["lv1", "lv3"]
+
+    del runner.calls[:]
+    lc._invalidatevgs("vg")
+    lc._invalidatelvsIfChanged("vg")
+    assert lc.getLv("vg", "lv3").name == "lv3"
+    assert runner.calls == ["vgs", "lvs"]
+
+    # Unchanged LVs are kept, removed LVs are dropped.
+    assert lc.getLv("vg", "lv1") is lv1
+    assert lc.getLv("vg", "lv2") is None
+
+    assert lc.stats()["reloads"] == 3
+
+
+def test_lvs_seqno_unknown(fake_devices):
+    runner = FakeReportRunner()
+    lc = lvm.LVMCache(runner)
+
+    # LVs loaded before the VG, so we don't know the VG seqno.
+    lc.getLv("vg", "lv1")
+
+    # We must reload the LVs when validating.
+    del runner.calls[:]
+    lc._invalidatevgs("vg")
+    lc._invalidatelvsIfChanged("vg")
+    lc.getLv("vg", "lv1")
+    assert runner.calls == ["vgs", "lvs"]
+
+
+def test_lvs_seqno_hard_invalidation(fake_devices):
+    runner = FakeReportRunner()
+    lc = lvm.LVMCache(runner)
+    lc.getVg("vg")
+    lc.getLv("vg", "lv1")
+
+    # Local changes (e.g. activation) do not modify the VG seqno, so LVs
+    # invalidated by local changes must be reloaded.
+    del runner.calls[:]
+    lc._invalidatelvs("vg")
+    lc.getLv("vg", "lv1")
+    assert runner.calls == ["lvs"]
+
+
+FAKE_LVM_SHELL = os.path.join(os.path.dirname(__file__), "fake-lvm-shell")
+
+
+@pytest.fixture
+def lvm_shell():
+    shell = lvm.LVMShell(FAKE_LVM_SHELL, sudo=False)
+    try:
+        yield shell
+    finally:
+        shell.close()
+
+
+def test_shell_run(lvm_shell):
+    conf = lvm._buildConfig(
+        dev_filter=lvm._buildFilter(["/dev/mapper/a"]),
+        locking_type="1")
+    rc, out, err = lvm_shell.run(["pvs", "--config", conf, "-o", "uuid"])
+    assert rc == 0
+    assert out.decode("utf-8").splitlines() == ["  -o", "  uuid"]
+    assert err == b""
+
+
+@pytest.mark.parametrize("args, expected", [
+    (["pvs", "-o", "uuid"],
+     ["pvs", "--config", lvm.LVMShell.LOG_CONFIG, "-o", "uuid"]),
+    (["pvs", "--config", "devices { }", "-o", "uuid"],
+     ["pvs", "--config", "devices { } " + lvm.LVMShell.LOG_CONFIG,
+      "-o", "uuid"]),
+])
+def test_shell_log_config(lvm_shell, args, expected):
+    assert lvm_shell._with_log_config(args) == expected
+
+
+def test_shell_run_multiple_commands(lvm_shell):
+    for name in ("a", "b", "c"):
+        rc, out, err = lvm_shell.run(["lvs", name])
+        assert rc == 0
+        assert out == b"  %s\n" % name.encode("utf-8")
+
+
+def test_shell_run_failure(lvm_shell):
+    rc, out, err = lvm_shell.run(["fail"])
+    assert rc == 5
+    assert out == b""
+    assert err == b"  fake error\n"
+
+    # The shell is still usable after a failed command.
+    rc, out, err = lvm_shell.run(["vgs", "vg"])
+    assert rc == 0
+    assert out == b"  vg\n"
+
+
+def test_shell_terminated(lvm_shell):
+    with pytest.raises(lvm.ShellCommandError):
+        lvm_shell.run(["exit"])
+
+
+def test_shell_timeout(lvm_shell, monkeypatch):
+    monkeypatch.setattr(lvm.LVMShell, "TIMEOUT", 0.5)
+    with pytest.raises(lvm.ShellCommandError):
+        lvm_shell.run(["lvs", "hang"])
+
+
+@pytest.mark.parametrize("arg, quoted", [
+    ("-o", "-o"),
+    ("a b", "'a b'"),
+    ('a"b', "'a\"b'"),
+    ("", "''"),
+])
+def test_shell_quote(arg, quoted):
+    assert lvm._shell_quote(arg) == quoted
+
+
+def test_shell_quote_unsupported():
+    with pytest.raises(lvm.ShellError):
+        lvm._shell_quote("a'b")
+
+
+@pytest.fixture
+def fork_calls(monkeypatch):
+    calls = []
+
+    def run_command(self, cmd):
+        calls.append(cmd)
+        return 0, b"forked\n", b""
+
+    monkeypatch.setattr(lvm.LVMRunner, "_run_command", run_command)
+    return calls
+
+
+def test_shell_runner_reuse_shell(fork_calls):
+    runner = lvm.LVMShellRunner(sudo=False)
+    try:
+        for i in range(3):
+            rc, out, err = runner.run([FAKE_LVM_SHELL, "lvs", "vg"])
+            assert rc == 0
+            assert out == ["  vg"]
+
+        # All commands used the same idle shell.
+        assert len(runner._shells) == 1
+        assert fork_calls == []
+    finally:
+        runner.close()
+
+
+def test_shell_runner_fork_other_commands(fork_calls):
+    runner = lvm.LVMShellRunner(sudo=False)
+    try:
+        cmd = [FAKE_LVM_SHELL, "lvcreate", "-n", "lv", "vg"]
+        rc, out, err = runner.run(cmd)
+        assert rc == 0
+        assert out == ["forked"]
+        assert fork_calls == [cmd]
+        assert runner._shells == []
+    finally:
+        runner.close()
+
+
+def test_shell_runner_fallback(fork_calls):
+    runner = lvm.LVMShellRunner(sudo=False)
+    try:
+        # Starting the shell fails, so the command runs in a new process.
+        cmd = ["/no/such/lvm", "lvs", "vg"]
+        rc, out, err = runner.run(cmd)
+        assert rc == 0
+        assert out == ["forked"]
+        assert fork_calls == [cmd]
+
+        # Quoting the command fails before sending it to the shell, so the
+        # command runs in a new process.
+        cmd = [FAKE_LVM_SHELL, "lvs", "a'b"]
+        rc, out, err = runner.run(cmd)
+        assert rc == 0
+        assert out == ["forked"]
+        assert fork_calls[-1] == cmd
+        assert runner._shells == []
+    finally:
+        runner.close()
+
+
+def test_shell_runner_idle_shell_terminated(fork_calls):
+    runner = lvm.LVMShellRunner(sudo=False)
+    try:
+        shell = lvm.LVMShell(FAKE_LVM_SHELL, sudo=False)
+        shell._write(["exit"])
+        while shell.alive():
+            time.sleep(0.01)
+        runner._shells.append(shell)
+
+        # The terminated shell is replaced by a new shell.
+        rc, out, err = runner.run([FAKE_LVM_SHELL, "vgs", "vg"])
+        assert rc == 0
+        assert out == ["  vg"]
+        assert fork_calls == []
+        assert len(runner._shells) == 1
+        assert runner._shells[0] is not shell
+    finally:
+        runner.close()
+
+
+def test_shell_runner_command_failure(fork_calls, monkeypatch):
+    monkeypatch.setattr(lvm.LVMShell, "TIMEOUT", 0.5)
+    runner = lvm.LVMShellRunner(sudo=False)
+    try:
+        # The command was sent to the shell and timed out. It fails without
+        # running it again in a new process, and the shell is not reused.
+        rc, out, err = runner.run([FAKE_LVM_SHELL, "lvs", "hang"])
+        assert rc != 0
+        assert out == []
+        assert "Timeout" in err[0]
+        assert fork_calls == []
+        assert runner._shells == []
+    finally:
+        runner.close()
+
+
+@requires_root
+@pytest.mark.root
+def test_shell_real_lvm(tmp_storage):
+    # Verify that the lastlog exit code protocol works with the lvm shell.
+    dev = tmp_storage.create_device(10 * GiB)
+    vg_name = str(uuid.uuid4())
+    lvm.set_read_only(False)
+    lvm.createVG(vg_name, [dev], "initial-tag", 128)
+    try:
+        conf = lvm._buildConfig(
+            dev_filter=lvm._buildFilter([dev]),
+            locking_type="1")
+        shell = lvm.LVMShell()
+        try:
+            rc, out, err = shell.run(
+                ["vgs", "--config", conf, "--noheadings", "-o", "name",
+                 vg_name])
+            assert rc == 0
+            assert out.decode("utf-8").split() == [vg_name]
+
+            rc, out, err = shell.run(
+                ["vgs", "--config", conf, "--noheadings", "-o", "name",
+                 "no-such-vg"])
+            assert rc != 0
+            assert b"no-such-vg" in err
+        finally:
+            shell.close()
+    finally:
+        lvm.removeVG(vg_name)
+
+
 @requires_root
 @pytest.mark.root
 @pytest.mark.parametrize("read_only", [True, False])
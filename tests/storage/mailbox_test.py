@@ -189,6 +189,48 @@ class TestSPMMailMonitor:
             assert not spm_mm._handleRequests(sm.EMPTYMAILBOX * MAX_HOSTS)
 
 
+def test_non_empty_slots():
+    mail = bytearray(sm.EMPTYMAILBOX * 3)
+    # Message in slot 5 of mailbox 0.
+    mail[5 * sm.MESSAGE_SIZE] = 1
+    # Checksum in the metadata slot of mailbox 1.
+    mail[2 * sm.MAILBOX_SIZE - sm.MESSAGE_SIZE] = 1
+    # Message in slot 0 of mailbox 2.
+    mail[2 * sm.MAILBOX_SIZE] = 1
+    assert list(sm._nonEmptySlots(bytes(mail))) == [
+        5, 2 * sm.SLOTS_PER_MAILBOX]
+
+
+def test_mailbox_file_replaced(tmpdir):
+    buf = sm._alignedBuffer(sm.MAILBOX_SIZE)
+    with contextlib.closing(buf):
+        old = tmpdir.join("old")
+        old.write(b"o" * sm.MAILBOX_SIZE, mode="wb")
+        new = tmpdir.join("new")
+        new.write(b"n" * sm.MAILBOX_SIZE, mode="wb")
+        link = tmpdir.join("inbox")
+        link.mksymlinkto(old)
+
+        mbox = sm._mboxFile(str(link))
+        try:
+            mbox.pread(0, buf)
+            assert buf[:] == b"o" * sm.MAILBOX_SIZE
+
+            # Simulate master domain migration.
+            link.remove()
+            link.mksymlinkto(new)
+
+            mbox.pread(0, buf)
+            assert buf[:] == b"n" * sm.MAILBOX_SIZE
+
+            buf[:] = sm.EMPTYMAILBOX
+            mbox.pwrite(0, buf)
+            assert new.read(mode="rb") == sm.EMPTYMAILBOX
+            assert old.read(mode="rb") == b"o" * sm.MAILBOX_SIZE
+        finally:
+            mbox.close()
+
+
 class TestHSMMailbox:
 
     def test_clear_host_outbox(self, mboxfiles):
@@ -272,18 +314,18 @@ class TestCommunicate:
     def test_fill_slots(self, mboxfiles, monkeypatch):
 
         filled = threading.Event()
-        orig_cmd = sm._mboxExecCmd
+        orig_send_mail = sm.HSM_MailMonitor._sendMail
 
-        def mbox_cmd_hook(*args, **kwargs):
-            data = kwargs.get('data')
-            if data and all(
+        def send_mail_hook(self):
+            data = self._outgoingMail
+            if all(
                 data[i:i + 1] != b"\0"
                 for i in range(0, sm.MESSAGES_PER_MAILBOX, sm.MESSAGE_SIZE)
             ):
                 filled.set()
-            return orig_cmd(*args, **kwargs)
+            return orig_send_mail(self)
 
-        monkeypatch.setattr(sm, "_mboxExecCmd", mbox_cmd_hook)
+        monkeypatch.setattr(sm.HSM_MailMonitor, "_sendMail", send_mail_hook)
 
         with make_hsm_mailbox(mboxfiles, 1) as hsm_mb:
             for _ in range(sm.MESSAGES_PER_MAILBOX):
@@ -351,12 +393,103 @@ class TestCommunicate:
                     assert time.time() < deadline, "Timeout clearing SPM inbox"
                     time.sleep(0.1)
 
+        hsm_stats = hsm_mb.stats()
+        assert hsm_stats["send_latency.count"] == messages
+        assert hsm_stats["reply_latency.count"] == messages
+        assert spm_mm.stats()["reply_latency.count"] == messages
+
         times = [end[k] - start[k] for k in start]
         times.sort()
         log.info("stats: messages=%d delay=%.3f best=%.3f worst=%.3f avg=%.3f",
                  messages, delay, times[0], times[-1], sum(times) / len(times))
 
 
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPollInterval:
+
+    def test_disabled(self):
+        clock = FakeClock()
+        pi = sm.PollInterval(
+            2, adaptive=False, min_interval=0.1, active_timeout=5,
+            clock=clock)
+        assert pi.next() == 2
+        pi.activity()
+        assert pi.next() == 2
+
+    def test_idle(self):
+        pi = sm.PollInterval(
+            2, adaptive=True, min_interval=0.1, active_timeout=5,
+            clock=FakeClock())
+        assert pi.next() == 2
+
+    def test_active(self):
+        clock = FakeClock()
+        pi = sm.PollInterval(
+            2, adaptive=True, min_interval=0.1, active_timeout=5,
+            clock=clock)
+        pi.activity()
+        assert pi.next() == 0.1
+        clock.now += 4.9
+        assert pi.next() == 0.1
+
+        # After active_timeout, back off to max_interval.
+        clock.now += 0.1
+        intervals = [pi.next() for _ in range(6)]
+        assert intervals == pytest.approx([0.2, 0.4, 0.8, 1.6, 2, 2])
+
+        # New activity, poll quickly again.
+        pi.activity()
+        assert pi.next() == 0.1
+
+    def test_min_interval_bigger_than_max(self):
+        pi = sm.PollInterval(
+            1, adaptive=True, min_interval=2, active_timeout=5,
+            clock=FakeClock())
+        pi.activity()
+        assert pi.next() == 1
+
+    def test_config(self):
+        # Default configuration keeps the old behavior.
+        pi = sm.PollInterval(2)
+        assert not pi.adaptive
+        pi.activity()
+        assert pi.next() == 2
+
+
+class TestLatencyHistogram:
+
+    def test_empty(self):
+        h = sm.LatencyHistogram()
+        report = h.report("latency")
+        assert report["latency.count"] == 0
+        assert report["latency.sum"] == 0
+        assert report["latency.le_inf"] == 0
+
+    def test_observe(self):
+        h = sm.LatencyHistogram()
+        for seconds in (0.01, 0.05, 0.3, 1.5, 60):
+            h.observe(seconds)
+        report = h.report("latency")
+        assert report["latency.count"] == 5
+        assert report["latency.sum"] == pytest.approx(61860)
+        assert report["latency.le_50"] == 2
+        assert report["latency.le_100"] == 2
+        assert report["latency.le_250"] == 2
+        assert report["latency.le_500"] == 3
+        assert report["latency.le_1000"] == 3
+        assert report["latency.le_2000"] == 4
+        assert report["latency.le_10000"] == 4
+        assert report["latency.le_inf"] == 5
+
+
 class TestExtendMessage:
 
     def test_no_domain(self):
@@ -156,3 +156,106 @@ def test_scsi_id_fails(fake_scsi_id):
 
     scsi_serial = multipath.get_scsi_serial("fake_device")
     assert scsi_serial == ""
+
+
+@pytest.fixture
+def fake_udev(tmpdir, monkeypatch):
+    sys_block = tmpdir.mkdir("sys_block")
+    udev_data = tmpdir.mkdir("udev_data")
+    monkeypatch.setattr(multipath, "SYS_BLOCK", str(sys_block))
+    monkeypatch.setattr(multipath, "UDEV_DATA", str(udev_data))
+
+    class FakeUdev(object):
+
+        def add_device(self, dev, devno):
+            sys_block.mkdir(dev).join("dev").write(devno + "\n")
+            self.change(devno)
+
+        def change(self, devno):
+            # udev replaces the database entry for every event.
+            entry = udev_data.join("b" + devno)
+            tmp = udev_data.join("tmp")
+            tmp.write("E:DEVNAME=/dev/%s\n" % devno)
+            tmp.rename(entry)
+
+        def remove(self, devno):
+            udev_data.join("b" + devno).remove()
+
+    return FakeUdev()
+
+
+class Loader(object):
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self, dev):
+        self.calls += 1
+        return self.value
+
+
+def test_device_cache_hit(fake_udev):
+    fake_udev.add_device("sda", "8:0")
+    cache = multipath.DeviceCache()
+    load = Loader("serial")
+
+    assert cache.get("sda", load) == "serial"
+    assert cache.get("sda", load) == "serial"
+    assert load.calls == 1
+
+
+def test_device_cache_udev_change(fake_udev):
+    fake_udev.add_device("sda", "8:0")
+    cache = multipath.DeviceCache()
+    load = Loader("old")
+    cache.get("sda", load)
+
+    fake_udev.change("8:0")
+    load.value = "new"
+    assert cache.get("sda", load) == "new"
+    assert load.calls == 2
+
+
+def test_device_cache_no_udev_entry(fake_udev):
+    fake_udev.add_device("sda", "8:0")
+    fake_udev.remove("8:0")
+    cache = multipath.DeviceCache()
+    load = Loader("serial")
+
+    cache.get("sda", load)
+    cache.get("sda", load)
+    assert load.calls == 2
+
+
+def test_device_cache_missing_device(fake_udev):
+    cache = multipath.DeviceCache()
+    load = Loader("serial")
+
+    cache.get("sdz", load)
+    cache.get("sdz", load)
+    assert load.calls == 2
+
+
+def test_device_cache_incomplete(fake_udev):
+    fake_udev.add_device("sda", "8:0")
+    cache = multipath.DeviceCache()
+    load = Loader("")
+
+    cache.get("sda", load)
+    cache.get("sda", load)
+    assert load.calls == 2
+
+
+def test_device_cache_prune(fake_udev):
+    fake_udev.add_device("sda", "8:0")
+    fake_udev.add_device("sdb", "8:16")
+    cache = multipath.DeviceCache()
+    load = Loader("serial")
+    cache.get("sda", load)
+    cache.get("sdb", load)
+
+    cache.prune(["sdb"])
+    cache.get("sda", load)
+    cache.get("sdb", load)
+    assert load.calls == 3
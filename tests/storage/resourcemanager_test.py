@@ -119,6 +119,30 @@ class FailAfterSwitchFactory(rm.SimpleResourceFactory):
         return s
 
 
+class BlockingResourceFactory(rm.SimpleResourceFactory):
+    """
+    A resource factory blocking until unblocked when creating a resource
+    named "blocking". Used for testing.
+    """
+    def __init__(self):
+        self.creating = threading.Event()
+        self.unblock = threading.Event()
+        self.fail = False
+        self.exists = True
+
+    def resourceExists(self, name):
+        return self.exists
+
+    def createResource(self, name, lockType):
+        if name == "blocking":
+            self.creating.set()
+            self.unblock.wait()
+            if self.fail:
+                self.fail = False
+                raise Exception("Failed to create resource")
+        return six.StringIO("%s:%s" % (name, lockType))
+
+
 @pytest.fixture
 def tmp_manager(monkeypatch):
     """
@@ -538,6 +562,149 @@ class TestResourceManager:
         assert exclusiveReq3.granted()
         resources.pop().release()  # exclusiveReq 3
 
+    def testCreateResourceOutsideNamespaceLock(self, tmp_manager):
+        factory = BlockingResourceFactory()
+        rm.registerNamespace("blocking", factory)
+        resources = []
+
+        def callback(req, res):
+            resources.append(res)
+
+        t = threading.Thread(
+            target=rm._registerResource,
+            args=("blocking", "blocking", rm.SHARED, callback))
+        t.start()
+        try:
+            assert factory.creating.wait(5)
+
+            # Other resources in the namespace are not blocked.
+            other = rm.acquireResource("blocking", "other", rm.EXCLUSIVE, 5)
+            other.release()
+
+            # Requests for the resource wait until the resource is created.
+            sharedReq = rm._registerResource(
+                "blocking", "blocking", rm.SHARED, callback)
+            assert not sharedReq.granted()
+            status = rm._getResourceStatus("blocking", "blocking")
+            assert status == rm.STATUS_SHARED
+        finally:
+            factory.unblock.set()
+            t.join()
+
+        assert sharedReq.granted()
+        assert len(resources) == 2
+        for res in resources:
+            assert res.getvalue() == "blocking:shared"
+            res.release()
+
+        status = rm._getResourceStatus("blocking", "blocking")
+        assert status == rm.STATUS_FREE
+
+    def testCreateResourceFailureRetriesWaiting(self, tmp_manager):
+        factory = BlockingResourceFactory()
+        factory.fail = True
+        rm.registerNamespace("blocking", factory)
+        resources = []
+
+        def callback(req, res):
+            resources.append(res)
+
+        requests = []
+        t = threading.Thread(
+            target=lambda: requests.append(rm._registerResource(
+                "blocking", "blocking", rm.EXCLUSIVE, callback)))
+        t.start()
+        try:
+            assert factory.creating.wait(5)
+            exclusiveReq = rm._registerResource(
+                "blocking", "blocking", rm.EXCLUSIVE, callback)
+            assert not exclusiveReq.granted()
+        finally:
+            factory.unblock.set()
+            t.join()
+
+        # The first request failed, the waiting request created the resource.
+        assert requests[0].canceled()
+        assert exclusiveReq.granted()
+        assert resources[0] is None
+        resources[1].release()
+
+        status = rm._getResourceStatus("blocking", "blocking")
+        assert status == rm.STATUS_FREE
+
+    def testCreateResourceFailureRetryFails(self, tmp_manager):
+        factory = BlockingResourceFactory()
+        factory.fail = True
+        rm.registerNamespace("blocking", factory)
+        resources = []
+
+        def callback(req, res):
+            resources.append(res)
+
+        t = threading.Thread(
+            target=rm._registerResource,
+            args=("blocking", "blocking", rm.EXCLUSIVE, callback))
+        t.start()
+        try:
+            assert factory.creating.wait(5)
+            waiting = [
+                rm._registerResource(
+                    "blocking", "blocking", rm.EXCLUSIVE, callback)
+                for i in range(2)]
+            # The resource was removed while creating it, so retrying the
+            # waiting requests fails.
+            factory.exists = False
+        finally:
+            factory.unblock.set()
+            t.join()
+
+        # All waiting requests are canceled.
+        for req in waiting:
+            assert req.canceled()
+        assert resources == [None, None, None]
+
+        factory.exists = True
+        status = rm._getResourceStatus("blocking", "blocking")
+        assert status == rm.STATUS_FREE
+
+    def testStats(self, tmp_manager):
+        resources = []
+
+        def callback(req, res):
+            resources.append(res)
+
+        exclusive = rm.acquireResource("storage", "resource", rm.EXCLUSIVE)
+        sharedReq1 = rm._registerResource(
+            "storage", "resource", rm.SHARED, callback)
+        sharedReq2 = rm._registerResource(
+            "storage", "resource", rm.SHARED, callback)
+
+        stats = rm.getStats()["storage"]
+        assert stats["requests"] == 1
+        assert stats["contended"] == 2
+        assert stats["queued"] == 2
+        assert stats["holds"] == 0
+
+        exclusive.release()
+        assert sharedReq1.granted()
+        assert sharedReq2.granted()
+        for res in resources:
+            res.release()
+
+        stats = rm.getStats()["storage"]
+        assert stats["requests"] == 3
+        assert stats["contended"] == 2
+        assert stats["queued"] == 0
+        assert stats["max_queued"] == 2
+        assert stats["holds"] == 2
+        assert stats["wait_time"] >= 0
+        assert stats["max_wait_time"] <= stats["wait_time"]
+        assert stats["max_hold_time"] <= stats["hold_time"]
+
+        # Other namespaces are not affected.
+        stats = rm.getStats()["string"]
+        assert stats["requests"] == 0
+
     @pytest.mark.slow
     @pytest.mark.stress
     def testStressTest(self, tmp_manager):
@@ -34,3 +34,56 @@ def test_validate_domain_version_invaid():
 @pytest.mark.parametrize("domain_version", [0, 2, 3, 4, 5])
 def test_validate_domain_version_supported(domain_version):
     sd.StorageDomain.validate_version(domain_version)
+
+
+def test_image_chain_simple():
+    image_chain = sd.ImageChain("img", {
+        "vol2": "vol1",
+        "vol1": sd.BLANK_UUID,
+        "vol3": "vol2",
+    })
+    assert image_chain.leaf == "vol3"
+    assert image_chain.template is None
+    assert image_chain.chain() == ["vol1", "vol2", "vol3"]
+    assert image_chain.chain("vol2") == ["vol1", "vol2"]
+    assert sorted(image_chain.volumes()) == ["vol1", "vol2", "vol3"]
+
+
+def test_image_chain_template():
+    image_chain = sd.ImageChain(
+        "img",
+        {"vol2": "vol1", "vol1": "template"},
+        external=["template", "other"])
+    assert image_chain.template == "template"
+    assert image_chain.chain() == ["vol1", "vol2"]
+    assert sorted(image_chain.volumes()) == ["template", "vol1", "vol2"]
+
+
+def test_image_chain_template_image():
+    image_chain = sd.ImageChain("img", {"template": sd.BLANK_UUID})
+    assert image_chain.chain() == ["template"]
+
+
+@pytest.mark.parametrize("parents,vol_id", [
+    # Multiple leaves.
+    ({"vol1": sd.BLANK_UUID, "vol2": "vol1", "vol3": "vol1"}, None),
+    # Missing parent.
+    ({"vol2": "vol1"}, None),
+    # Volume not in image.
+    ({"vol1": sd.BLANK_UUID}, "vol2"),
+    # No volumes.
+    ({}, None),
+])
+def test_image_chain_unresolved(parents, vol_id):
+    image_chain = sd.ImageChain("img", parents)
+    assert image_chain.chain(vol_id) is None
+
+
+def test_image_chain_loop():
+    image_chain = sd.ImageChain("img", {
+        "vol1": "vol3",
+        "vol2": "vol1",
+        "vol3": "vol2",
+    })
+    with pytest.raises(se.ImageIsNotLegalChain):
+        image_chain.chain("vol3")
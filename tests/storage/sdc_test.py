@@ -0,0 +1,278 @@
+#
+# Copyright 2020 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import threading
+import time
+
+import pytest
+
+from vdsm.storage import blockSD
+from vdsm.storage import exception as se
+from vdsm.storage import lvm
+from vdsm.storage import multipath
+from vdsm.storage import sdc
+
+
+class FakeStorage(object):
+    """
+    Record the storage operations done by a refresh.
+    """
+
+    def __init__(self, pvs=None):
+        # {vgName: [pvName, ...]}
+        self.pvs = pvs or {}
+        self.calls = []
+        # Set to block multipath.rescan() until released.
+        self.blocked = None
+        self.rescanning = threading.Event()
+
+    def rescan(self):
+        self.calls.append(("rescan",))
+        self.rescanning.set()
+        if self.blocked:
+            self.blocked.wait()
+
+    def resize_devices(self, guids=None):
+        self.calls.append(("resize_devices", guids))
+
+    def invalidateCache(self):
+        self.calls.append(("invalidateCache",))
+
+    def invalidateFilter(self):
+        self.calls.append(("invalidateFilter",))
+
+    def invalidatePVs(self, guids):
+        self.calls.append(("invalidatePVs", sorted(guids)))
+
+    def invalidateVG(self, vgName):
+        self.calls.append(("invalidateVG", vgName))
+
+    def listPVNames(self, vgName):
+        try:
+            return self.pvs[vgName]
+        except KeyError:
+            raise se.VolumeGroupDoesNotExist(vgName)
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    storage = FakeStorage(pvs={"vg": ["/dev/mapper/guid1"]})
+    monkeypatch.setattr(multipath, "rescan", storage.rescan)
+    monkeypatch.setattr(
+        blockSD, "findDomain", lambda sdUUID: "domain " + sdUUID)
+    monkeypatch.setattr(multipath, "resize_devices", storage.resize_devices)
+    for name in ("invalidateCache", "invalidateFilter", "invalidatePVs",
+                 "invalidateVG", "listPVNames"):
+        monkeypatch.setattr(lvm, name, getattr(storage, name))
+    return storage
+
+
+def test_full_refresh(storage):
+    cache = sdc.StorageDomainCache()
+    cache.refreshStorage()
+    assert storage.calls == [
+        ("rescan",),
+        ("resize_devices", None),
+        ("invalidateCache",),
+    ]
+
+
+def test_full_refresh_no_resize(storage):
+    cache = sdc.StorageDomainCache()
+    cache.refreshStorage(resize=False)
+    assert storage.calls == [
+        ("rescan",),
+        ("invalidateCache",),
+    ]
+
+
+def test_scoped_refresh(storage):
+    cache = sdc.StorageDomainCache()
+    cache.refreshStorage(vgs=["vg", "file-domain"], guids=["guid2"])
+    assert storage.calls == [
+        ("rescan",),
+        ("resize_devices", ["guid1", "guid2"]),
+        ("invalidateFilter",),
+        ("invalidatePVs", ["guid1", "guid2"]),
+        ("invalidateVG", "file-domain"),
+        ("invalidateVG", "vg"),
+    ]
+
+
+def test_scoped_refresh_guids_rescan(storage):
+    cache = sdc.StorageDomainCache()
+    cache.refreshStorage(guids=["guid1"])
+    cache.refreshStorage(guids=["guid1"])
+    assert [c for c in storage.calls if c[0] == "rescan"] == [
+        ("rescan",), ("rescan",)]
+
+
+def test_scoped_refresh_vgs_rescan_once(storage):
+    cache = sdc.StorageDomainCache()
+    cache.refreshStorage(vgs=["vg"])
+    cache.refreshStorage(vgs=["vg"])
+    assert [c for c in storage.calls if c[0] == "rescan"] == [("rescan",)]
+
+    # Storage must be rescanned again after invalidation.
+    cache.invalidateStorage()
+    cache.refreshStorage(vgs=["vg"])
+    assert [c for c in storage.calls if c[0] == "rescan"] == [
+        ("rescan",), ("rescan",)]
+
+
+def test_generation(storage):
+    cache = sdc.StorageDomainCache()
+    assert cache.refreshStorage() == 1
+    assert cache.refreshStorage(vgs=["vg"]) == 2
+
+
+def test_coalesce_concurrent_refreshes(storage):
+    cache = sdc.StorageDomainCache()
+    storage.blocked = threading.Event()
+
+    results = {}
+
+    def refresh(name, **kwargs):
+        results[name] = cache.refreshStorage(**kwargs)
+
+    first = threading.Thread(
+        target=refresh, args=("first",), kwargs={"guids": ["guid1"]})
+    first.start()
+    try:
+        assert storage.rescanning.wait(5)
+
+        # Arrive while the first refresh is running; both must wait for the
+        # next refresh, since the running one started before they called.
+        waiters = [
+            threading.Thread(
+                target=refresh, args=("vg",), kwargs={"vgs": ["vg"]}),
+            threading.Thread(
+                target=refresh, args=("guid",), kwargs={"guids": ["guid2"]}),
+        ]
+        for t in waiters:
+            t.start()
+
+        # Make sure the waiters have queued their scopes.
+        while not waiting(cache, 2):
+            time.sleep(0.01)
+    finally:
+        storage.blocked.set()
+        first.join()
+        for t in waiters:
+            t.join()
+
+    assert results == {"first": 1, "vg": 2, "guid": 2}
+
+    # Only 2 refreshes: the first and one for both waiters.
+    resizes = [c for c in storage.calls if c[0] == "resize_devices"]
+    assert resizes == [
+        ("resize_devices", ["guid1"]),
+        ("resize_devices", ["guid1", "guid2"]),
+    ]
+
+
+def waiting(cache, count):
+    with cache._refreshCond:
+        pending = cache._refreshPending
+        if pending is None:
+            return False
+        return len(pending.vgs | pending.guids) == count
+
+
+def test_merge_scopes():
+    a = sdc.RefreshScope(vgs=["vg1"], resize=False)
+    b = sdc.RefreshScope(guids=["guid1"], resize=True)
+    merged = a.merge(b)
+    assert merged.vgs == {"vg1"}
+    assert merged.guids == {"guid1"}
+    assert merged.resize
+    assert not merged.full
+
+    full = a.merge(sdc.RefreshScope(resize=False))
+    assert full.full
+    assert not full.resize
+
+
+def test_produce_refreshes_domain_vg(storage):
+    cache = sdc.StorageDomainCache()
+    cache.knownSDs["vg"] = blockSD.findDomain
+    cache.knownSDs["other"] = blockSD.findDomain
+
+    assert cache.produce("vg").getRealDomain() == "domain vg"
+    assert ("invalidateVG", "vg") in storage.calls
+    assert ("invalidateCache",) not in storage.calls
+
+    # Producing another domain refreshes its vg without rescanning.
+    del storage.calls[:]
+    cache.produce("other")
+    assert storage.calls == [
+        ("invalidateFilter",),
+        ("invalidatePVs", []),
+        ("invalidateVG", "other"),
+    ]
+
+
+def test_produce_after_full_refresh(storage):
+    cache = sdc.StorageDomainCache()
+    cache.knownSDs["vg"] = blockSD.findDomain
+    cache.refreshStorage()
+
+    del storage.calls[:]
+    cache.produce("vg")
+    assert storage.calls == []
+
+
+def test_produce_after_invalidate(storage):
+    cache = sdc.StorageDomainCache()
+    cache.knownSDs["vg"] = blockSD.findDomain
+    cache.produce("vg")
+    cache.manuallyRemoveDomain("vg")
+    cache.invalidateStorage()
+
+    del storage.calls[:]
+    cache.produce("vg")
+    assert storage.calls[0] == ("rescan",)
+    assert ("invalidateVG", "vg") in storage.calls
+
+
+def test_produce_file_domain(storage):
+    cache = sdc.StorageDomainCache()
+    cache.knownSDs["file-domain"] = lambda sdUUID: "domain " + sdUUID
+
+    # File domains do not use lvm or multipath devices.
+    assert cache.produce("file-domain").getRealDomain() == "domain file-domain"
+    assert storage.calls == []
+
+
+def test_produce_unknown_domain(storage, monkeypatch):
+    cache = sdc.StorageDomainCache()
+    monkeypatch.setattr(
+        cache, "_findUnfetchedDomain", lambda sdUUID: "domain " + sdUUID)
+
+    # Unknown domain may be on storage which is not visible yet.
+    assert cache.produce("unknown").getRealDomain() == "domain unknown"
+    assert storage.calls == [
+        ("rescan",),
+        ("resize_devices", None),
+        ("invalidateCache",),
+    ]
@@ -100,6 +100,7 @@ class FakeLVM(object):
                      vg_mda_free=None,
                      lv_count='0',
                      pv_count=str(len(devices)),
+                     seqno='1',
                      pv_name=pv_name,
                      writeable=True,
                      partial='OK')
@@ -400,7 +401,7 @@ class FakeStorageDomainCache(object):
         self.domains.pop(sdUUID, None)
 
     @recorded
-    def refreshStorage(self):
+    def refreshStorage(self, resize=True, vgs=(), guids=()):
         pass
 
     @recorded
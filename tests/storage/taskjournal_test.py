@@ -0,0 +1,155 @@
+#
+# Copyright 2020 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import pytest
+
+from vdsm.common import cmdutils
+from vdsm.storage import exception as se
+from vdsm.storage import outOfProcess as oop
+from vdsm.storage import taskjournal
+
+STATE = {
+    "task": {"id": "task-1", "state": "running"},
+    "jobs": [{"name": "job"}],
+    "recoveries": [],
+}
+
+
+@pytest.fixture
+def journal(tmpdir):
+    yield taskjournal.Journal(str(tmpdir.join(taskjournal.JOURNAL_NAME)))
+    oop.stop()
+
+
+def test_encode_decode():
+    record = taskjournal.encode("task-1", STATE)
+    assert record.endswith(b"\n")
+    assert taskjournal.decode(record) == ("task-1", STATE)
+
+
+def test_encode_decode_removed():
+    record = taskjournal.encode("task-1", None)
+    assert taskjournal.decode(record) == ("task-1", None)
+
+
+@pytest.mark.parametrize("record", [
+    # Partial record.
+    taskjournal.encode("task-1", STATE)[:-10],
+    # Bad checksum.
+    b"00000000" + taskjournal.encode("task-1", STATE)[8:],
+    # Bad payload.
+    b"00000000 \n",
+])
+def test_decode_invalid(record):
+    with pytest.raises(ValueError):
+        taskjournal.decode(record)
+
+
+def test_load_missing(journal):
+    assert journal.load() == {}
+    assert journal.get("task-1") is None
+
+
+def test_save_load(journal):
+    journal.save("task-1", STATE)
+    journal.save("task-2", STATE)
+    assert journal.get("task-1") == STATE
+
+    # Simulate a new SPM replaying the journal.
+    new = taskjournal.Journal(journal.path)
+    assert new.load() == {"task-1": STATE, "task-2": STATE}
+
+
+def test_save_appends(journal):
+    journal.save("task-1", STATE)
+    updated = dict(STATE, task={"id": "task-1", "state": "finished"})
+    journal.save("task-1", updated)
+
+    with open(journal.path, "rb") as f:
+        records = f.readlines()
+    assert [taskjournal.decode(r) for r in records] == [
+        ("task-1", STATE),
+        ("task-1", updated),
+    ]
+    assert journal.load() == {"task-1": updated}
+
+
+def test_remove(journal):
+    journal.save("task-1", STATE)
+    journal.save("task-2", STATE)
+    journal.remove("task-1")
+    assert journal.get("task-1") is None
+    assert taskjournal.Journal(journal.path).load() == {"task-2": STATE}
+
+
+def test_partial_record(journal):
+    journal.save("task-1", STATE)
+
+    # Simulate a partial write when the SPM was fenced.
+    with open(journal.path, "ab") as f:
+        f.write(taskjournal.encode("task-2", STATE)[:20])
+
+    new = taskjournal.Journal(journal.path)
+    assert new.load() == {"task-1": STATE}
+
+    # The next record must not be appended to the partial record.
+    new.save("task-3", STATE)
+    assert taskjournal.Journal(journal.path).load() == {
+        "task-1": STATE,
+        "task-3": STATE,
+    }
+
+
+def test_failed_write(journal, monkeypatch):
+    journal.save("task-1", STATE)
+
+    # Simulate a write failing after writing part of the record.
+    def write(data):
+        with open(journal.path, "ab") as f:
+            f.write(data[:20])
+        raise cmdutils.Error(["dd"], 1, b"", b"No space left on device")
+
+    with monkeypatch.context() as m:
+        m.setattr(journal, "_write", write)
+        with pytest.raises(se.TaskPersistError):
+            journal.save("task-2", STATE)
+
+    # The next record must not be appended to the partial record.
+    journal.save("task-3", STATE)
+    assert taskjournal.Journal(journal.path).load() == {
+        "task-1": STATE,
+        "task-3": STATE,
+    }
+
+
+def test_compact(journal, monkeypatch):
+    monkeypatch.setattr(taskjournal, "COMPACT_RECORDS", 10)
+    journal.save("task-1", STATE)
+    for i in range(10):
+        journal.save("task-2", STATE)
+        journal.remove("task-2")
+
+    with open(journal.path, "rb") as f:
+        records = f.readlines()
+    assert len(records) < 10
+    assert taskjournal.Journal(journal.path).load() == {"task-1": STATE}
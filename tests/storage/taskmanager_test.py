@@ -21,11 +21,17 @@
 from __future__ import absolute_import
 from __future__ import division
 
+import os
+
 from contextlib import contextmanager
 
+import pytest
+
+from testlib import make_config
 from vdsm.storage import outOfProcess as oop
 from vdsm.storage import task
 from vdsm.storage import taskManager
+from vdsm.storage import taskjournal
 
 from . storagetestlib import Callable
 
@@ -49,7 +55,14 @@ def task_manager(workers=1):
         oop.stop()
 
 
-def test_persistent_job(tmpdir, add_recovery):
+@pytest.fixture(params=["false", "true"], ids=["dirs", "journal"])
+def task_journal(request, monkeypatch):
+    config = make_config([("irs", "task_journal", request.param)])
+    monkeypatch.setattr(task, "config", config)
+    return config.getboolean("irs", "task_journal")
+
+
+def test_persistent_job(tmpdir, add_recovery, task_journal):
     store = str(tmpdir)
     # Simulate SPM starting a persistent job and fencing out
     with task_manager() as tm:
@@ -146,3 +159,50 @@ def test_stop_clear_task(add_recovery):
         # Clear the task from the manager list
         tm.clearTask("task-id")
         assert "task-id" not in tm.getAllTasks()
+
+
+def test_persistent_job_journal(tmpdir, add_recovery, task_journal):
+    store = str(tmpdir)
+    with task_manager() as tm:
+        c = Callable(hang_timeout=WAIT_TIMEOUT)
+        t = task.Task(id="task-id", abort_callback=c.finish)
+        add_recovery(t, "fakerecovery", ["arg1"])
+        t.prepare(tm.scheduleJob, "tag", store, t, "job", c)
+        c.wait_until_running()
+        t.store = None
+
+    # Tasks are persisted either in the journal or in a task directory.
+    path = os.path.join(store, taskjournal.JOURNAL_NAME)
+    journal = taskjournal.Journal(path)
+    assert ("task-id" in journal.load()) == task_journal
+    assert os.path.isdir(os.path.join(store, "task-id")) != task_journal
+
+
+def test_clear_loaded_task(tmpdir, add_recovery, monkeypatch):
+    store = str(tmpdir)
+    # Persist a task in a task directory.
+    monkeypatch.setattr(
+        task, "config", make_config([("irs", "task_journal", "false")]))
+    with task_manager() as tm:
+        c = Callable(hang_timeout=WAIT_TIMEOUT)
+        t = task.Task(id="task-id", abort_callback=c.finish)
+        add_recovery(t, "fakerecovery", ["arg1"])
+        t.prepare(tm.scheduleJob, "tag", store, t, "job", c)
+        c.wait_until_running()
+        t.store = None
+
+    # Recover the task with the journal enabled.
+    monkeypatch.setattr(
+        task, "config", make_config([("irs", "task_journal", "true")]))
+    with task_manager() as tm:
+        tm.loadDumpedTasks(store)
+        tm.recoverDumpedTasks()
+        t = tm._getTask("task-id")
+        assert t.wait(timeout=WAIT_TIMEOUT), "Task is not finished"
+        tm.clearTask("task-id")
+
+    # Both the journal record and the task directory are removed.
+    path = os.path.join(store, taskjournal.JOURNAL_NAME)
+    journal = taskjournal.Journal(path)
+    assert journal.load() == {}
+    assert not os.path.exists(os.path.join(store, "task-id"))
@@ -618,6 +618,43 @@ def bench():
               % (count, elapsed, elapsed / count))
 
 
+@pytest.fixture
+def volume_index():
+    index = xlease.VolumeIndex(sc.ALIGNMENT_1M, sc.BLOCK_SIZE_512)
+    for recnum in range(xlease.MAX_RECORDS):
+        index.write_record(recnum, xlease.EMPTY_RECORD)
+    yield index
+    index.close()
+
+
+class TestVolumeIndex:
+
+    def test_empty(self, volume_index):
+        assert volume_index.find_record(make_uuid()) == -1
+        assert volume_index.find_free_record() == 0
+
+    def test_write_record(self, volume_index):
+        lease_id = make_uuid()
+        volume_index.write_record(0, xlease.Record(lease_id, 0))
+        assert volume_index.find_record(lease_id) == 0
+        assert volume_index.find_free_record() == 1
+
+    def test_no_free_record(self, volume_index):
+        for recnum in range(xlease.MAX_RECORDS):
+            volume_index.write_record(recnum, xlease.Record(make_uuid(), 0))
+        assert volume_index.find_free_record() == -1
+
+    def test_find_record_unaligned(self, volume_index):
+        # Simulate a corrupted record 0 containing the lookup prefix of
+        # lease "a" in the middle of the record.
+        offset = xlease.RECORD_BASE + 8
+        volume_index._buf[offset:offset + xlease.LOOKUP_STRUCT.size] = \
+            xlease.LOOKUP_STRUCT.pack(b"a")
+        assert volume_index.find_record("a") == -1
+        volume_index.write_record(2, xlease.Record("a", 0))
+        assert volume_index.find_record("a") == 2
+
+
 @pytest.fixture(params=[
     xlease.DirectFile,
     xlease.InterruptibleDirectFile,
@@ -231,6 +231,24 @@ class TestGuestIF(TestCaseBase):
             for (k, v) in six.iteritems(_OUTPUTS[0]):
                 self.assertEqual(guest_info[k], v)
 
+    def test_guestinfo_qga_not_copied(self):
+        net_ifaces = [{'name': 'eth0', 'inet': ['192.168.1.1']}]
+        qga_info = {'netIfaces': net_ifaces}
+        fake_guest_agent = guestagent.GuestAgent(None, None, self.log,
+                                                 lambda: None, lambda: None,
+                                                 lambda: qga_info)
+        fake_guest_agent._handleMessage(_MSG_TYPES[0], _INPUTS[0])
+        with MonkeyPatchScope([
+                (fake_guest_agent, 'isResponsive', lambda: True)
+        ]):
+            guest_info = fake_guest_agent.getGuestInfo()
+        # QEMU GA snapshot values are shared, oVirt GA info is copied.
+        self.assertIs(guest_info['netIfaces'], net_ifaces)
+        for k in _OUTPUTS[0]:
+            value = guest_info[k]
+            if isinstance(value, (list, dict)):
+                self.assertIsNot(value, fake_guest_agent.guestInfo[k])
+
 
 class TestGuestIFHandleData(TestCaseBase):
     # helper for chunking messages
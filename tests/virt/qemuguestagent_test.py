@@ -220,6 +220,19 @@ class QemuGuestAgentTests(TestCaseBase):
         self.assertIsNone(self.qga_poller.get_guest_info(
             "99999999-9999-9999-9999-999999999999"))
 
+    def test_guest_info_snapshot(self):
+        """ Updating guest info does not modify returned snapshots. """
+        self.qga_poller.update_guest_info(self.vm.id, {"a": 1})
+        s1 = self.qga_poller.get_guest_info(self.vm.id)
+        self.assertIs(s1, self.qga_poller.get_guest_info(self.vm.id))
+        with self.assertRaises(TypeError):
+            s1["a"] = 2
+
+        self.qga_poller.update_guest_info(self.vm.id, {"b": 2})
+        s2 = self.qga_poller.get_guest_info(self.vm.id)
+        self.assertEqual(s1, {"a": 1})
+        self.assertEqual(s2, {"a": 1, "b": 2})
+
     def test_capability_check(self):
         self.qga_poller.update_caps(
             self.vm.id,
@@ -82,6 +82,46 @@ class SampleWindowTests(TestCaseBase):
         self.assertEqual(self.win.stats(),
                          (self._VALUES[-2], self._VALUES[-1], 1))
 
+    def test_stats_large_window(self):
+        win = sampling.SampleWindow(
+            size=3, timefn=lambda: next(self._counter))
+        for val in range(5):
+            win.append(val)
+        self.assertEqual(win.stats(), (2, 4, 2))
+        self.assertEqual(win.last(), (4, 4))
+        self.assertEqual(win.last(nth=3), (2, 2))
+        self.assertEqual(win.last(nth=4), (None, None))
+
+
+class SampleCompactorTests(TestCaseBase):
+
+    def setUp(self):
+        self.compactor = sampling.SampleCompactor()
+
+    def test_compact(self):
+        stats = {'state.state': 1, 'block.0.name': 'vda'}
+        sample = self.compactor.compact(stats)
+        self.assertEqual(sample, stats)
+        self.assertEqual(sample['block.0.name'], 'vda')
+        self.assertIn('state.state', sample)
+        self.assertNotIn('block.1.name', sample)
+        self.assertEqual(sample.get('block.1.name', 'sda'), 'sda')
+        self.assertRaises(KeyError, lambda: sample['block.1.name'])
+
+    def test_share_keys(self):
+        first = self.compactor.compact({'cpu.time': 1, 'cpu.user': 2})
+        last = self.compactor.compact({'cpu.time': 3, 'cpu.user': 4})
+        self.assertIs(first._keys, last._keys)
+
+    def test_different_keys(self):
+        first = self.compactor.compact({'cpu.time': 1})
+        last = self.compactor.compact({'cpu.time': 3, 'cpu.user': 4})
+        self.assertIsNot(first._keys, last._keys)
+        self.assertEqual(last, {'cpu.time': 3, 'cpu.user': 4})
+
+    def test_not_dict(self):
+        self.assertEqual(self.compactor.compact('foo'), 'foo')
+
 
 class StatsCacheTests(TestCaseBase):
 
@@ -124,6 +164,43 @@ class StatsCacheTests(TestCaseBase):
             sorted(res.keys())
         )
 
+    def test_get_compact(self):
+        self._feed_cache((
+            ({'a': {'cpu.time': 1}}, 1),
+            ({'a': {'cpu.time': 2}}, 2)
+        ))
+        res = self.cache.get('a')
+        self.assertEqual(res.first_value, {'cpu.time': 1})
+        self.assertEqual(res.last_value, {'cpu.time': 2})
+
+    def test_get_large_window(self):
+        cache = sampling.StatsCache(clock=self.fake_monotonic_time, size=3)
+        for ts, value in enumerate(('old', 'first', 'middle', 'last'), 1):
+            cache.put({'a': value}, ts)
+        res = cache.get('a')
+        self.assertEqual(res.first_value, 'first')
+        self.assertEqual(res.last_value, 'last')
+
+    def test_batch_stats(self):
+        self.assertIsNone(self.cache.batch_stats())
+        self._feed_cache((
+            ({'a': {}}, 1),
+            ({'a': {}}, 2),
+        ))
+        batch_stats = self.cache.batch_stats()
+        self.assertIsNotNone(batch_stats)
+        # Computed once per samples window.
+        self.assertIs(self.cache.batch_stats(), batch_stats)
+
+        res = self.cache.get('a')
+        self.assertIsNotNone(
+            batch_stats.get('a', res.first_value, res.last_value))
+
+        self._feed_cache((
+            ({'a': {}}, 3),
+        ))
+        self.assertIsNot(self.cache.batch_stats(), batch_stats)
+
     def test_get_batch_missing(self):
         self._feed_cache((
             ({'a': 'old', 'b': 'old'}, 1),
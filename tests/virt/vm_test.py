@@ -52,7 +52,6 @@ from vdsm.virt import vm
 from vdsm.virt import vmchannels
 from vdsm.virt import vmdevices
 from vdsm.virt import vmexitreason
-from vdsm.virt import vmstats
 from vdsm.virt import vmstatus
 from vdsm.virt import xmlconstants
 from vdsm.virt.vmdevices import hwclass
@@ -978,46 +977,6 @@ _VM_PARAMS = {'displayPort': -1, 'displaySecurePort': -1,
 
 class TestVmStats(TestCaseBase):
 
-    def testGetNicStats(self):
-        GBPS = 10 ** 9 // 8
-        MAC = '52:54:00:59:F5:3F'
-        pretime = vdsm.common.time.monotonic_time()
-        with fake.VM(_VM_PARAMS) as testvm:
-            res = vmstats._nic_traffic(
-                testvm, fake.Nic(
-                    name='vnettest', model='virtio', mac_addr=MAC
-                ),
-                start_sample={'net.0.rx.bytes': 2 ** 64 - 15 * GBPS,
-                              'net.0.rx.pkts': 1,
-                              'net.0.rx.errs': 2,
-                              'net.0.rx.drop': 3,
-                              'net.0.tx.bytes': 0,
-                              'net.0.tx.pkts': 4,
-                              'net.0.tx.errs': 5,
-                              'net.0.tx.drop': 6},
-                start_index=0,
-                end_sample={'net.0.rx.bytes': 0,
-                            'net.0.rx.pkts': 7,
-                            'net.0.rx.errs': 8,
-                            'net.0.rx.drop': 9,
-                            'net.0.tx.bytes': 5 * GBPS,
-                            'net.0.tx.pkts': 10,
-                            'net.0.tx.errs': 11,
-                            'net.0.tx.drop': 12},
-                end_index=0)
-        posttime = vdsm.common.time.monotonic_time()
-        self.assertIn('sampleTime', res)
-        self.assertTrue(pretime <= res['sampleTime'] <= posttime,
-                        'sampleTime not in [%s..%s]' % (pretime, posttime))
-        del res['sampleTime']
-        self.assertEqual(res, {
-            'rxErrors': '8', 'rxDropped': '9',
-            'txErrors': '11', 'txDropped': '12',
-            'macAddr': MAC, 'name': 'vnettest',
-            'speed': '1000', 'state': 'unknown',
-            'rx': '0', 'tx': '625000000',
-        })
-
     def testMultipleGraphicDeviceStats(self):
         device_types = ['spice', 'vnc']
         devices = '\n'.join(['''
@@ -21,6 +21,8 @@
 from __future__ import absolute_import
 from __future__ import division
 
+import time
+
 import libvirt
 
 from vdsm.common import libvirtconnection
@@ -217,6 +219,68 @@ class TestAllDomains(TestCaseBase):
             expect_destroy = not vm_is_ext
             self.assertEqual(vm_obj.destroyed, expect_destroy)
 
+    @permutations([
+        # workers
+        (1,),
+        (4,),
+    ])
+    def test_recovery_order(self, workers):
+        """
+        Domains fetched in parallel are recovered in libvirt order, even if
+        fetching later domains completes first.
+        """
+        vm_uuids = ('a', 'b', 'c', 'd', 'e')
+        self.conn.domains = _make_domains_collection(
+            [(vm_uuid, False) for vm_uuid in vm_uuids])
+        for delay, dom in enumerate(reversed(self.conn.domains.values())):
+            dom.XMLDesc = _delayed(dom.XMLDesc, delay * 0.02)
+
+        recovered = []
+
+        def create(params, vmRecover=False):
+            recovered.append(params['vmId'])
+            return response.success(vmList={})
+
+        with MonkeyPatchScope([
+            (self.cif, 'createVm', create)
+        ]):
+            recovery.all_domains(self.cif, workers=workers)
+        self.assertEqual(recovered, list(self.conn.domains))
+
+    def test_libvirt_error(self):
+        """
+        Unexpected libvirt error fails the recovery, so it can be retried.
+        """
+        self.conn.domains['b'].XMLDesc = _raise_internal_error
+        with self.assertRaises(libvirt.libvirtError):
+            recovery.all_domains(self.cif, workers=2)
+
+    def test_retry_after_libvirt_error(self):
+        """
+        Retrying a failed recovery does not recreate or destroy domains
+        recovered before the failure.
+        """
+        created = []
+
+        def create(params, vmRecover=False):
+            created.append(params['vmId'])
+            self.cif.vmContainer[params['vmId']] = params
+            return response.success(vmList={})
+
+        xml_desc = self.conn.domains['b'].XMLDesc
+        self.conn.domains['b'].XMLDesc = _raise_internal_error
+        with MonkeyPatchScope([
+            (self.cif, 'createVm', create)
+        ]):
+            with self.assertRaises(libvirt.libvirtError):
+                recovery.all_domains(self.cif, workers=1)
+            self.conn.domains['b'].XMLDesc = xml_desc
+            recovery.all_domains(self.cif, workers=1)
+        self.assertEqual(created, ['a', 'b'])
+        self.assertFalse(any(
+            vm.destroyed for vm in self.conn.domains.values()
+        ))
+
     def test_lookup_external_vms(self):
         vm_ext = [True] * len(self.vm_uuids)
         self.conn.domains = _make_domains_collection(
@@ -288,6 +352,19 @@ def _make_domains_collection(vm_uuids):
     }
 
 
+def _delayed(func, delay):
+    def wrapper(*args, **kwargs):
+        time.sleep(delay)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def _raise_internal_error(*args, **kwargs):
+    error = libvirt.libvirtError("Internal error")
+    error.err = [libvirt.VIR_ERR_INTERNAL_ERROR]
+    raise error
+
+
 def err_no_domain():
     error = libvirt.libvirtError("No such domain")
     error.err = [libvirt.VIR_ERR_NO_DOMAIN]
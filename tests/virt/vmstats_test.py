@@ -27,6 +27,7 @@ import uuid
 
 import six
 
+from vdsm.common.time import monotonic_time
 from vdsm.common.units import KiB, MiB, GiB
 from vdsm.virt import vmstats
 
@@ -336,14 +337,70 @@ class NetworkStatsTests(VmStatsTestCase):
                       mac_addr='00:1a:4a:16:01:51',
                       is_hostdevice=False)
         testvm = FakeVM(nics=(nic,))
+        batch_stats = vmstats.BatchStats(
+            {testvm.id: self.bulk_stats},
+            {testvm.id: self.bulk_stats},
+            self.interval)
+        sample_stats = batch_stats.get(
+            testvm.id, self.bulk_stats, self.bulk_stats)
 
-        stats = vmstats._nic_traffic(
-            testvm, nic,
-            self.bulk_stats, 0,
-            self.bulk_stats, 0,
-        )
+        stats = {}
+        vmstats.networks(testvm, stats,
+                         self.bulk_stats, self.bulk_stats,
+                         self.interval, sample_stats=sample_stats)
 
-        self.assertStatsHaveKeys(stats, self._EXPECTED_KEYS)
+        self.assertStatsHaveKeys(stats['network']['vnet0'],
+                                 self._EXPECTED_KEYS)
+
+    def test_nic_stats(self):
+        GBPS = 10 ** 9 // 8
+        MAC = '52:54:00:59:F5:3F'
+        nic = FakeNic(name='vnettest', model='virtio', mac_addr=MAC,
+                      is_hostdevice=False)
+        testvm = FakeVM(nics=(nic,))
+        first_sample = {'net.count': 1,
+                        'net.0.name': 'vnettest',
+                        'net.0.rx.bytes': 2 ** 64 - 15 * GBPS,
+                        'net.0.rx.pkts': 1,
+                        'net.0.rx.errs': 2,
+                        'net.0.rx.drop': 3,
+                        'net.0.tx.bytes': 0,
+                        'net.0.tx.pkts': 4,
+                        'net.0.tx.errs': 5,
+                        'net.0.tx.drop': 6}
+        last_sample = {'net.count': 1,
+                       'net.0.name': 'vnettest',
+                       'net.0.rx.bytes': 0,
+                       'net.0.rx.pkts': 7,
+                       'net.0.rx.errs': 8,
+                       'net.0.rx.drop': 9,
+                       'net.0.tx.bytes': 5 * GBPS,
+                       'net.0.tx.pkts': 10,
+                       'net.0.tx.errs': 11,
+                       'net.0.tx.drop': 12}
+        batch_stats = vmstats.BatchStats(
+            {testvm.id: first_sample},
+            {testvm.id: last_sample},
+            self.interval)
+        sample_stats = batch_stats.get(testvm.id, first_sample, last_sample)
+
+        pretime = monotonic_time()
+        stats = {}
+        vmstats.networks(testvm, stats, first_sample, last_sample,
+                         self.interval, sample_stats=sample_stats)
+        posttime = monotonic_time()
+
+        res = stats['network']['vnettest']
+        self.assertTrue(pretime <= res['sampleTime'] <= posttime,
+                        'sampleTime not in [%s..%s]' % (pretime, posttime))
+        del res['sampleTime']
+        self.assertEqual(res, {
+            'rxErrors': '8', 'rxDropped': '9',
+            'txErrors': '11', 'txDropped': '12',
+            'macAddr': MAC, 'name': 'vnettest',
+            'speed': '1000', 'state': 'unknown',
+            'rx': '0', 'tx': '625000000',
+        })
 
     def test_networks_have_all_keys(self):
         nics = (
@@ -637,6 +694,60 @@ class BalloonStatsTests(VmStatsTestCase):
 
 # helpers
 
+class BatchStatsTests(VmStatsTestCase):
+
+    def setUp(self):
+        super(BatchStatsTests, self).setUp()
+        self.vm = FakeVM(
+            nics=(FakeNic(name='vnet0', model='virtio',
+                          mac_addr='00:1a:4a:16:01:51',
+                          is_hostdevice=False),),
+            drives=(FakeDrive(name='hdc', size=700 * MiB),))
+        self.first_sample = copy.deepcopy(self.bulk_stats)
+        self.last_sample = copy.deepcopy(self.bulk_stats)
+        _ensure_delta(self.first_sample, self.last_sample,
+                      'block.0.rd.bytes', 128 * KiB)
+        self.batch_stats = vmstats.BatchStats(
+            {self.vm.id: self.first_sample},
+            {self.vm.id: self.last_sample},
+            self.interval)
+
+    def test_same_stats(self):
+        sample_stats = self.batch_stats.get(
+            self.vm.id, self.first_sample, self.last_sample)
+        self.assertIsNotNone(sample_stats)
+
+        expected = {}
+        vmstats.networks(self.vm, expected,
+                         self.first_sample, self.last_sample,
+                         self.interval)
+        vmstats.disks(self.vm, expected,
+                      self.first_sample, self.last_sample,
+                      self.interval)
+
+        stats = {}
+        vmstats.networks(self.vm, stats,
+                         self.first_sample, self.last_sample,
+                         self.interval, sample_stats=sample_stats)
+        vmstats.disks(self.vm, stats,
+                      self.first_sample, self.last_sample,
+                      self.interval, sample_stats=sample_stats)
+
+        del expected['network']['vnet0']['sampleTime']
+        del stats['network']['vnet0']['sampleTime']
+        self.assertEqual(stats, expected)
+        self.assertEqual(stats['disks']['hdc']['readRate'],
+                         str(128 * KiB / self.interval))
+
+    def test_other_samples(self):
+        self.assertIsNone(self.batch_stats.get(
+            self.vm.id, self.first_sample, copy.deepcopy(self.last_sample)))
+
+    def test_missing_vm(self):
+        self.assertIsNone(self.batch_stats.get(
+            'no-such-vm', self.first_sample, self.last_sample))
+
+
 def _ensure_delta(stats_before, stats_after, key, delta):
     """
     Set stats_before[key] and stats_after[key] so that